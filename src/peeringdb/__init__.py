@@ -66,7 +66,10 @@ class BackendError(Exception):
 
 # Map external module names to adaptor modules
 SUPPORTED_BACKENDS: dict[str, str] = {
-    "django_peeringdb": "django_peeringdb.client_adaptor",
+    "django_peeringdb": "peeringdb.backends.django",
+    "sqlite": "peeringdb.backends.sqlite",
+    "memory": "peeringdb.backends.memory",
+    "mmap": "peeringdb.backends.mapped",
 }
 
 __backend: tuple["Interface", tuple[str, str]] | None = None
@@ -0,0 +1,115 @@
+"""
+Compression codecs for the local cache files
+"""
+
+import gzip
+import logging
+import zlib
+from collections.abc import Iterable, Iterator
+from typing import IO, cast
+
+try:
+    # python >= 3.14
+    from compression import zstd as _zstd
+except ImportError:
+    _zstd = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CODECS: tuple[str, ...] = ("none", "gzip", "zstd")
+
+# leading bytes identifying a compressed cache file
+MAGIC: dict[bytes, str] = {
+    b"\x1f\x8b": "gzip",
+    b"\x28\xb5\x2f\xfd": "zstd",
+}
+
+
+def zstd_available() -> bool:
+    return _zstd is not None or zstandard is not None
+
+
+def resolve(name: str | None) -> str:
+    """
+    Normalize a configured codec name, zstd falls back to gzip if neither
+    `compression.zstd` nor the `zstandard` package is available
+    """
+    codec = (name or "none").strip().lower()
+    if codec not in CODECS:
+        raise ValueError(
+            f"Unknown cache codec '{name}', expected one of {', '.join(CODECS)}"
+        )
+    if codec == "zstd" and not zstd_available():
+        logging.getLogger(__name__).warning(
+            "zstd is not available, compressing cache files with gzip instead"
+        )
+        return "gzip"
+    return codec
+
+
+def detect(path: str) -> str:
+    """
+    Detect the codec a cache file was written with
+    """
+    with open(path, "rb") as f:
+        head = f.read(4)
+    for magic, codec in MAGIC.items():
+        if head.startswith(magic):
+            return codec
+    return "none"
+
+
+def open_reader(path: str) -> IO[bytes]:
+    """
+    Open a cache file for reading, decompressing it if needed
+    """
+    codec = detect(path)
+    if codec == "gzip":
+        return cast(IO[bytes], gzip.open(path, "rb"))
+    if codec == "zstd":
+        if _zstd is not None:
+            return _zstd.open(path, "rb")
+        if zstandard is not None:
+            return zstandard.ZstdDecompressor().stream_reader(
+                open(path, "rb"), closefd=True
+            )
+        raise ValueError(f"{path} is zstd compressed but zstd is not available")
+    return open(path, "rb")
+
+
+def open_writer(path: str, codec: str) -> IO[bytes]:
+    """
+    Open a cache file for writing with the given codec
+    """
+    if codec == "gzip":
+        # favour speed, cache files are rewritten on every download
+        return cast(IO[bytes], gzip.open(path, "wb", compresslevel=6))
+    if codec == "zstd":
+        if _zstd is not None:
+            return _zstd.open(path, "wb")
+        return zstandard.ZstdCompressor().stream_writer(open(path, "wb"), closefd=True)
+    return open(path, "wb")
+
+
+def decompress(chunks: Iterable[bytes], codec: str) -> Iterator[bytes]:
+    """
+    Incrementally decompress a stream of compressed chunks
+    """
+    if codec == "gzip":
+        decompressor = zlib.decompressobj(wbits=31)
+    elif _zstd is not None:
+        decompressor = _zstd.ZstdDecompressor()
+    else:
+        decompressor = zstandard.ZstdDecompressor().decompressobj()
+    for chunk in chunks:
+        data = decompressor.decompress(chunk)
+        if data:
+            yield data
+    flush = getattr(decompressor, "flush", None)
+    if flush is not None:
+        data = flush()
+        if data:
+            yield data
@@ -0,0 +1,131 @@
+"""
+Content digests of the rows written by a sync
+
+The digest of a row is taken from the raw API row over the fields the
+backend stores. Digests of the rows written are kept per resource in the
+cache directory, so an incremental sync can drop rows it already wrote
+(typically the ones re-fetched by the lookback window) before converting
+them, querying their stored objects or building models for them.
+
+A digest file is only trusted while the backend's `last_change` of the
+resource matches the one recorded with it, so the digests are discarded
+whenever the database changed outside of the sync that wrote them.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+
+from peeringdb._plan import ResourcePlan
+
+# bump when the digest of a row or the layout of the file changes
+DIGEST_VERSION = 1
+
+_DIGEST_SIZE = 16
+
+
+def fields(res_plan: ResourcePlan) -> tuple[str, ...]:
+    """
+    Canonical field set of a resource's rows: scalars, related ids and sets
+    """
+    names = set(res_plan.scalars)
+    names.update(ref.column or ref.name for ref in res_plan.single_refs)
+    names.update(ref.name for ref in res_plan.many_refs)
+    return tuple(sorted(names))
+
+
+def row_digest(row: dict, names: tuple[str, ...]) -> bytes:
+    values = json.dumps(
+        [row.get(name) for name in names],
+        separators=(",", ":"),
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.blake2b(values.encode(), digest_size=_DIGEST_SIZE).digest()
+
+
+class DigestStore:
+    """
+    Digests of the rows of one resource, see module docstring
+    """
+
+    def __init__(
+        self, path: str, names: tuple[str, ...], watermark: int | None
+    ) -> None:
+        """
+        :param path: File the digests are kept in
+        :param names: Canonical field set, see `fields`
+        :param watermark: `last_change` of the resource in the backend
+        """
+        self.path = path
+        self.names = names
+        # digests of the rows stored in the backend, by id
+        self.digests: dict[int, bytes] = self._load(watermark)
+        # digests of rows passed by `filter` that are not confirmed written
+        self.pending: dict[int, bytes] = {}
+
+    def _load(self, watermark: int | None) -> dict[int, bytes]:
+        try:
+            with open(self.path, "rb") as f:
+                data = pickle.load(f)
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+            return {}
+        if (
+            not isinstance(data, dict)
+            or data.get("version") != DIGEST_VERSION
+            or data.get("fields") != self.names
+            or data.get("watermark") != watermark
+            or not watermark
+        ):
+            return {}
+        digests = data.get("digests")
+        return digests if isinstance(digests, dict) else {}
+
+    def filter(self, rows: list) -> tuple[list, int]:
+        """
+        Drop the rows whose digest matches the stored one
+
+        :returns: the remaining rows and the number of rows dropped
+        """
+        changed = []
+        for row in rows:
+            pk = row.get("id")
+            if pk is None:
+                changed.append(row)
+                continue
+            digest = row_digest(row, self.names)
+            if self.digests.get(pk) == digest:
+                continue
+            self.pending[pk] = digest
+            changed.append(row)
+        return changed, len(rows) - len(changed)
+
+    def confirm(self, pk: int) -> None:
+        """
+        Record the digest of a row passed by `filter` once it is written
+        """
+        digest = self.pending.pop(pk, None)
+        if digest is not None:
+            self.digests[pk] = digest
+
+    def save(self, watermark: int | None) -> None:
+        """
+        Write the digests, recording the resource's `last_change` after the
+        sync wrote it
+        """
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        data = {
+            "version": DIGEST_VERSION,
+            "fields": self.names,
+            "watermark": watermark,
+            "digests": self.digests,
+        }
+        try:
+            with open(tmp, "wb") as f:
+                pickle.dump(data, f, protocol=5)
+            os.replace(tmp, self.path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
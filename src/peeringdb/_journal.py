@@ -0,0 +1,170 @@
+"""
+Journal of the entries that failed to sync
+
+Failed entries are appended to the file as JSON lines, so logging one does
+not rewrite the file. An in-memory index of the logged entries skips
+duplicates without reading the file again. Files holding a single JSON array,
+as written by older versions, are still read and are compacted into JSON
+lines on the next write, as are files holding redundant lines.
+"""
+
+import json
+import logging
+import os
+import threading
+
+Entry = dict[str, str | int]
+
+
+def _key(entry: Entry) -> tuple:
+    return (entry.get("resource_tag"), entry.get("pk"), entry.get("error"))
+
+
+def _signature(path: str) -> tuple[int, int, int] | None:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def read(path: str) -> tuple[list[Entry], bool]:
+    """
+    Read the entries of a journal file, without duplicates
+
+    :returns: the entries and whether the file should be compacted
+    """
+    try:
+        with open(path) as f:
+            data = f.read()
+    except FileNotFoundError:
+        return [], False
+
+    if data.lstrip().startswith("["):
+        # single JSON array written by older versions
+        try:
+            parsed = json.loads(data)
+        except json.JSONDecodeError as e:
+            logging.warning(
+                f"Failed entries file '{path}' contains invalid JSON "
+                f"and will be ignored: {e}"
+            )
+            return [], False
+        lines = [entry for entry in parsed if isinstance(entry, dict)]
+        return _unique(lines), True
+
+    lines = []
+    stale = False
+    for lineno, line in enumerate(data.splitlines(), 1):
+        if not line.strip():
+            continue
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError as e:
+            logging.warning(
+                f"Failed entries file '{path}' contains invalid JSON "
+                f"on line {lineno}, ignoring it: {e}"
+            )
+            stale = True
+            continue
+        if isinstance(entry, dict):
+            lines.append(entry)
+        else:
+            stale = True
+    entries = _unique(lines)
+    return entries, stale or len(entries) != len(lines)
+
+
+def _unique(entries: list[Entry]) -> list[Entry]:
+    seen = set()
+    unique = []
+    for entry in entries:
+        key = _key(entry)
+        if key not in seen:
+            seen.add(key)
+            unique.append(entry)
+    return unique
+
+
+class Journal:
+    """
+    Failed entries file, see `journal`
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._index: set[tuple] | None = None
+        # signature of the file when the index was built, a file changed or
+        # removed by anyone else invalidates the index
+        self._seen: tuple[int, int, int] | None = None
+
+    def entries(self) -> list[Entry]:
+        """
+        Entries in the journal
+        """
+        with self._lock:
+            entries, stale = read(self.path)
+            self._index = {_key(entry) for entry in entries}
+            # a stale file is compacted by the next append
+            self._seen = None if stale else _signature(self.path)
+            return entries
+
+    def append(self, entry: Entry) -> bool:
+        """
+        Log an entry unless it is in the journal already
+
+        :returns: whether the entry was added
+        """
+        with self._lock:
+            index = self._index
+            if index is None or _signature(self.path) != self._seen:
+                entries, stale = read(self.path)
+                if stale:
+                    self._write(entries)
+                index = self._index = {_key(entry) for entry in entries}
+                self._seen = _signature(self.path)
+            key = _key(entry)
+            if key in index:
+                return False
+            with open(self.path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+            index.add(key)
+            self._seen = _signature(self.path)
+            return True
+
+    def replace(self, entries: list[Entry]) -> None:
+        """
+        Replace the journal's entries
+        """
+        with self._lock:
+            self._write(_unique(entries))
+
+    def _write(self, entries: list[Entry]) -> None:
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                for entry in entries:
+                    f.write(json.dumps(entry) + "\n")
+            os.replace(tmp, self.path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        self._index = {_key(entry) for entry in entries}
+        self._seen = _signature(self.path)
+
+
+_JOURNALS: dict[str, Journal] = {}
+_JOURNALS_LOCK = threading.Lock()
+
+
+def journal(path: str) -> Journal:
+    """
+    The journal of a failed entries file, shared within the process
+    """
+    key = os.path.abspath(path)
+    with _JOURNALS_LOCK:
+        found = _JOURNALS.get(key)
+        if found is None:
+            found = _JOURNALS[key] = Journal(key)
+        return found
@@ -0,0 +1,187 @@
+"""
+Compiled field metadata of the concrete classes
+
+Turning a row into an object needs to know which fields are scalars and
+which are relations (and to what). Asking the backend for this on every row
+is a large share of the sync's CPU time, so it is worked out once per
+backend and concrete class and kept in a `ResourcePlan`.
+"""
+
+import weakref
+from collections.abc import Callable, Iterable
+from datetime import datetime
+from functools import partial
+from typing import Any, NamedTuple
+
+from peeringdb.backend import Field, Interface, class_keyed
+from peeringdb.util import group_fields
+
+# fields holding API timestamps on backends that don't describe field types
+DATETIME_FIELDS = ("created", "updated", "rir_status_updated", "ixf_last_import")
+
+
+def parse_datetime(value: object) -> object:
+    """
+    Turn an API timestamp into a naive datetime, anything that isn't a
+    timestamp string or datetime is returned as it is
+    """
+    if isinstance(value, str):
+        return datetime.fromisoformat(value.rstrip("Z")).replace(tzinfo=None)
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    return value
+
+
+class ConvertedRow(dict):
+    """
+    A row whose scalar values were converted by `ResourcePlan.convert`
+    """
+
+
+class Ref(NamedTuple):
+    """
+    A relation field
+    """
+
+    name: str
+    field: Field
+    # column holding the related id (e.g. `org_id`), None if there is none
+    column: str | None
+    # resource and concrete class of the related objects
+    resource: type
+    concrete: type
+
+
+class ResourcePlan:
+    """
+    Field metadata of a concrete class, see `plan`
+    """
+
+    def __init__(self, backend: Interface, concrete: type) -> None:
+        self.concrete = concrete
+        # same shape as `util.group_fields`
+        self.groups: dict[str, dict[str, Field]] = group_fields(backend, concrete)
+        self.scalars: dict[str, Field] = self.groups["scalars"]
+        self.single_refs: list[Ref] = [
+            _ref(backend, concrete, name, field)
+            for name, field in self.groups["single_refs"].items()
+        ]
+        self.many_refs: list[Ref] = [
+            _ref(backend, concrete, name, field)
+            for name, field in self.groups["many_refs"].items()
+        ]
+        # fields stored in the concrete class's own table
+        self.columns: list[Field] = [
+            field
+            for field in backend.get_fields(concrete)
+            if getattr(field, "concrete", False)
+        ]
+        # per scalar value converter, None where the backend doesn't convert
+        self.converters: dict[str, Callable[[Any], Any] | None] = {
+            name: _converter(backend, concrete, name) for name in self.scalars
+        }
+        # complete conversion per scalar, fields that need none are left out
+        self.column_converters: dict[str, Callable[[Any], Any]] = {}
+        for name, field in self.scalars.items():
+            convert = _chain(self.converters[name], _is_datetime(name, field))
+            if convert is not None:
+                self.column_converters[name] = convert
+
+    def convert_row(
+        self, row: dict[str, str | int | bool | list | dict]
+    ) -> ConvertedRow:
+        """
+        Copy of a row with its scalar values converted
+        """
+        converted = ConvertedRow(row)
+        for name, convert in self.column_converters.items():
+            if name in converted:
+                converted[name] = convert(converted[name])
+        return converted
+
+    def convert(
+        self, rows: Iterable[dict[str, str | int | bool | list | dict]]
+    ) -> list[dict[str, Any]]:
+        """
+        Convert the scalar values of a batch of rows, one field at a time.
+
+        Rows a value can't be converted for are returned as they are, so
+        converting them again in `create_obj` fails that row only.
+        """
+        rows = list(rows)
+        converted: list[dict[str, Any]] = [ConvertedRow(row) for row in rows]
+        failed = set()
+        for name, convert in self.column_converters.items():
+            for idx, row in enumerate(converted):
+                if name not in row:
+                    continue
+                try:
+                    row[name] = convert(row[name])
+                except Exception:
+                    failed.add(idx)
+        for idx in failed:
+            converted[idx] = rows[idx]
+        return converted
+
+
+def _is_datetime(name: str, field: Field) -> bool:
+    get_internal_type = getattr(field, "get_internal_type", None)
+    if get_internal_type is not None and get_internal_type() == "DateTimeField":
+        return True
+    return name in DATETIME_FIELDS
+
+
+def _chain(
+    convert: Callable[[Any], Any] | None, is_datetime: bool
+) -> Callable[[Any], Any] | None:
+    if not is_datetime:
+        return convert
+    if convert is None:
+        return parse_datetime
+
+    def convert_datetime(value: Any) -> Any:
+        return parse_datetime(convert(value))
+
+    return convert_datetime
+
+
+def _ref(backend: Interface, concrete: type, name: str, field: Field) -> Ref:
+    related = backend.get_field_concrete(concrete, name)
+    if not isinstance(related, type):
+        raise ValueError(f"Expected type, got {type(related)}")
+    column = getattr(field, "column", None)
+    return Ref(
+        name=name,
+        field=field,
+        column=column if isinstance(column, str) else None,
+        resource=backend.get_resource(related),
+        concrete=related,
+    )
+
+
+def _converter(
+    backend: Interface, concrete: type, name: str
+) -> Callable[[Any], Any] | None:
+    if type(backend).convert_field is Interface.convert_field:
+        # the default returns values as they are
+        return None
+    # the concrete class is already resolved, skip the reftag lookup
+    return partial(class_keyed(backend.convert_field), concrete, name)
+
+
+_PLANS: weakref.WeakKeyDictionary[Interface, dict[type, ResourcePlan]] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def plan(backend: Interface, concrete: type) -> ResourcePlan:
+    """
+    The plan of a concrete class, compiled on first use per backend
+    """
+    plans = _PLANS.get(backend)
+    if plans is None:
+        plans = _PLANS.setdefault(backend, {})
+    compiled = plans.get(concrete)
+    if compiled is None:
+        compiled = plans[concrete] = ResourcePlan(backend, concrete)
+    return compiled
@@ -0,0 +1,119 @@
+"""
+Client side rate limiting for API requests
+"""
+
+import email.utils
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+# default pacing of API requests, 120 per minute matches the fixed 0.5s pause
+# that used to follow every request
+DEFAULT_RATE_LIMIT = 120.0
+DEFAULT_RATE_BURST = 10
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    Seconds to wait according to a `Retry-After` header, which is either a
+    number of seconds or an HTTP date. None if missing or unparseable.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class RateLimiter:
+    """
+    Token bucket shared by all requests of a Fetcher, including the ones
+    made from prefetch threads.
+
+    Up to `burst` requests go out back to back, after that they are paced to
+    `rate` per minute. A rate of 0 disables pacing, rate limit responses are
+    still backed off from. After a rate limit response every request waits
+    until the backoff expired, the backoff grows with consecutive rate limit
+    responses and resets with the next successful request.
+    """
+
+    def __init__(
+        self, rate: float = 0, burst: int = 1, max_backoff: float = 60
+    ) -> None:
+        """
+        :param rate: Requests per minute, 0 for no limit
+        :param burst: Requests allowed back to back
+        :param max_backoff: Upper bound for a backoff without Retry-After
+        """
+        self.rate: float = max(float(rate), 0.0)
+        self.burst: int = max(int(burst), 1)
+        self.max_backoff: float = max(float(max_backoff), 0.0)
+        # consecutive rate limit responses
+        self.attempt: int = 0
+        self._tokens: float = float(self.burst)
+        self._stamp: float = time.monotonic()
+        self._blocked_until: float = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """
+        Take a token, returning how long the caller needs to wait for it
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = max(self._blocked_until - now, 0.0)
+            if not self.rate:
+                return wait
+            per_second = self.rate / 60
+            self._tokens = min(
+                self._tokens + (now - self._stamp) * per_second, self.burst
+            )
+            self._stamp = now
+            # tokens may go negative, later callers queue up behind this one
+            self._tokens -= 1
+            if self._tokens < 0:
+                wait = max(wait, -self._tokens / per_second)
+            return wait
+
+    def acquire(self) -> None:
+        """
+        Block until a request may be sent
+        """
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    def backoff(self, retry_after: float | None = None) -> float:
+        """
+        Register a rate limit response and return the seconds all requests
+        are held back for. Honors `retry_after` if the server sent one,
+        otherwise backs off exponentially with jitter.
+        """
+        with self._lock:
+            if retry_after is not None:
+                delay = retry_after
+            else:
+                cap = min(2.0**self.attempt, self.max_backoff)
+                delay = random.uniform(cap / 2, cap)
+            self.attempt += 1
+            self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+            # the server's window just started over, don't burst into it
+            self._tokens = min(self._tokens, 0.0)
+            return delay
+
+    def success(self) -> None:
+        """
+        Register a successful request
+        """
+        with self._lock:
+            self.attempt = 0
@@ -0,0 +1,74 @@
+"""
+Pre-parsed binary snapshots of the local cache files
+
+A snapshot is written next to a cache file once its rows were parsed and
+holds them pickled, so a warm start can skip decoding the JSON. It is only
+used while the digest stored in its header matches the cache file.
+"""
+
+import hashlib
+import os
+import pickle
+
+# bump when the layout of the pickled payload changes
+SNAPSHOT_VERSION = 1
+
+MAGIC = b"PDBSNAP"
+
+SUFFIX = ".pickle"
+
+_DIGEST_SIZE = 32
+
+_HEADER_SIZE = len(MAGIC) + 1 + _DIGEST_SIZE
+
+
+def path(cache_file: str) -> str:
+    return f"{cache_file}{SUFFIX}"
+
+
+def digest(cache_file: str) -> bytes:
+    """
+    Checksum of a cache file, as stored in the header of its snapshot
+    """
+    h = hashlib.blake2b(digest_size=_DIGEST_SIZE)
+    with open(cache_file, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.digest()
+
+
+def _header(cache_file: str) -> bytes:
+    return MAGIC + bytes([SNAPSHOT_VERSION]) + digest(cache_file)
+
+
+def load(cache_file: str) -> list | None:
+    """
+    Rows of `cache_file` from its snapshot, None if there is no snapshot or it
+    is outdated
+    """
+    try:
+        with open(path(cache_file), "rb") as f:
+            if f.read(_HEADER_SIZE) != _header(cache_file):
+                return None
+            rows = pickle.load(f)
+    except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+        return None
+    if not isinstance(rows, list):
+        return None
+    return rows
+
+
+def dump(cache_file: str, rows: list) -> None:
+    """
+    Write the snapshot for `cache_file`
+    """
+    target = path(cache_file)
+    tmp = f"{target}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(_header(cache_file))
+            pickle.dump(rows, f, protocol=5)
+        os.replace(tmp, target)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
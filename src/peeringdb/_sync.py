@@ -8,30 +8,20 @@ from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from peeringdb.backend import Interface
 
-from peeringdb.util import group_fields
-
-
-def _field_resource(backend: "Interface", concrete: type, field: object) -> type:
-    field_name = getattr(field, "name", None)
-    if field_name is None:
-        raise ValueError("Field has no name")
-    field_concrete = backend.get_field_concrete(concrete, field_name)
-    if not isinstance(field_concrete, type):
-        raise ValueError(f"Expected type, got {type(field_concrete)}")
-    return backend.get_resource(field_concrete)
+from peeringdb._plan import Ref, plan
 
 
 def _get_subrow(
-    row: dict[str, str | int | bool | list | dict], fname: str, field: object
+    row: dict[str, str | int | bool | list | dict], ref: Ref
 ) -> tuple[str, str | int | bool | list | dict | None]:
-    key = getattr(field, "column", None)
-    if key is not None and isinstance(key, str):
+    key = ref.column
+    if key is not None:
         subrow = row.get(key)
     else:
-        key = fname
+        key = ref.name
         subrow = None
     if subrow is None:  # e.g. use "org" if "org_id" is missing
-        key = fname
+        key = ref.name
         try:
             subrow = row[key]
         except KeyError:
@@ -45,7 +35,7 @@ def extract_relations(
     dict[type, dict[str | int, dict[str, str | int | bool | list | dict]]],
     dict[type, set[str | int]],
 ]:
-    field_groups = group_fields(backend, backend.get_concrete(res))
+    res_plan = plan(backend, backend.get_concrete(res))
     # Already-fetched, and id-only refs
     fetched: dict = defaultdict(dict)
     dangling = defaultdict(set)
@@ -62,17 +52,15 @@ def extract_relations(
             dangling[resource].add(pk)
         return pk
 
-    for fname, field in field_groups["single_refs"].items():
-        fieldres = _field_resource(backend, backend.get_concrete(res), field)
-        _, subrow = _get_subrow(row, fname, field)
-        _handle_subrow(fieldres, subrow)
+    for ref in res_plan.single_refs:
+        _, subrow = _get_subrow(row, ref)
+        _handle_subrow(ref.resource, subrow)
 
-    for fname, field in field_groups["many_refs"].items():
-        fieldres = _field_resource(backend, backend.get_concrete(res), field)
-        many_data = row.get(fname, [])
+    for ref in res_plan.many_refs:
+        many_data = row.get(ref.name, [])
         if isinstance(many_data, list):
             for subrow in many_data:
-                _handle_subrow(fieldres, subrow)
+                _handle_subrow(ref.resource, subrow)
 
     return fetched, dangling
 
@@ -83,9 +71,8 @@ def set_single_relations(
     obj: object,
     row: dict[str, str | int | bool | list | dict],
 ) -> None:
-    field_groups = group_fields(backend, backend.get_concrete(res))
-    for fname, field in field_groups["single_refs"].items():
-        key, subrow = _get_subrow(row, fname, field)
+    for ref in plan(backend, backend.get_concrete(res)).single_refs:
+        key, subrow = _get_subrow(row, ref)
         if isinstance(subrow, dict):
             pk = subrow["id"]
         else:
@@ -93,19 +80,62 @@ def set_single_relations(
         setattr(obj, key, pk)
 
 
+def _many_pks(
+    row: dict[str, str | int | bool | list | dict], ref: Ref
+) -> list[str | int]:
+    pks_data = row.get(ref.name, [])
+    if not isinstance(pks_data, list):
+        return []
+    return [pk["id"] if isinstance(pk, dict) else pk for pk in pks_data]
+
+
+def load_many_relations(
+    backend: "Interface",
+    res: type,
+    rows: list[dict[str, str | int | bool | list | dict]],
+) -> dict[type, dict[str | int, object]]:
+    """
+    Look up the objects the many relations of a chunk of rows refer to,
+    one query per related concrete class
+
+    Returns:
+
+        - dict of objects keyed by concrete class and primary key, for
+            `set_many_relations`
+    """
+    wanted: defaultdict[type, set[str | int]] = defaultdict(set)
+    for ref in plan(backend, backend.get_concrete(res)).many_refs:
+        for row in rows:
+            wanted[ref.concrete].update(_many_pks(row, ref))
+    return {
+        concrete: backend.get_objects_map(concrete, pks)
+        for concrete, pks in wanted.items()
+        if pks
+    }
+
+
 def set_many_relations(
     backend: "Interface",
     res: type,
     obj: object,
     row: dict[str, str | int | bool | list | dict],
+    related: dict[type, dict[str | int, object]] | None = None,
 ) -> None:
-    field_groups = group_fields(backend, backend.get_concrete(res))
-    for fname, field in field_groups["many_refs"].items():
-        fieldres = _field_resource(backend, backend.get_concrete(res), field)
-        pks_data = row.get(fname, [])
-        if isinstance(pks_data, list):
-            pks = pks_data
-        else:
-            pks = []
-        objs = [backend.get_object(backend.get_concrete(fieldres), pk) for pk in pks]
-        backend.set_relation_many_to_many(obj, fname, objs)
+    """
+    Set the many relations of an object, the related objects are taken from
+    `related` (see `load_many_relations`) and looked up with one query per
+    relation otherwise
+    """
+    for ref in plan(backend, backend.get_concrete(res)).many_refs:
+        pks = _many_pks(row, ref)
+        known = related.get(ref.concrete, {}) if related is not None else {}
+        missing = [pk for pk in pks if pk not in known]
+        if missing:
+            known = {**known, **backend.get_objects_map(ref.concrete, missing)}
+        try:
+            objs = [known[pk] for pk in pks]
+        except KeyError as e:
+            raise backend.object_missing_error(ref.concrete)(
+                f"{ref.concrete.__name__} {e.args[0]} does not exist"
+            ) from e
+        backend.set_relation_many_to_many(obj, ref.name, objs)
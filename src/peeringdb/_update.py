@@ -2,20 +2,91 @@
 Module defining main interface classes for sync
 """
 
+import copy
+import hashlib
 import json
 import logging
 import os
+import threading
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import AbstractContextManager
 from datetime import datetime
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, cast
 
 if TYPE_CHECKING:
     pass
 
 from peeringdb import config, get_backend
-from peeringdb._sync import extract_relations, set_many_relations, set_single_relations
+from peeringdb._digest import DigestStore, fields
+from peeringdb._plan import ConvertedRow, parse_datetime, plan
+from peeringdb._sync import (
+    extract_relations,
+    load_many_relations,
+    set_many_relations,
+    set_single_relations,
+)
+from peeringdb.backend import class_keyed
 from peeringdb.fetch import Fetcher
 from peeringdb.private import PRIVATE_OBJECTS
-from peeringdb.util import group_fields, log_error
+from peeringdb.resource import RESOURCES_BY_TAG, dependency_graph
+from peeringdb.util import chunked, log_error
+
+
+class _CommitBatch:
+    """
+    Groups the writes of a sync into transactions of `size` rows, 0 keeps
+    them all in a single transaction.
+
+    Every row is written in its own nested transaction (a savepoint on
+    backends that support them), so a failing row is rolled back on its own
+    and the transaction carries on with the next one.
+    """
+
+    def __init__(self, backend, size: int) -> None:
+        self.backend = backend
+        self.size = size
+        # rows written in the open transaction
+        self.pending = 0
+        # the open transaction, None if its commit failed
+        self._transaction: AbstractContextManager | None = None
+
+    def __enter__(self) -> "_CommitBatch":
+        self._begin()
+        return self
+
+    def __exit__(self, *exc) -> bool | None:
+        return self._end(*exc)
+
+    def _begin(self) -> None:
+        transaction = self.backend.atomic_transaction()
+        transaction.__enter__()
+        self._transaction = transaction
+        self.pending = 0
+
+    def _end(self, *exc) -> bool | None:
+        transaction, self._transaction = self._transaction, None
+        if transaction is None:
+            # a failed commit in `written` already closed it, let its
+            # error propagate
+            return None
+        return transaction.__exit__(*exc)
+
+    def row(self):
+        """
+        Context for the writes of a single row
+        """
+        return self.backend.atomic_transaction()
+
+    def written(self, count: int = 1) -> None:
+        """
+        Count written rows, committing once `size` of them are pending
+        """
+        self.pending += count
+        if self.size and self.pending >= self.size:
+            self._end(None, None, None)
+            self._begin()
 
 
 class Updater:
@@ -34,6 +105,22 @@ class Updater:
         self.backend = get_backend()
         self.fetcher = fetcher
         self.config = config.load_config()
+        # ids per resource tag known to exist in the backend, lets
+        # `create_obj` skip probing relations `_resolve_dangling` resolved,
+        # shared by the writer threads of `_update_concurrent`
+        self._known_ids: defaultdict[str, set[int | str]] = defaultdict(set)
+        self._known_ids_lock = threading.Lock()
+        # row digests of the resources being synced, by tag
+        self._digests: dict[str, DigestStore] = {}
+        # objects the many relations of the batch being written refer to,
+        # by resource tag, see `_sync.load_many_relations`
+        self._many_related: dict[str, dict] = {}
+        # checkpoints of the resources being synced, by tag
+        self._checkpoints: dict[str, dict] = {}
+        self._checkpoint_lock = threading.Lock()
+        # last_change per resource tag as of the start of `update_all`,
+        # dropped for a resource once it is written to
+        self._last_changes: dict[str, int | None] = {}
 
     # since_private watermark (#92)
     # Tracks, per (source URL, private resource), the last_change timestamp
@@ -82,6 +169,93 @@ class Updater:
             json.dump(data, f)
         os.replace(tmp, path)
 
+    # resume checkpoints
+    # While a resource is written, the id and `updated` timestamp of the last
+    # committed row are recorded after every committed chunk, along with the
+    # fetch cursor and save mode the sync started with. A sync interrupted
+    # partway through a resource picks it up from there: it fetches from the
+    # same cursor (a partially written table has a last_change that would skip
+    # rows) and, if the rows came in ascending id order, skips the ones up to
+    # the recorded id. Kept next to the since_private watermark, namespaced the
+    # same way, and removed once the resource is done.
+
+    def _checkpoint_path(self) -> str:
+        return os.path.join(self.fetcher.cache_dir, ".checkpoint.json")
+
+    def _load_checkpoints(self) -> dict:
+        try:
+            with open(self._checkpoint_path()) as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _get_checkpoint(self, tag: str) -> dict | None:
+        bucket = self._load_checkpoints().get(self.fetcher.url)
+        if not isinstance(bucket, dict):
+            return None
+        checkpoint = bucket.get(tag)
+        return checkpoint if isinstance(checkpoint, dict) else None
+
+    def _set_checkpoint(self, tag: str, checkpoint: dict | None) -> None:
+        # resources written concurrently share the file
+        with self._checkpoint_lock:
+            data = self._load_checkpoints()
+            bucket = data.get(self.fetcher.url)
+            if not isinstance(bucket, dict):
+                bucket = {}
+            if checkpoint is None:
+                if tag not in bucket:
+                    return
+                del bucket[tag]
+            else:
+                bucket[tag] = checkpoint
+            data[self.fetcher.url] = bucket
+
+            os.makedirs(self.fetcher.cache_dir, exist_ok=True)
+            path = self._checkpoint_path()
+            tmp = f"{path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp, path)
+
+    def _resume_checkpoint(self, res) -> dict | None:
+        """
+        Checkpoint of an interrupted sync of `res`, None if there is none or
+        the rows it recorded as committed are gone from the backend
+        """
+        checkpoint = self._get_checkpoint(res.tag)
+        if checkpoint is None:
+            return None
+        last_id = checkpoint.get("id")
+        if last_id is not None and not self.backend.existing_ids(
+            self.backend.get_concrete(res), [last_id]
+        ):
+            self._set_checkpoint(res.tag, None)
+            return None
+        return checkpoint
+
+    def _advance_checkpoint(self, res, rows: list) -> None:
+        """
+        Record that `rows` of the resource being synced are committed
+        """
+        checkpoint = self._checkpoints.get(res.tag)
+        if checkpoint is None or not rows:
+            return
+        for row in rows:
+            pk = row.get("id")
+            if checkpoint["ordered"] and isinstance(pk, int):
+                if checkpoint["id"] is None or pk > checkpoint["id"]:
+                    checkpoint["id"] = pk
+                else:
+                    # rows can't be skipped by id when resuming
+                    checkpoint["ordered"] = False
+                    checkpoint["id"] = None
+            updated = row.get("updated")
+            if isinstance(updated, str) and updated > (checkpoint["updated"] or ""):
+                checkpoint["updated"] = updated
+        self._set_checkpoint(res.tag, checkpoint)
+
     def copy_object(self, new):
         """
         Copies a new object to an existing one
@@ -120,78 +294,74 @@ class Updater:
                     if error != "This field cannot be blank.":
                         raise e
 
-    def create_obj(
-        self, row: dict[str, str | int | bool | list | dict], res: type
-    ) -> tuple[object, bool]:  # noqa: C901
+    def create_obj(  # noqa: C901
+        self,
+        row: dict[str, str | int | bool | list | dict],
+        res: type,
+        instance: object | None = None,
+    ) -> tuple[object, bool]:
         """
         Create a model instance from a row
         :param row: Object from API
         :param res: Resource to create
+        :param instance: Instance to update, looked up by the row's id if
+            not passed
         """
         _, dangling = extract_relations(self.backend, res, row)
         for resource, pks in dangling.items():
-            for pk in pks:
-                # Check if we have it
-                rel_obj = None
-                try:
-                    self.backend.get_object(self.backend.get_concrete(resource), pk)
-                except self.backend.object_missing_error(
-                    self.backend.get_concrete(resource)
-                ):
-                    # We dont have the dangling relationship, so we try to fetch it
-                    # from the api and create it.
+            unknown = self._unknown_ids(resource.tag, {int(pk) for pk in pks})
+            if not unknown:
+                continue
+            # Check which ones we have, with one query per resource
+            existing = self.backend.existing_ids(
+                self.backend.get_concrete(resource), unknown
+            )
+            for pk in unknown - existing:
+                # We dont have the dangling relationship, so we try to fetch it
+                # from the api and create it.
 
-                    self._log.info("Fetching dangling relationship %s %s", resource, pk)
-                    related_row = self.fetcher.get(resource.tag, int(pk))
+                self._log.info("Fetching dangling relationship %s %s", resource, pk)
+                related_row = self.fetcher.get(resource.tag, int(pk))
 
-                    # instantiate the relationship object
+                # instantiate the relationship object
 
-                    rel_obj, _ = self.create_obj(related_row, resource)
-                    try:
-                        self.clean_obj(rel_obj)
-                    except self.backend.validation_error() as e:
-                        self._log.error(
-                            "Failed to clean dangling object %s %s: %s", resource, pk, e
-                        )
-                        return None, False
+                rel_obj, _ = self.create_obj(related_row, resource)
+                try:
+                    self.clean_obj(rel_obj)
+                except self.backend.validation_error() as e:
+                    self._log.error(
+                        "Failed to clean dangling object %s %s: %s", resource, pk, e
+                    )
+                    return None, False
 
-                    # save the relationship object
+                # save the relationship object
 
-                    if rel_obj:
-                        self.backend.save(rel_obj)
+                if rel_obj:
+                    self.backend.save(rel_obj)
+                    self._last_changes.pop(resource.tag, None)
 
         # Initialize object
-        field_groups = group_fields(self.backend, self.backend.get_concrete(res))
+        res_plan = plan(self.backend, self.backend.get_concrete(res))
+        obj = instance
         try:
-            obj = self.backend.get_object(self.backend.get_concrete(res), row["id"])
+            if obj is None:
+                get_object = class_keyed(self.backend.get_object)
+                obj = get_object(self.backend.get_concrete(res), row["id"])
         except self.backend.object_missing_error(self.backend.get_concrete(res)):
             tbl = self.backend.get_concrete(res)
             obj = tbl()
 
-        # set_scalars
-        for fname, field in field_groups["scalars"].items():
-            value = row.get(fname, getattr(obj, fname, None))
-            value = self.backend.convert_field(obj.__class__, fname, value)
-
-            # TODO: datetimes are strings for some reason
-            if (
-                fname in ["created", "updated", "rir_status_updated", "ixf_last_import"]
-                and isinstance(value, str)
-            ) or (getattr(obj, "tzinfo", None) is not None):
-                value = datetime.fromisoformat(value.rstrip("Z"))
-            # elif (isinstance(value, str) and "T" in value and
-            #       "Z" in value and "-" in value):
-            #     print("NOT DATETIME", fname, value, type(value))
-
-            # Remove timezone info
-            if isinstance(value, datetime):
-                value = value.replace(tzinfo=None)
-
+        # set_scalars, batches are converted up front by `ResourcePlan.convert`
+        scalars = row if isinstance(row, ConvertedRow) else res_plan.convert_row(row)
+        debug = self._log.isEnabledFor(logging.DEBUG)
+        for fname in res_plan.scalars:
+            value = scalars.get(fname, getattr(obj, fname, None))
             setattr(obj, fname, value)
-            self._log.debug("  %s: %s (%s)", fname, value, type(value))
+            if debug:
+                self._log.debug("  %s: %s (%s)", fname, value, type(value))
 
         set_single_relations(self.backend, res, obj, row)
-        set_many_relations(self.backend, res, obj, row)
+        set_many_relations(self.backend, res, obj, row, self._many_related.get(res.tag))
 
         try:
             self.clean_obj(obj)
@@ -204,34 +374,146 @@ class Updater:
 
         return obj, False
 
+    def _unknown_ids(self, tag: str, pks: set[int]) -> set[int]:
+        """
+        The primary keys of `pks` not known to exist in the backend
+        """
+        with self._known_ids_lock:
+            return pks - self._known_ids.get(tag, set())
+
+    def _add_known_ids(self, tag: str, pks: Iterable[int | str]) -> None:
+        """
+        Remember primary keys that exist in the backend
+        """
+        with self._known_ids_lock:
+            self._known_ids[tag].update(pks)
+
+    def _collect_dangling(
+        self, res, entries: list, wanted: defaultdict[type, set[int]]
+    ) -> None:
+        """
+        Add the dangling relations of `entries` to `wanted`
+        """
+        for row in entries:
+            _, dangling = extract_relations(self.backend, res, row)
+            for resource, pks in dangling.items():
+                wanted[resource].update(int(pk) for pk in pks)
+
+    def _resolve_dangling(self, entries: list, res) -> None:
+        """
+        Create the objects a batch of rows refers to that are missing from the
+        backend, ahead of the rows themselves.
+
+        Existence is checked with one query per resource and missing objects
+        are fetched with `id__in` requests instead of one request per id.
+        Fetched rows can have dangling relations of their own, so this repeats
+        until no new ids turn up, then creates everything in resource
+        (dependency) order. Anything that could not be fetched or created is
+        left to the per-row fallback in `create_obj`.
+        :param entries: List of objects from API
+        :param res: Resource of the entries
+        """
+        wanted: defaultdict[type, set[int]] = defaultdict(set)
+        self._collect_dangling(res, entries, wanted)
+        seen: defaultdict[str, set[int]] = defaultdict(set)
+        fetched: defaultdict[type, list] = defaultdict(list)
+
+        while wanted:
+            current, wanted = wanted, defaultdict(set)
+            for resource, pks in current.items():
+                pks = self._unknown_ids(resource.tag, pks) - seen[resource.tag]
+                if not pks:
+                    continue
+                seen[resource.tag].update(pks)
+                concrete = self.backend.get_concrete(resource)
+                existing = self.backend.existing_ids(concrete, pks)
+                self._add_known_ids(resource.tag, existing)
+                missing = pks - existing
+                if not missing:
+                    continue
+                self._log.info(
+                    "Fetching %d dangling relationships %s", len(missing), resource
+                )
+                rows = self.fetcher.get_many(resource.tag, missing)
+                fetched[resource].extend(rows)
+                self._collect_dangling(resource, rows, wanted)
+
+        order = list(RESOURCES_BY_TAG)
+        for resource in sorted(fetched, key=lambda r: order.index(r.tag)):
+            self._last_changes.pop(resource.tag, None)
+            rows = plan(self.backend, self.backend.get_concrete(resource)).convert(
+                fetched[resource]
+            )
+            with _CommitBatch(self.backend, self._commit_every()) as batch:
+                for row in rows:
+                    try:
+                        with batch.row():
+                            obj, _ = self.create_obj(row, resource)
+                            self.backend.save(obj)
+                        self._add_known_ids(resource.tag, [cast(int, row["id"])])
+                    except Exception as e:
+                        obj_id = cast("int | str", row.get("id", "Unknown"))
+                        self._log.info(
+                            f"Error creating dangling {resource.tag} "
+                            f"with id {obj_id}: {e}"
+                        )
+                        log_error(self.config, resource.tag, obj_id, str(e))
+                    batch.written()
+
     def _handle_initial_sync(self, entries: list, res):
         """
         Called during the first sync of a resource
 
-        This will do a batch create of all objects in the resource
+        This will do a batch create of the objects of one batch (see
+        `_batches`) in a single transaction
         :param entries: List of objects from API
         :param res: Resource to sync
         """
 
-        objs = []
-        for row in entries:
+        concrete = self.backend.get_concrete(res)
+        self.backend.bulk_create(
+            concrete, self._initial_objects(entries, res), len(entries)
+        )
+
+    def _initial_objects(self, entries: list, res) -> Iterator[object]:
+        """
+        Build the objects of an initial sync batch, rows that fail are logged
+        and skipped
+
+        A repeated id would fail the bulk insert of its whole chunk, only the
+        last row of an id is kept.
+        """
+        ids = [entry.get("id") for entry in entries]
+        last = {pk: idx for idx, pk in enumerate(ids) if pk is not None}
+        entries = [
+            entry
+            for idx, (entry, pk) in enumerate(zip(entries, ids))
+            if pk is None or last[pk] == idx
+        ]
+        res_plan = plan(self.backend, self.backend.get_concrete(res))
+        for row in res_plan.convert(entries):
             try:
                 obj, _ = self.create_obj(row, res)
-                objs.append(obj)
             except self.backend.object_missing_error(self.backend.get_concrete(res)):
                 try:
                     obj, _ = self.create_obj(row, res)
                     self.backend.save(obj)
+                    self._confirm_written(res, row.get("id"))
                 except Exception as e:
                     obj_id = row.get("id", "Unknown")
                     self._log.info(f"Error creating {res.tag} with id {obj_id}: {e}")
                     log_error(self.config, res.tag, row.get("id", "Unknown"), str(e))
+                continue
             except Exception as e:
                 obj_id = row.get("id", "Unknown")
                 self._log.info(f"Error updating {res.tag} with id {obj_id}: {e}")
                 log_error(self.config, res.tag, row.get("id", "Unknown"), str(e))
-
-        self.backend.get_concrete(res).objects.bulk_create(objs)
+                continue
+            if obj is not None:
+                # not saved yet, a failing chunk aborts the resource and
+                # its digests are never written
+                self._confirm_written(res, row.get("id"))
+                yield obj
 
     def _lookback(self) -> int:
         """
@@ -265,12 +547,14 @@ class Updater:
             timestamp is missing/unparseable on either side.
         """
         raw = row.get("updated")
-        if not raw or not isinstance(raw, str):
+        if not raw or not isinstance(raw, (str, datetime)):
             return None
         try:
-            remote = datetime.fromisoformat(raw.rstrip("Z")).replace(tzinfo=None)
+            remote = parse_datetime(raw)
         except ValueError:
             return None
+        if not isinstance(remote, datetime):
+            return None
         local = getattr(old, "updated", None)
         if local is None:
             return None
@@ -288,9 +572,7 @@ class Updater:
         FK ids) — breaks an `updated` tie the whole-second API timestamp can't
         resolve (#135). Biased to True on uncomparable fields (never skip a change).
         """
-        for field in self.backend.get_fields(new.__class__):
-            if not getattr(field, "concrete", False):
-                continue
+        for field in plan(self.backend, new.__class__).columns:
             name = getattr(field, "attname", field.name)  # *_id for FKs
             if name in ("created", "updated"):
                 continue
@@ -311,21 +593,105 @@ class Updater:
         cmp = self._compare_updated(row, old)
         if cmp == -1:
             return None
-        # `old` and this obj must be distinct instances: create_obj re-fetches and
-        # mutates its own copy. Holds for django_peeringdb (get_object returns a
-        # fresh instance, no identity map); a memoizing backend would make `old`
-        # already-mutated and break the same-second content tie-break below.
-        obj, _ = self.create_obj(row, res)
+        # `old` and this obj must be distinct instances: create_obj mutates the
+        # instance it is given, so it gets a copy of `old` (saving a lookup of
+        # the same row); otherwise the same-second content tie-break below
+        # would compare `old` against itself.
+        obj, _ = self.create_obj(row, res, instance=copy.copy(old))
         if cmp == 0 and not self._content_differs(obj, old):
             return None
         return obj
 
+    def _digest_store(self, res) -> DigestStore | None:
+        """
+        Load the row digests of a resource, None if they are disabled
+        (PDB_SYNC_DIGESTS)
+        """
+        sync = self.config.get("sync", {}) if isinstance(self.config, dict) else {}
+        try:
+            enabled = int(sync.get("digests", 1))
+        except (TypeError, ValueError):
+            enabled = 1
+        if not enabled:
+            return None
+        # namespaced by the API URL, like the since_private watermark
+        namespace = hashlib.sha256(self.fetcher.url.encode()).hexdigest()[:16]
+        path = os.path.join(
+            self.fetcher.cache_dir, ".digests", f"{namespace}-{res.tag}.pickle"
+        )
+        concrete = self.backend.get_concrete(res)
+        return DigestStore(
+            path,
+            fields(plan(self.backend, concrete)),
+            self.backend.last_change(concrete),
+        )
+
+    def _confirm_written(self, res, pk) -> None:
+        """
+        Record the digest of a row that is stored in the backend now
+        """
+        store = self._digests.get(res.tag)
+        if store is not None and pk is not None:
+            store.confirm(pk)
+
+    def _existing_objects(self, concrete: type, entries: list) -> dict:
+        """
+        Stored objects for the ids of a batch of rows, keyed by id
+        """
+        ids = {row["id"] for row in entries if row.get("id") is not None}
+        return self.backend.get_objects_map(concrete, ids)
+
+    def _upsert_fields(self, concrete: type) -> list[str]:
+        """
+        Fields written when updating objects of `concrete` in bulk
+        """
+        return [
+            field.name
+            for field in plan(self.backend, concrete).columns
+            if not getattr(field, "primary_key", False)
+        ]
+
+    def _write_changed(self, res, objs: list) -> int:
+        """
+        Write changed objects of a batch with a single bulk upsert. If that
+        fails they are written one by one through `copy_object`, so a bad
+        object only fails itself.
+        :returns: number of objects written
+        """
+        if not objs:
+            return 0
+        concrete = self.backend.get_concrete(res)
+        try:
+            with self.backend.atomic_transaction():
+                self.backend.bulk_upsert(concrete, objs, self._upsert_fields(concrete))
+            for obj in objs:
+                self._confirm_written(res, obj.id)
+            return len(objs)
+        except Exception as e:
+            self._log.debug(
+                "[%s] Bulk update failed, retrying per object: %s", res.tag, e
+            )
+
+        written = 0
+        for obj in objs:
+            try:
+                with self.backend.atomic_transaction():
+                    self.copy_object(obj)
+                self._confirm_written(res, obj.id)
+                written += 1
+            except Exception as e:
+                self._log.info(f"Error updating {res.tag} with id {obj.id}: {e}")
+                log_error(self.config, res.tag, obj.id, str(e))
+        return written
+
     def _handle_incremental_sync(self, entries: list, res):
         """
         Apply an incremental sync: create/update changed objects, skip unchanged.
 
         The lookback window (see `_since_param`) re-fetches rows we already have;
         `_changed_obj` filters those out so they aren't re-written (#135).
+        The stored objects of the batch are looked up with one query and the
+        changed ones written with one bulk upsert (see `_write_changed`).
 
         :param entries: List of objects from API
         :param res: Resource to sync
@@ -333,32 +699,200 @@ class Updater:
         """
 
         concrete = self.backend.get_concrete(res)
-        created = updated = unchanged = 0
-        for row in entries:
-            try:
-                old = self.backend.get_object(concrete, row["id"])
-                obj = self._changed_obj(row, res, old)
-                if obj is None:
-                    unchanged += 1
+        entries = plan(self.backend, concrete).convert(entries)
+        existing = self._existing_objects(concrete, entries)
+        created = unchanged = 0
+        changed = {}
+        with _CommitBatch(self.backend, self._commit_every()) as batch:
+            for row in entries:
+                old = existing.get(row.get("id"))
+                if old is None:
+                    created += self._create_row(batch, row, res)
                     continue
-                self.copy_object(obj)
-                updated += 1
-            except self.backend.object_missing_error(concrete):
                 try:
-                    obj, _ = self.create_obj(row, res)
-                    self.backend.save(obj)
-                    created += 1
+                    obj = self._changed_obj(row, res, old)
+                    if obj is None:
+                        self._confirm_written(res, row.get("id"))
+                        unchanged += 1
+                        continue
+                    # a row repeated within the batch is written once, last wins
+                    changed[obj.id] = obj
                 except Exception as e:
                     obj_id = row.get("id", "Unknown")
-                    self._log.info(f"Error creating {res.tag} with id {obj_id}: {e}")
+                    self._log.info(f"Error updating {res.tag} with id {obj_id}: {e}")
                     log_error(self.config, res.tag, row.get("id", "Unknown"), str(e))
-            except Exception as e:
-                obj_id = row.get("id", "Unknown")
-                self._log.info(f"Error updating {res.tag} with id {obj_id}: {e}")
-                log_error(self.config, res.tag, row.get("id", "Unknown"), str(e))
 
+            updated = self._write_changed(res, list(changed.values()))
         return {"created": created, "updated": updated, "unchanged": unchanged}
 
+    def _create_row(self, batch: _CommitBatch, row: dict, res) -> int:
+        """
+        Create the object of a row that isn't stored yet, failures are rolled
+        back and logged without affecting the rest of the batch
+        :returns: number of objects created
+        """
+        try:
+            with batch.row():
+                obj, _ = self.create_obj(row, res)
+                self.backend.save(obj)
+            self._confirm_written(res, row.get("id"))
+            return 1
+        except Exception as e:
+            obj_id = row.get("id", "Unknown")
+            self._log.info(f"Error creating {res.tag} with id {obj_id}: {e}")
+            log_error(self.config, res.tag, obj_id, str(e))
+            return 0
+        finally:
+            batch.written()
+
+    def _sync_cursor(
+        self, res, since: int | None, fetch_private: bool
+    ) -> tuple[int | None, int | None, bool]:
+        """
+        Work out where a resource's sync starts.
+
+        :returns: (`_since`, the DB-state cursor that decides the save mode;
+            `fetch_since`, the base of the fetch window before lookback;
+            whether this is a private fetch)
+        """
+        if since is None:
+            last = self._last_change(res)
+            _since = last if isinstance(last, int) else None
+        else:
+            _since = since
+
+        is_private = fetch_private and res.tag in PRIVATE_OBJECTS
+
+        # Private objects (poc, ixlan) fetch incrementally from their OWN
+        # watermark (since_private), not the public last_change: a non-private
+        # sync advances last_change (and can null out private fields) without
+        # private data having been re-fetched, so keying off last_change would
+        # skip those rows. The watermark is None until the first private fetch,
+        # which then grabs everything. Only consult it when the DB already has
+        # data — an empty DB always full-fetches, so a stale watermark (e.g.
+        # after a DB wipe) can never truncate the sync into an empty table.
+        if is_private and since is None and _since:
+            fetch_since = self._get_since_private(res.tag)
+        else:
+            fetch_since = _since
+
+        # An interrupted sync continues from the cursor it started with, the
+        # rows it committed moved last_change past rows it didn't get to.
+        checkpoint = self._resume_checkpoint(res) if since is None else None
+        if checkpoint is not None:
+            fetch_since = checkpoint.get("since")
+            if checkpoint.get("initial") and checkpoint.get("ordered"):
+                # the rest of the rows is new, keep inserting in bulk
+                _since = None
+
+        return _since, fetch_since, is_private
+
+    def _last_change(self, res) -> int | None:
+        """
+        `last_change` of a resource, taken from the ones `update_all` looked
+        up for all resources at once until the resource is written to
+        """
+        if res.tag in self._last_changes:
+            return self._last_changes[res.tag]
+        return self.backend.last_change(self.backend.get_concrete(res))
+
+    def _prefetch(self) -> int:
+        """
+        Number of resources downloaded ahead of the one being written
+        (PDB_SYNC_PREFETCH), also the size of the download worker pool.
+        0 disables the prefetch stage, as does streaming mode where a
+        download is only made while its rows are being consumed.
+        """
+        if getattr(self.fetcher, "stream", False):
+            return 0
+        sync = self.config.get("sync", {}) if isinstance(self.config, dict) else {}
+        try:
+            return max(int(sync.get("prefetch", 4)), 0)
+        except (TypeError, ValueError):
+            return 4
+
+    def _batch_size(self) -> int:
+        """
+        Number of rows per batch of a resource, see `_batches`, and so
+        objects per bulk insert of an initial sync (PDB_SYNC_BATCH_SIZE),
+        always at least 1.
+        """
+        sync = self.config.get("sync", {}) if isinstance(self.config, dict) else {}
+        try:
+            return max(int(sync.get("batch_size", 1000)), 1)
+        except (TypeError, ValueError):
+            return 1000
+
+    def _write_workers(self) -> int:
+        """
+        Number of resources written concurrently (PDB_SYNC_WRITE_WORKERS),
+        1 writes them one after another. Only applies to backends that
+        support concurrent writes.
+        """
+        sync = self.config.get("sync", {}) if isinstance(self.config, dict) else {}
+        try:
+            return max(int(sync.get("write_workers", 1)), 1)
+        except (TypeError, ValueError):
+            return 1
+
+    def _commit_every(self) -> int:
+        """
+        Rows written per transaction in incremental syncs
+        (PDB_SYNC_COMMIT_EVERY), 0 commits once per resource or batch
+        """
+        sync = self.config.get("sync", {}) if isinstance(self.config, dict) else {}
+        try:
+            return max(int(sync.get("commit_every", 1000)), 0)
+        except (TypeError, ValueError):
+            return 1000
+
+    def _batches(self, entries) -> Iterator[list]:
+        """
+        Split fetched entries into the batches the sync handlers process.
+
+        Loaded and streamed resources alike are handled in batches of
+        `_batch_size` rows, this is the only place rows are chunked. Each
+        batch is converted, written and checkpointed as a whole, an initial
+        sync inserts it in one transaction. A resource without rows is
+        handled as one empty batch.
+        """
+        empty = True
+        for batch in chunked(entries, self._batch_size()):
+            empty = False
+            yield batch
+        if empty:
+            yield []
+
+    def _prefetch_window(
+        self,
+        pool: ThreadPoolExecutor,
+        pending: dict[str, Future],
+        window: list[type],
+        since: int | None,
+        skip: list[str] | None,
+        fetch_private: bool,
+    ):
+        """
+        Start background downloads for the resources in `window`.
+
+        Only the fetch runs on the pool, database access (the cursor lookup here
+        and all writes) stays on the calling thread. Cursors computed ahead of
+        time can only lag behind the write-time ones, so a prefetched window is
+        always a superset of what a serial fetch would have returned.
+        """
+        for res in window:
+            if res.tag in pending or res.tag in self.fetcher.resources:
+                continue
+            if skip and res.tag in skip:
+                continue
+            _, fetch_since, _ = self._sync_cursor(res, since, fetch_private)
+            pending[res.tag] = pool.submit(
+                self.fetcher.load,
+                res.tag,
+                self._since_param(fetch_since),
+                fetch_private=fetch_private,
+            )
+
     def update_all(
         self,
         rs: list[type],
@@ -371,85 +905,271 @@ class Updater:
         :param rs: List of resources to update
         :param since: Unix timestamp of last update
         :param skip: List of resource tags to skip
+
+        Downloads run ahead on a bounded worker pool (see `_prefetch`) while
+        the writes stay serial in the order of `rs`.
         """
 
-        for res in rs:
-            if skip is not None:
-                for i in skip:
-                    self.fetcher.load(i, since)
+        rs = list(rs)
+        with self._known_ids_lock:
+            self._known_ids.clear()
+        # one lookup for the cursors of all resources, see `_last_change`
+        self._last_changes = self.backend.last_change_all()
+        try:
+            return self._update_all(rs, since, skip, fetch_private)
+        finally:
+            self._last_changes = {}
 
-            if skip and res.tag in skip:
-                self._log.info("[%s] Skipping", res.tag)
-                continue
+    def _update_all(
+        self,
+        rs: list[type],
+        since: int | None,
+        skip: list[str] | None,
+        fetch_private: bool,
+    ):
+        """
+        `update_all` once the cursors of the resources are looked up
+        """
+        writers = self._write_workers()
+        if writers > 1:
+            if self.backend.supports_concurrent_writes():
+                return self._update_concurrent(rs, since, skip, fetch_private, writers)
+            self._log.warning(
+                "Backend does not support concurrent writes, writing serially"
+            )
 
-            if since is None:
-                last = self.backend.last_change(self.backend.get_concrete(res))
-                _since = last if isinstance(last, int) else None
-            else:
-                _since = since
-
-            is_private = fetch_private and res.tag in PRIVATE_OBJECTS
-
-            # Private objects (poc, ixlan) fetch incrementally from their OWN
-            # watermark (since_private), not the public last_change: a non-private
-            # sync advances last_change (and can null out private fields) without
-            # private data having been re-fetched, so keying off last_change would
-            # skip those rows. The watermark is None until the first private fetch,
-            # which then grabs everything. Only consult it when the DB already has
-            # data — an empty DB always full-fetches, so a stale watermark (e.g.
-            # after a DB wipe) can never truncate the sync into an empty table.
-            if is_private and since is None and _since:
-                fetch_since = self._get_since_private(res.tag)
-            else:
-                fetch_since = _since
-
-            # The #135 lookback applies to whichever base we picked above (public
-            # last_change or the private watermark): _since_param rewinds by
-            # PDB_SYNC_LOOKBACK so a boundary-second change isn't skipped, and the
-            # change detection in _handle_incremental_sync drops the rows the
-            # widened window re-fetches. None -> full fetch (first private pull).
-            self.fetcher.load(
+        workers = self._prefetch()
+        pool = ThreadPoolExecutor(max_workers=workers) if workers else None
+        pending: dict[str, Future] = {}
+        try:
+            for idx, res in enumerate(rs):
+                if pool is not None:
+                    self._prefetch_window(
+                        pool,
+                        pending,
+                        rs[idx : idx + workers],
+                        since,
+                        skip,
+                        fetch_private,
+                    )
+                self._update_resource(res, since, skip, fetch_private, pending)
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+
+    def _update_concurrent(
+        self,
+        rs: list[type],
+        since: int | None,
+        skip: list[str] | None,
+        fetch_private: bool,
+        writers: int,
+    ):
+        """
+        Update resources on a pool of `writers` threads, starting each one as
+        soon as the resources it references are written. Resources that do
+        not depend on each other (e.g. the carrier and the ixlan subtrees) are
+        written at the same time, each thread fetching its own downloads.
+        """
+        remaining = dependency_graph(self.backend, rs)
+        running: dict[Future, type] = {}
+        pool = ThreadPoolExecutor(max_workers=writers)
+        try:
+            while remaining or running:
+                for res in [res for res, deps in remaining.items() if not deps]:
+                    del remaining[res]
+                    future = pool.submit(
+                        self._update_resource_thread, res, since, skip, fetch_private
+                    )
+                    running[future] = res
+                if not running:
+                    raise ValueError(f"Dependency cycle between {list(remaining)}")
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    res = running.pop(future)
+                    future.result()
+                    for deps in remaining.values():
+                        deps.discard(res)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _update_resource_thread(
+        self, res, since: int | None, skip: list[str] | None, fetch_private: bool
+    ):
+        """
+        `_update_resource` on a writer thread of `_update_concurrent`
+        """
+        try:
+            self._update_resource(res, since, skip, fetch_private, {})
+        finally:
+            self.backend.close_connection()
+
+    def _update_resource(
+        self,
+        res,
+        since: int | None,
+        skip: list[str] | None,
+        fetch_private: bool,
+        pending: dict[str, Future],
+    ):
+        """
+        Fetch and write a single resource as part of `update_all`
+        """
+        if skip is not None:
+            for i in skip:
+                self.fetcher.load(i, since)
+
+        if skip and res.tag in skip:
+            self._log.info("[%s] Skipping", res.tag)
+            return
+
+        future = pending.pop(res.tag, None)
+        if future is not None:
+            # surface download errors in resource order, as a serial fetch would
+            future.result()
+
+        _since, fetch_since, is_private = self._sync_cursor(res, since, fetch_private)
+        self._last_changes.pop(res.tag, None)
+
+        # The #135 lookback applies to whichever base _sync_cursor picked (public
+        # last_change or the private watermark): _since_param rewinds by
+        # PDB_SYNC_LOOKBACK so a boundary-second change isn't skipped, and the
+        # change detection in _handle_incremental_sync drops the rows the
+        # widened window re-fetches. None -> full fetch (first private pull).
+        # A no-op if the prefetch stage already downloaded the resource.
+        self.fetcher.load(
+            res.tag,
+            self._since_param(fetch_since),
+            fetch_private=fetch_private,
+        )
+        entries = self.fetcher.entries(res.tag)
+
+        resume = self._get_checkpoint(res.tag) if since is None else None
+        if resume is not None:
+            self._log.info(
+                "[%s] Resuming interrupted sync after id %s", res.tag, resume.get("id")
+            )
+            checkpoint = dict(resume)
+        else:
+            checkpoint = {
+                "since": fetch_since,
+                "initial": not _since,
+                "id": None,
+                "updated": None,
+                "ordered": True,
+            }
+        self._checkpoints[res.tag] = checkpoint
+        # recorded before the first write, see `_advance_checkpoint`
+        self._set_checkpoint(res.tag, checkpoint)
+
+        # Save mode is decided by DB state (last_change), not the fetch window,
+        # so a first private pull over an already-populated DB still does a
+        # full fetch but an incremental (upsert) save — no bulk_create clash.
+        try:
+            fetched, counts = self._write_batches(res, entries, _since, resume)
+        finally:
+            self._checkpoints.pop(res.tag, None)
+        self._set_checkpoint(res.tag, None)
+
+        # Rows returned by the API/cache; for incremental syncs the lookback
+        # window can make this exceed the number of actual changes (#135), so
+        # it is logged at debug while the INFO line below reports real work.
+        self._log.debug("[%s] Fetched %d objects", res.tag, fetched)
+
+        if not _since:
+            self._log.info("[%s] Processed %d objects", res.tag, fetched)
+        else:
+            # Report actual changes, not fetched rows, so the count is
+            # idempotent: a re-run that changes nothing reads "Processed 0".
+            self._log.info(
+                "[%s] Processed %d objects (%d created, %d updated, %d unchanged)",
                 res.tag,
-                self._since_param(fetch_since),
-                fetch_private=fetch_private,
+                counts["created"] + counts["updated"],
+                counts["created"],
+                counts["updated"],
+                counts["unchanged"],
+            )
+
+        # Advance the watermark only on the automatic path. An explicit
+        # --since N is a manual override that may skip private rows in
+        # (watermark, N]; advancing the watermark past them would make a
+        # later default sync resume beyond un-fetched rows and never recover.
+        if is_private and since is None:
+            # Record where this private pull reached so the next private sync
+            # resumes from here. Read after the save, so it's server-authored
+            # (no client clock skew) and reuses the existing last_change logic.
+            reached = self.backend.last_change(self.backend.get_concrete(res))
+            self._set_since_private(
+                res.tag, reached if isinstance(reached, int) else None
             )
-            entries = self.fetcher.entries(res.tag)
-            # Rows returned by the API/cache; for incremental syncs the lookback
-            # window can make this exceed the number of actual changes (#135), so
-            # it is logged at debug while the INFO line below reports real work.
-            self._log.debug("[%s] Fetched %d objects", res.tag, len(entries))
-
-            # Save mode is decided by DB state (last_change), not the fetch window,
-            # so a first private pull over an already-populated DB still does a
-            # full fetch but an incremental (upsert) save — no bulk_create clash.
+
+    def _write_batches(
+        self, res, entries, _since, resume: dict | None = None
+    ) -> tuple[int, dict[str, int]]:
+        """
+        Write the rows of a resource batch by batch, rows whose digest shows
+        they are unchanged are dropped first
+        :param resume: checkpoint of an interrupted sync to continue
+        :returns: number of rows fetched and the counts of the writes
+        """
+        fetched = 0
+        counts = {"created": 0, "updated": 0, "unchanged": 0}
+        store = None
+        try:
+            for batch in self._batches(entries):
+                fetched += len(batch)
+                if resume is not None and batch:
+                    batch = self._resume_rows(res, batch, resume, _since)
+                    if not batch:
+                        continue
+                if batch and store is None:
+                    store = self._digest_store(res)
+                    if store is not None:
+                        self._digests[res.tag] = store
+                if store is not None:
+                    # rows identical to what this client wrote before
+                    batch, skipped = store.filter(batch)
+                    counts["unchanged"] += skipped
+                    if skipped and not batch:
+                        continue
+                self._write_batch(res, batch, _since, counts)
+            if store is not None:
+                store.save(self.backend.last_change(self.backend.get_concrete(res)))
+        finally:
+            self._digests.pop(res.tag, None)
+        return fetched, counts
+
+    def _write_batch(self, res, batch: list, _since, counts: dict[str, int]) -> None:
+        self._resolve_dangling(batch, res)
+        if batch and plan(self.backend, self.backend.get_concrete(res)).many_refs:
+            self._many_related[res.tag] = load_many_relations(self.backend, res, batch)
+        try:
             if not _since:
-                self._handle_initial_sync(entries, res)
-                self._log.info("[%s] Processed %d objects", res.tag, len(entries))
+                self._handle_initial_sync(batch, res)
             else:
-                counts = self._handle_incremental_sync(entries, res)
-                # Report actual changes, not fetched rows, so the count is
-                # idempotent: a re-run that changes nothing reads "Processed 0".
-                self._log.info(
-                    "[%s] Processed %d objects (%d created, %d updated, %d unchanged)",
-                    res.tag,
-                    counts["created"] + counts["updated"],
-                    counts["created"],
-                    counts["updated"],
-                    counts["unchanged"],
-                )
+                for key, value in self._handle_incremental_sync(batch, res).items():
+                    counts[key] += value
+        finally:
+            self._many_related.pop(res.tag, None)
+        self._advance_checkpoint(res, batch)
 
-            # Advance the watermark only on the automatic path. An explicit
-            # --since N is a manual override that may skip private rows in
-            # (watermark, N]; advancing the watermark past them would make a
-            # later default sync resume beyond un-fetched rows and never recover.
-            if is_private and since is None:
-                # Record where this private pull reached so the next private sync
-                # resumes from here. Read after the save, so it's server-authored
-                # (no client clock skew) and reuses the existing last_change logic.
-                reached = self.backend.last_change(self.backend.get_concrete(res))
-                self._set_since_private(
-                    res.tag, reached if isinstance(reached, int) else None
-                )
+    def _resume_rows(self, res, batch: list, resume: dict, _since) -> list:
+        """
+        Drop the rows of a batch an interrupted sync already committed
+        """
+        last_id = resume.get("id")
+        if last_id is not None and resume.get("ordered"):
+            batch = [row for row in batch if row.get("id", last_id + 1) > last_id]
+        if _since or not batch or resume.get("checked"):
+            return batch
+        # Inserting in bulk again, the interruption may have come between
+        # committing a chunk and recording it. Only once, later rows are new.
+        resume["checked"] = True
+        existing = self.backend.existing_ids(
+            self.backend.get_concrete(res),
+            {row["id"] for row in batch if "id" in row},
+        )
+        return [row for row in batch if row.get("id") not in existing]
 
     def update_one(self, res, pk: int, depth=0):
         """
@@ -467,11 +1187,39 @@ class Updater:
             )
 
         row = self.fetcher.get(res.tag, pk, depth=0, force_fetch=True)
+        # relations created along the way are committed with the object
+        with self.backend.atomic_transaction():
+            self._update_row(row, res)
+
+    def update_many(self, res, pks) -> set[int]:
+        """
+        Update several objects of a resource, fetching them with `id__in`
+        queries instead of one request per object
+        :param res: Resource to update
+        :param pks: Primary keys of the objects to update
+        :return: primary keys of the objects updated
+        """
+        updated: set[int] = set()
+        rows = self.fetcher.get_many(res.tag, pks)
+        with _CommitBatch(self.backend, self._commit_every()) as batch:
+            for row in rows:
+                try:
+                    with batch.row():
+                        self._update_row(row, res)
+                    updated.add(cast(int, row["id"]))
+                except Exception as e:
+                    obj_id = row.get("id", "Unknown")
+                    self._log.info(f"Error updating {res.tag} with id {obj_id}: {e}")
+                batch.written()
+        return updated
+
+    def _update_row(self, row: dict, res) -> None:
         # create object instance (unsaved)
         obj, _ = self.create_obj(row, res)
         try:
             # attempt update existing instance of object (if exists, will save)
-            self.copy_object(obj)
+            with self.backend.atomic_transaction():
+                self.copy_object(obj)
         except self.backend.object_missing_error(self.backend.get_concrete(res)):
             # object does not exist, create object instance and save as
             # new object
@@ -1,35 +1,94 @@
 import inspect
-from collections.abc import Callable, Sequence
+from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
+from contextlib import AbstractContextManager
 from functools import wraps
+from itertools import islice
+from typing import Any, TypeVar, cast
 
 from peeringdb.resource import RESOURCES_BY_TAG
 
+# lookup table per argument that may be passed as a reftag
+_REFTAG_TABLES = {"concrete": "REFTAG_CONCRETE", "resource": "REFTAG_RESOURCE"}
 
-def reftag_to_cls(fn: Callable[..., object]) -> Callable[..., object]:
+_F = TypeVar("_F", bound=Callable[..., Any])
+
+
+def reftag_to_cls(fn: _F) -> _F:
     """
     decorator that checks function arguments for `concrete` and `resource`
     and will properly set them to class references if a string (reftag) is
     passed as the value
+
+    The positions of those arguments are worked out once, so a call that
+    passes classes only costs a type check per argument. The undecorated
+    function is available through `class_keyed`.
     """
-    spec = inspect.getfullargspec(fn)
-    names, _ = spec.args, spec.defaults
+    names = inspect.getfullargspec(fn).args
+    # (position, name, lookup table), the backend itself is args[0]
+    targets = tuple(
+        (i, name, _REFTAG_TABLES[name])
+        for i, name in enumerate(names)
+        if i and name in _REFTAG_TABLES
+    )
+    if not targets:
+        return fn
+    if len(targets) == 1:
+        wrapped = _reftag_wrapper(fn, *targets[0])
+    else:
+        wrapped = _reftags_wrapper(fn, targets)
+    wrapped._class_keyed = fn
+    return cast(_F, wrapped)
+
+
+def _reftag_wrapper(
+    fn: Callable[..., object], pos: int, name: str, table: str
+) -> Callable[..., object]:
+    @wraps(fn)
+    def wrapped(*args: object, **kwargs: object) -> object:
+        if len(args) > pos:
+            value = args[pos]
+            if isinstance(value, str):
+                args = (*args[:pos], getattr(args[0], table)[value], *args[pos + 1 :])
+        elif isinstance(kwargs.get(name), str):
+            kwargs[name] = getattr(args[0], table)[kwargs[name]]
+        return fn(*args, **kwargs)
+
+    return wrapped
 
+
+def _reftags_wrapper(
+    fn: Callable[..., object], targets: tuple[tuple[int, str, str], ...]
+) -> Callable[..., object]:
     @wraps(fn)
     def wrapped(*args: object, **kwargs: object) -> object:
-        args_list = list(args)
-        backend = args_list[0]
-        for i, name in enumerate(names[1:], 1):
-            if i < len(args_list):
-                value = args_list[i]
-                if name == "concrete" and isinstance(value, str):
-                    args_list[i] = backend.REFTAG_CONCRETE[value]
-                elif name == "resource" and isinstance(value, str):
-                    args_list[i] = backend.REFTAG_RESOURCE[value]
-        return fn(*args_list, **kwargs)
+        converted = None
+        for pos, name, table in targets:
+            if len(args) > pos:
+                if isinstance(args[pos], str):
+                    if converted is None:
+                        converted = list(args)
+                    converted[pos] = getattr(args[0], table)[args[pos]]
+            elif isinstance(kwargs.get(name), str):
+                kwargs[name] = getattr(args[0], table)[kwargs[name]]
+        if converted is not None:
+            args = tuple(converted)
+        return fn(*args, **kwargs)
 
     return wrapped
 
 
+def class_keyed(method: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    The variant of a bound backend method decorated with `reftag_to_cls`
+    that takes classes only and skips the reftag check, for internals that
+    call it for every row. Other callables are returned as they are.
+    """
+    fn = getattr(getattr(method, "__func__", None), "_class_keyed", None)
+    if fn is None:
+        return method
+    return fn.__get__(method.__self__)
+
+
 class Field:
     """
     We use this to provide field instances to backends that
@@ -163,8 +222,7 @@ class Interface(Base):
         """
         return Exception
 
-    @classmethod
-    def atomic_transaction(cls) -> EmptyContext:
+    def atomic_transaction(self) -> AbstractContextManager[Any]:
         """
         Allows you to return an atomic transaction context
         if your backend supports it, if it does not, leave as is
@@ -177,6 +235,27 @@ class Interface(Base):
         """
         return EmptyContext()
 
+    @classmethod
+    def supports_concurrent_writes(cls) -> bool:
+        """
+        Whether independent resources may be written from several threads at
+        once, each thread using its own connection
+
+        The default is False, override it if your database takes writes
+        from several connections at once.
+
+        Returns:
+
+            - bool
+        """
+        return False
+
+    def close_connection(self) -> None:
+        """
+        Release the database connection of the calling thread, called by
+        writer threads when `supports_concurrent_writes` is True
+        """
+
     @classmethod
     def setup(cls) -> None:
         """
@@ -339,9 +418,141 @@ class Interface(Base):
         """
         raise NotImplementedError()
 
+    @reftag_to_cls
+    def get_objects_map(
+        self, concrete: type, ids: Iterable[str | int], chunk_size: int = 500
+    ) -> dict[str | int, object]:
+        """
+        Look up several objects by primary key, `chunk_size` ids per query
+        to stay below the bound parameter limits of the database
+
+        Arguments:
+
+            - concrete: concrete class
+            - ids: primary key values, ids that do not exist are left out
+            - chunk_size: number of ids per query
+
+        Returns:
+
+            - dict of concrete instances keyed by primary key
+        """
+        iterator = iter(sorted(set(ids)))
+        found: dict[str | int, object] = {}
+        while chunk := list(islice(iterator, max(chunk_size, 1))):
+            for obj in self.get_objects(concrete, chunk):
+                pk = getattr(obj, "pk", getattr(obj, "id", None))
+                if pk is not None:
+                    found[pk] = obj
+        return found
+
+    @reftag_to_cls
+    def existing_ids(
+        self, concrete: type, ids: Iterable[str | int], chunk_size: int = 500
+    ) -> set[str | int]:
+        """
+        Should return which of several primary keys exist, override this
+        if your backend can check without loading the objects
+
+        Arguments:
+
+            - concrete: concrete class
+            - ids: primary key values
+            - chunk_size: number of ids per query
+
+        Returns:
+
+            - set of the primary keys that exist
+        """
+        return set(self.get_objects_map(concrete, ids, chunk_size))
+
+    @reftag_to_cls
+    def count(self, concrete: type, filters: Mapping[str, object] | None = None) -> int:
+        """
+        Should return the number of objects of a concrete class, override
+        this if your backend can count without loading the objects
+
+        Arguments:
+
+            - concrete: concrete class
+            - filters: only count objects whose fields equal these values
+
+        Returns:
+
+            - int
+        """
+        if filters:
+            return sum(1 for _ in self.iter_objects(concrete, filters))
+        return len(self.get_objects(concrete))
+
+    @reftag_to_cls
+    def iter_objects(
+        self,
+        concrete: type,
+        filters: Mapping[str, object] | None = None,
+        fields: Sequence[str] | None = None,
+        chunk_size: int = 1000,
+    ) -> Iterator[object]:
+        """
+        Should iterate over the objects of a concrete class, override this
+        if your backend can read them `chunk_size` at a time from a cursor
+        or load the `fields` only
+
+        Arguments:
+
+            - concrete: concrete class
+            - filters: only objects whose fields equal these values
+            - fields: field names the caller reads, the other fields
+                may be left out of the objects
+            - chunk_size: number of objects read at a time
+
+        Returns:
+
+            - iterator of concrete instances
+        """
+        filters = dict(filters or {})
+        if not filters:
+            objs = self.get_objects(concrete)
+        else:
+            objs = self.get_objects_by(concrete, *filters.popitem())
+        for field_name, value in filters.items():
+            pks = {obj.pk for obj in self.get_objects_by(concrete, field_name, value)}
+            objs = [obj for obj in objs if obj.pk in pks]
+        yield from objs
+
+    @reftag_to_cls
+    def iter_values(
+        self,
+        concrete: type,
+        fields: Sequence[str],
+        filters: Mapping[str, object] | None = None,
+        chunk_size: int = 1000,
+    ) -> Iterator[tuple]:
+        """
+        Should iterate over tuples of field values of the objects of a
+        concrete class, relations give the primary key of the related
+        object. Override this if your backend can select the columns of
+        `fields` only
+
+        Arguments:
+
+            - concrete: concrete class
+            - fields: field names
+            - filters: only objects whose fields equal these values
+            - chunk_size: number of objects read at a time
+
+        Returns:
+
+            - iterator of tuples, one value per field
+        """
+        attnames = [
+            getattr(self.get_field(concrete, name), "attname", name) for name in fields
+        ]
+        for obj in self.iter_objects(concrete, filters, attnames, chunk_size):
+            yield tuple(getattr(obj, attname) for attname in attnames)
+
     @reftag_to_cls
     def get_objects_by(
-        self, concrete: type, field: str, value: str | int | bool
+        self, concrete: type, field: str, value: object
     ) -> Sequence[object]:
         """
         very simple search function that should return
@@ -351,7 +562,8 @@ class Interface(Base):
 
             - concrete: concrete class
             - field_name: query this field for a match
-            - value: match this value (simple equal matching)
+            - value: match this value (simple equal matching), an object
+                or its id for relations
 
         Returns:
 
@@ -393,6 +605,20 @@ class Interface(Base):
         """
         raise NotImplementedError()
 
+    def last_change_all(self) -> dict[str, int | None]:
+        """
+        Should return `last_change` of every resource, override this if
+        your backend can look them up at once
+
+        Returns:
+
+            - dict of unix epoch timestamps keyed by resource tag
+        """
+        return {
+            tag: self.last_change(self.get_concrete(res))
+            for tag, res in RESOURCES_BY_TAG.items()
+        }
+
     def save(self, obj: object) -> None:
         """
         Save the object instance
@@ -467,6 +693,57 @@ class Interface(Base):
         """
         return [Field(name) for name in self.get_field_names(concrete)]
 
+    @reftag_to_cls
+    def bulk_create(
+        self, concrete: type, objs: Iterable[object], batch_size: int = 1000
+    ) -> int:
+        """
+        Create new objects in chunks of `batch_size`, each chunk in its own
+        `atomic_transaction`. `objs` is consumed one chunk at a time, so
+        it can be a generator and memory use stays bounded.
+
+        The default saves the objects one by one, override it if your
+        backend can insert a chunk at once.
+
+        Arguments:
+
+            - concrete: concrete class
+            - objs: iterable of concrete object instances
+            - batch_size: number of objects per chunk
+
+        Returns:
+
+            - number of objects created
+        """
+        iterator = iter(objs)
+        count = 0
+        while chunk := list(islice(iterator, max(batch_size, 1))):
+            with self.atomic_transaction():
+                for obj in chunk:
+                    self.save(obj)
+            count += len(chunk)
+        return count
+
+    @reftag_to_cls
+    def bulk_upsert(
+        self, concrete: type, objs: Sequence[object], fields: Sequence[str]
+    ) -> None:
+        """
+        Write a collection of objects in as few statements as possible,
+        objects that exist are updated (`fields` only), others are created
+
+        The default saves the objects one by one, override it if your
+        backend can write them with a single statement.
+
+        Arguments:
+
+            - concrete: concrete class
+            - objs: collection of concrete object instances
+            - fields: names of the fields to update on existing objects
+        """
+        for obj in objs:
+            self.save(obj)
+
     def clean(self, obj: object) -> None:
         """
         Should take an object instance and validate / clean it
@@ -0,0 +1,3 @@
+"""
+Backends shipped with the client, see `peeringdb.SUPPORTED_BACKENDS`
+"""
@@ -0,0 +1,870 @@
+"""
+Schema of the resources for the backends shipped with the client
+
+Mirrors the concrete models of django_peeringdb, with the same tables,
+columns, relations and constraints, described by `Field`s the backends
+generate their storage from. Each backend builds its own concrete classes
+with `concrete_classes`, the objects are plain slotted instances.
+"""
+
+import copy
+import re
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from typing import Generic, Protocol, TypeVar
+
+from peeringdb import resource
+from peeringdb.backend import Field as BaseField
+from peeringdb.backend import Interface, reftag_to_cls
+
+# django internal types of the field kinds, see `Field.get_internal_type`
+_INTERNAL_TYPES = {
+    "auto": "AutoField",
+    "char": "CharField",
+    # several values, stored joined by commas
+    "choices": "CharField",
+    "text": "TextField",
+    "int": "IntegerField",
+    "bool": "BooleanField",
+    "decimal": "DecimalField",
+    "datetime": "DateTimeField",
+    "json": "JSONField",
+    "fk": "ForeignKey",
+}
+
+
+class ObjectDoesNotExist(Exception):  # noqa: N818
+    pass
+
+
+class MultipleObjectsReturned(Exception):  # noqa: N818
+    pass
+
+
+class FieldDoesNotExist(Exception):  # noqa: N818
+    pass
+
+
+class IntegrityError(Exception):
+    pass
+
+
+# key of the errors that are not about a single field, like django's
+NON_FIELD_ERRORS = "__all__"
+
+
+class ValidationError(Exception):
+    """
+    Raised by `clean`, with the messages per field name like django's
+    """
+
+    def __init__(self, errors: dict[str, list[str]]) -> None:
+        super().__init__(errors)
+        self.error_dict = errors
+        self.message_dict = errors
+
+
+class Field(BaseField):
+    """
+    A column of a concrete class
+    """
+
+    column: str
+
+    def __init__(
+        self,
+        name: str,
+        kind: str,
+        null: bool = False,
+        unique: bool = False,
+        default: object = None,
+        to: str | None = None,
+    ) -> None:
+        """
+        :param name: Field name, relations are stored in `<name>_id`
+        :param kind: Key of `_INTERNAL_TYPES`
+        :param null: Whether the column may hold None
+        :param unique: Whether values must be unique
+        :param default: Value of new objects, callables are called for it
+        :param to: Tag of the related resource of a relation
+        """
+        super().__init__(name)
+        self.kind = kind
+        self.null = null
+        self.unique = unique
+        self.default = default
+        self.to = to
+        self.column = self.attname = f"{name}_id" if kind == "fk" else name
+        self.primary_key = kind == "auto"
+        self.is_relation = kind == "fk"
+        self.concrete = True
+        # concrete class holding the field and concrete class of `to`, set
+        # by `concrete_classes`
+        self.model: type | None = None
+        self.related_model: type | None = None
+
+    def __repr__(self) -> str:
+        return f"<Field {self.name}>"
+
+    def get_internal_type(self) -> str:
+        return _INTERNAL_TYPES[self.kind]
+
+    def related_concrete(self) -> type:
+        """
+        Concrete class of a relation
+        """
+        if self.related_model is None:
+            raise FieldDoesNotExist(f"{self.name} is not a relation")
+        return self.related_model
+
+    def get_default(self) -> object:
+        if callable(self.default):
+            return self.default()
+        if self.default is None and not self.null and self.kind in ("char", "text"):
+            return ""
+        return self.default
+
+
+def _handleref() -> list[Field]:
+    return [
+        Field("id", "auto"),
+        Field("status", "char"),
+        Field("created", "datetime"),
+        Field("updated", "datetime"),
+        Field("version", "int", default=0),
+    ]
+
+
+def _address() -> list[Field]:
+    return [
+        Field("address1", "char"),
+        Field("address2", "char"),
+        Field("city", "char"),
+        Field("state", "char"),
+        Field("zipcode", "char"),
+        Field("country", "char"),
+        Field("suite", "char"),
+        Field("floor", "char"),
+        Field("latitude", "decimal", null=True),
+        Field("longitude", "decimal", null=True),
+    ]
+
+
+# tag: (class name, table, fields), in the order of `resource.RESOURCES_BY_TAG`
+SCHEMA: OrderedDict[str, tuple[str, str, list[Field]]] = OrderedDict(
+    [
+        (
+            "org",
+            (
+                "Organization",
+                "peeringdb_organization",
+                _handleref()
+                + _address()
+                + [
+                    Field("name", "char", unique=True),
+                    Field("aka", "char"),
+                    Field("name_long", "char"),
+                    Field("website", "char"),
+                    Field("social_media", "json", default=dict),
+                    Field("notes", "text"),
+                ],
+            ),
+        ),
+        (
+            "campus",
+            (
+                "Campus",
+                "peeringdb_campus",
+                _handleref()
+                + [
+                    Field("name", "char", unique=True),
+                    Field("name_long", "char", null=True),
+                    Field("aka", "char", null=True),
+                    Field("website", "char"),
+                    Field("social_media", "json", default=dict),
+                    Field("notes", "text"),
+                    Field("org", "fk", to="org"),
+                ],
+            ),
+        ),
+        (
+            "fac",
+            (
+                "Facility",
+                "peeringdb_facility",
+                _handleref()
+                + _address()
+                + [
+                    Field("name", "char", unique=True),
+                    Field("website", "char"),
+                    Field("social_media", "json", default=dict),
+                    Field("aka", "char"),
+                    Field("name_long", "char"),
+                    Field("clli", "char"),
+                    Field("rencode", "char"),
+                    Field("npanxx", "char"),
+                    Field("tech_email", "char"),
+                    Field("tech_phone", "char"),
+                    Field("sales_email", "char"),
+                    Field("sales_phone", "char"),
+                    Field("property", "char", null=True),
+                    Field("diverse_serving_substations", "bool", null=True),
+                    Field("available_voltage_services", "choices", null=True),
+                    Field("notes", "text"),
+                    Field("region_continent", "char", null=True),
+                    Field("status_dashboard", "char", null=True),
+                    Field("org", "fk", to="org"),
+                    Field("campus", "fk", null=True, to="campus"),
+                ],
+            ),
+        ),
+        (
+            "net",
+            (
+                "Network",
+                "peeringdb_network",
+                _handleref()
+                + [
+                    Field("asn", "int", unique=True),
+                    Field("name", "char", unique=True),
+                    Field("aka", "char"),
+                    Field("name_long", "char"),
+                    Field("irr_as_set", "char"),
+                    Field("website", "char"),
+                    Field("social_media", "json", default=dict),
+                    Field("looking_glass", "char"),
+                    Field("route_server", "char"),
+                    Field("notes", "text"),
+                    Field("notes_private", "text"),
+                    Field("info_traffic", "char"),
+                    Field("info_ratio", "char", default="Not Disclosed"),
+                    Field("info_scope", "char", default="Not Disclosed"),
+                    Field("info_types", "choices", default=list),
+                    Field("info_prefixes4", "int", null=True),
+                    Field("info_prefixes6", "int", null=True),
+                    Field("info_unicast", "bool", default=False),
+                    Field("info_multicast", "bool", default=False),
+                    Field("info_ipv6", "bool", default=False),
+                    Field("info_never_via_route_servers", "bool", default=False),
+                    Field("policy_url", "char"),
+                    Field("policy_general", "char"),
+                    Field("policy_locations", "char"),
+                    Field("policy_ratio", "bool", default=False),
+                    Field("policy_contracts", "char"),
+                    Field("status_dashboard", "char", null=True),
+                    Field("rir_status", "char", null=True),
+                    Field("rir_status_updated", "datetime", null=True),
+                    Field("org", "fk", to="org"),
+                    Field("info_type", "char", default="Not Disclosed"),
+                ],
+            ),
+        ),
+        (
+            "ix",
+            (
+                "InternetExchange",
+                "peeringdb_ix",
+                _handleref()
+                + [
+                    Field("name", "char", unique=True),
+                    Field("aka", "char"),
+                    Field("name_long", "char"),
+                    Field("city", "char"),
+                    Field("country", "char"),
+                    Field("notes", "text"),
+                    Field("region_continent", "char"),
+                    Field("media", "char", default="Ethernet"),
+                    Field("proto_unicast", "bool", default=False),
+                    Field("proto_multicast", "bool", default=False),
+                    Field("proto_ipv6", "bool", default=False),
+                    Field("website", "char"),
+                    Field("social_media", "json", default=dict),
+                    Field("url_stats", "char"),
+                    Field("tech_email", "char"),
+                    Field("tech_phone", "char"),
+                    Field("policy_email", "char"),
+                    Field("policy_phone", "char"),
+                    Field("sales_email", "char"),
+                    Field("sales_phone", "char"),
+                    Field("ixf_net_count", "int", default=0),
+                    Field("ixf_last_import", "datetime", null=True),
+                    Field("service_level", "char", default="Not Disclosed"),
+                    Field("terms", "char", default="Not Disclosed"),
+                    Field("status_dashboard", "char", null=True),
+                    Field("org", "fk", to="org"),
+                ],
+            ),
+        ),
+        (
+            "carrier",
+            (
+                "Carrier",
+                "peeringdb_carrier",
+                _handleref()
+                + [
+                    Field("name", "char", unique=True),
+                    Field("aka", "char"),
+                    Field("name_long", "char"),
+                    Field("website", "char"),
+                    Field("social_media", "json", default=dict),
+                    Field("notes", "text"),
+                    Field("org", "fk", to="org"),
+                ],
+            ),
+        ),
+        (
+            "carrierfac",
+            (
+                "CarrierFacility",
+                "peeringdb_ix_carrier_facility",
+                _handleref()
+                + [
+                    Field("carrier", "fk", to="carrier"),
+                    Field("fac", "fk", to="fac"),
+                ],
+            ),
+        ),
+        (
+            "ixfac",
+            (
+                "InternetExchangeFacility",
+                "peeringdb_ix_facility",
+                _handleref()
+                + [
+                    Field("ix", "fk", to="ix"),
+                    Field("fac", "fk", to="fac"),
+                ],
+            ),
+        ),
+        (
+            "ixlan",
+            (
+                "IXLan",
+                "peeringdb_ixlan",
+                _handleref()
+                + [
+                    Field("name", "char"),
+                    Field("descr", "text"),
+                    Field("mtu", "int", default=1500),
+                    Field("vlan", "int", null=True),
+                    Field("dot1q_support", "bool", default=False),
+                    Field("rs_asn", "int", null=True, default=0),
+                    Field("arp_sponge", "char", null=True, unique=True),
+                    Field("ixf_ixp_member_list_url", "char", null=True),
+                    Field("ixf_ixp_member_list_url_visible", "char", default="Private"),
+                    Field("ix", "fk", to="ix"),
+                ],
+            ),
+        ),
+        (
+            "ixpfx",
+            (
+                "IXLanPrefix",
+                "peeringdb_ixlan_prefix",
+                _handleref()
+                + [
+                    Field("notes", "char"),
+                    Field("protocol", "char"),
+                    Field("prefix", "char", unique=True),
+                    Field("in_dfz", "bool", default=False),
+                    Field("ixlan", "fk", to="ixlan"),
+                ],
+            ),
+        ),
+        (
+            "netfac",
+            (
+                "NetworkFacility",
+                "peeringdb_network_facility",
+                _handleref()
+                + [
+                    Field("avail_sonet", "bool", default=False),
+                    Field("avail_ethernet", "bool", default=False),
+                    Field("avail_atm", "bool", default=False),
+                    Field("net", "fk", to="net"),
+                    Field("fac", "fk", to="fac"),
+                ],
+            ),
+        ),
+        (
+            "netixlan",
+            (
+                "NetworkIXLan",
+                "peeringdb_network_ixlan",
+                _handleref()
+                + [
+                    Field("asn", "int"),
+                    Field("ipaddr4", "char", null=True),
+                    Field("ipaddr6", "char", null=True),
+                    Field("is_rs_peer", "bool", default=False),
+                    Field("bfd_support", "bool", default=False),
+                    Field("notes", "char"),
+                    Field("speed", "int"),
+                    Field("operational", "bool", default=True),
+                    Field("net", "fk", to="net"),
+                    Field("ixlan", "fk", to="ixlan"),
+                    Field("net_side", "fk", null=True, to="fac"),
+                    Field("ix_side", "fk", null=True, to="fac"),
+                ],
+            ),
+        ),
+        (
+            "poc",
+            (
+                "NetworkContact",
+                "peeringdb_network_contact",
+                _handleref()
+                + [
+                    Field("role", "char"),
+                    Field("visible", "char", default="Public"),
+                    Field("name", "char"),
+                    Field("phone", "char"),
+                    Field("email", "char"),
+                    Field("url", "char"),
+                    Field("net", "fk", to="net"),
+                ],
+            ),
+        ),
+    ]
+)
+
+
+# fields whose values must be unique together per tag, django_peeringdb's
+# `unique_together`
+UNIQUE_TOGETHER: dict[str, tuple[str, ...]] = {
+    "carrierfac": ("carrier", "fac"),
+    "ixfac": ("ix", "fac"),
+    "netfac": ("net", "fac"),
+}
+
+
+class Row:
+    """
+    Base of the concrete classes built by `concrete_classes`
+
+    Relations are stored as ids in `<name>_id`, `<name>` reads the related
+    object through the backend and takes an object or an id.
+    """
+
+    __slots__ = ("id",)
+
+    id: int | None
+    tag: str
+    _table: str
+    _fields: tuple[Field, ...]
+    _field_map: dict[str, Field]
+    _unique_together: tuple[Field, ...]
+    # backend relations are looked up with, set by the backend
+    _backend: Interface
+
+    DoesNotExist: type[ObjectDoesNotExist]
+    MultipleObjectsReturned: type[MultipleObjectsReturned]
+
+    def __init__(self, **data: object) -> None:
+        for field in self._fields:
+            setattr(self, field.attname, field.get_default())
+        for name, value in data.items():
+            setattr(self, name, value)
+
+    @property
+    def pk(self) -> int | None:
+        return self.id
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} {self.pk}>"
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Row) or type(other) is not type(self):
+            return self is other
+        if self.pk is None:
+            return self is other
+        return self.pk == other.pk
+
+    def __hash__(self) -> int:
+        if self.pk is None:
+            return id(self)
+        return hash((type(self), self.pk))
+
+
+def _relation(field: Field) -> property:
+    attname = field.attname
+
+    def get(self: Row) -> object:
+        pk = getattr(self, attname)
+        if pk is None:
+            return None
+        return self._backend.get_object(field.related_concrete(), pk)
+
+    def set(self: Row, value: object) -> None:
+        setattr(self, attname, value if value is None else getattr(value, "pk", value))
+
+    return property(get, set)
+
+
+def concrete_classes(module: str) -> OrderedDict[str, type[Row]]:
+    """
+    Build the concrete classes of a backend, keyed by tag
+
+    :param module: Module the classes are defined in
+    """
+    classes: OrderedDict[str, type[Row]] = OrderedDict()
+    for tag, (name, table, template) in SCHEMA.items():
+        fields = tuple(copy.copy(field) for field in template)
+        field_map = {field.name: field for field in fields}
+        namespace: dict[str, object] = {
+            "__slots__": tuple(
+                field.attname for field in fields if field.attname != "id"
+            ),
+            "__module__": module,
+            "tag": tag,
+            "_table": table,
+            "_fields": fields,
+            "_field_map": field_map,
+            "_unique_together": tuple(
+                field_map[name] for name in UNIQUE_TOGETHER.get(tag, ())
+            ),
+            "DoesNotExist": type("DoesNotExist", (ObjectDoesNotExist,), {}),
+            "MultipleObjectsReturned": type(
+                "MultipleObjectsReturned", (MultipleObjectsReturned,), {}
+            ),
+        }
+        for field in fields:
+            if field.is_relation:
+                namespace[field.name] = _relation(field)
+        classes[tag] = type(name, (Row,), namespace)
+    for cls in classes.values():
+        for field in cls._fields:
+            field.model = cls
+            if field.to is not None:
+                field.related_model = classes[field.to]
+    return classes
+
+
+def resource_map(classes: OrderedDict[str, type[Row]]) -> dict[type, type]:
+    """
+    `Interface.RESOURCE_MAP` of the classes built by `concrete_classes`
+    """
+    return {resource.get_resource(tag): cls for tag, cls in classes.items()}
+
+
+def field_kinds() -> dict[str, list[list[str]]]:
+    """
+    [attname, kind] of the fields per tag, stored with snapshots to tell
+    whether they match the schema
+    """
+    return {
+        tag: [[field.attname, field.kind] for field in fields]
+        for tag, (_, _, fields) in SCHEMA.items()
+    }
+
+
+def row_class(concrete: type) -> type[Row]:
+    """
+    A class passed to the backend methods as a concrete class of the schema
+    """
+    if not issubclass(concrete, Row):
+        raise TypeError(f"{concrete.__name__} is not a concrete class of the schema")
+    return concrete
+
+
+def as_row(obj: object) -> Row:
+    """
+    An object passed to the backend methods as an object of the schema
+    """
+    if not isinstance(obj, Row):
+        raise TypeError(f"{obj!r} is not an object of the schema")
+    return obj
+
+
+def get_field(concrete: type, field_name: str) -> Field:
+    """
+    Field of a concrete class by name or column (`org` or `org_id`)
+    """
+    concrete = row_class(concrete)
+    field = concrete._field_map.get(field_name)
+    if field is None:
+        field = next((f for f in concrete._fields if f.column == field_name), None)
+    if field is None:
+        raise FieldDoesNotExist(f"{concrete.__name__} has no field named {field_name}")
+    return field
+
+
+class ModelBackend(Interface):
+    """
+    Backend methods that only depend on the schema, shared by the backends
+    built on `concrete_classes`
+
+    Subclasses store the objects and implement `_taken` and `_exists` for
+    `clean`.
+    """
+
+    @classmethod
+    def validation_error(cls, concrete: type | None = None) -> type[Exception]:
+        return ValidationError
+
+    @classmethod
+    def object_missing_error(cls, concrete: type | None = None) -> type[Exception]:
+        if concrete is not None and hasattr(concrete, "DoesNotExist"):
+            return concrete.DoesNotExist
+        return ObjectDoesNotExist
+
+    @reftag_to_cls
+    def get_object_by(
+        self, concrete: type, field_name: str, value: str | int | bool
+    ) -> object:
+        found = self.get_objects_by(concrete, field_name, value)
+        if not found:
+            raise self.object_missing_error(concrete)(
+                f"{concrete.__name__} with {field_name}={value!r} does not exist"
+            )
+        if len(found) > 1:
+            raise row_class(concrete).MultipleObjectsReturned(
+                f"{len(found)} {concrete.__name__} with {field_name}={value!r}"
+            )
+        return found[0]
+
+    @reftag_to_cls
+    def create_object(self, concrete: type, **data: object) -> object:
+        obj = concrete(**data)
+        self.save(obj)
+        return obj
+
+    @reftag_to_cls
+    def get_field_names(self, concrete: type) -> list[str]:
+        return [field.name for field in row_class(concrete)._fields]
+
+    @reftag_to_cls
+    def get_fields(self, concrete: type) -> list[BaseField]:
+        return list(row_class(concrete)._fields)
+
+    @reftag_to_cls
+    def get_field(self, concrete: type, field_name: str) -> Field:
+        return get_field(concrete, field_name)
+
+    @reftag_to_cls
+    def get_field_concrete(self, concrete: type, field_name: str) -> type:
+        return get_field(concrete, field_name).related_concrete()
+
+    @reftag_to_cls
+    def is_field_related(self, concrete: type, field_name: str) -> tuple[bool, bool]:
+        return (get_field(concrete, field_name).is_relation, False)
+
+    def set_relation_many_to_many(
+        self, obj: object, field_name: str, objs: Sequence[object]
+    ) -> None:
+        # the schema has no many to many relations
+        setattr(obj, field_name, objs)
+
+    def clean(self, obj: object) -> None:
+        """
+        Validate an object the way django's `full_clean` does for the
+        models, raising `ValidationError`
+        """
+        obj = as_row(obj)
+        concrete = type(obj)
+        errors: dict[str, list[str]] = {}
+        for field in concrete._fields:
+            value = getattr(obj, field.attname)
+            if value is None:
+                if not field.null and not field.primary_key:
+                    errors[field.name] = ["This field cannot be null."]
+            elif (
+                field.unique
+                and value != ""
+                and self._taken(concrete, field, value, obj.pk)
+            ):
+                errors[field.name] = [
+                    f"{concrete.__name__} with this {field.name} already exists."
+                ]
+            elif field.is_relation:
+                related = field.related_concrete()
+                if not self._exists(related, value):
+                    errors[field.name] = [
+                        f"{related.__name__} instance with id {value} does not exist."
+                    ]
+        together = concrete._unique_together
+        if together and not any(field.name in errors for field in together):
+            values = {field.name: getattr(obj, field.attname) for field in together}
+            if None not in values.values() and self._taken_together(
+                concrete, values, obj.pk
+            ):
+                errors[NON_FIELD_ERRORS] = [
+                    f"{concrete.__name__} with this "
+                    f"{' and '.join(values)} already exists."
+                ]
+        if errors:
+            raise ValidationError(errors)
+
+    def _taken(self, concrete: type, field: Field, value: object, pk: object) -> bool:
+        """
+        Whether a value of a unique field is held by an object other than
+        the one with id `pk`
+        """
+        raise NotImplementedError()
+
+    def _exists(self, concrete: type, pk: object) -> bool:
+        """
+        Whether an object exists
+        """
+        raise NotImplementedError()
+
+    def _taken_together(
+        self, concrete: type, values: Mapping[str, object], pk: object
+    ) -> bool:
+        """
+        Whether the values of fields that are unique together are held by an
+        object other than the one with id `pk`
+        """
+        return any(
+            other != pk for (other,) in self.iter_values(concrete, ["id"], values)
+        )
+
+    def detect_missing_relations(
+        self, obj: object, exc: Exception
+    ) -> dict[type, list[str | int]]:
+        missing: dict[type, list[str | int]] = {}
+        for name, errors in getattr(exc, "error_dict", {}).items():
+            m = re.search(r" with id (\d+) does not exist", str(errors))
+            if m:
+                field = get_field(type(obj), name)
+                res = self.get_resource(field.related_concrete())
+                missing.setdefault(res, []).append(int(m.group(1)))
+        return missing
+
+    def detect_uniqueness_error(self, exc: Exception) -> list[str] | None:
+        fields = [
+            name
+            for name, errors in getattr(exc, "error_dict", {}).items()
+            if "already exists" in str(errors)
+        ]
+        return fields or None
+
+
+class Table(Protocol):
+    """
+    Rows of a concrete class kept by a `TableBackend`, numbered in id order
+    """
+
+    @property
+    def ids(self) -> Sequence[int]: ...
+
+    def __len__(self) -> int: ...
+
+    def position(self, pk: object) -> int | None:
+        """
+        Row of an id, None if there is none
+        """
+        ...
+
+    def matches(self, attname: str, value: object) -> Sequence[int]:
+        """
+        Rows holding a value, in id order
+        """
+        ...
+
+    def get(self, idx: int, attnames: Sequence[str] | None = None) -> Row:
+        """
+        Object of a row, with the fields of `attnames` only if passed
+        """
+        ...
+
+    def value(self, idx: int, attname: str) -> object: ...
+
+
+_TableT = TypeVar("_TableT", bound=Table)
+
+
+class TableBackend(ModelBackend, Generic[_TableT]):
+    """
+    Read methods of the backends keeping each concrete class in a `Table`
+    of `tables`
+    """
+
+    tables: dict[type, _TableT]
+
+    @staticmethod
+    def _positions(table: Table, ids: Iterable[object]) -> set[int]:
+        """
+        Rows of the ids that exist
+        """
+        positions = (table.position(pk) for pk in ids)
+        return {idx for idx in positions if idx is not None}
+
+    def _rows(
+        self, concrete: type, filters: Mapping[str, object] | None = None
+    ) -> Sequence[int]:
+        """
+        Rows whose fields equal `filters`, in id order
+        """
+        table = self.tables[concrete]
+        rows: Sequence[int] | None = None
+        for field_name, value in (filters or {}).items():
+            if isinstance(value, Row):
+                value = value.pk
+            found = table.matches(get_field(concrete, field_name).attname, value)
+            rows = found if rows is None else sorted(set(rows).intersection(found))
+        return range(len(table)) if rows is None else rows
+
+    @reftag_to_cls
+    def get_object(self, concrete: type, id: str | int) -> object:
+        table = self.tables[concrete]
+        idx = table.position(id)
+        if idx is None:
+            raise self.object_missing_error(concrete)(
+                f"{concrete.__name__} {id} does not exist"
+            )
+        return table.get(idx)
+
+    @reftag_to_cls
+    def get_objects(
+        self, concrete: type, ids: Sequence[str | int] | None = None
+    ) -> list:
+        table = self.tables[concrete]
+        if ids:
+            return [table.get(idx) for idx in sorted(self._positions(table, ids))]
+        return [table.get(idx) for idx in range(len(table))]
+
+    @reftag_to_cls
+    def get_objects_by(self, concrete: type, field_name: str, value: object) -> list:
+        table = self.tables[concrete]
+        return [table.get(idx) for idx in self._rows(concrete, {field_name: value})]
+
+    @reftag_to_cls
+    def existing_ids(
+        self, concrete: type, ids: Iterable[str | int], chunk_size: int = 500
+    ) -> set[str | int]:
+        table = self.tables[concrete]
+        return {table.ids[idx] for idx in self._positions(table, ids)}
+
+    @reftag_to_cls
+    def count(self, concrete: type, filters: Mapping[str, object] | None = None) -> int:
+        return len(self._rows(concrete, filters))
+
+    @reftag_to_cls
+    def iter_objects(
+        self,
+        concrete: type,
+        filters: Mapping[str, object] | None = None,
+        fields: Sequence[str] | None = None,
+        chunk_size: int = 1000,
+    ) -> Iterator[object]:
+        table = self.tables[concrete]
+        attnames = [get_field(concrete, name).attname for name in fields or ()]
+        for idx in self._rows(concrete, filters):
+            yield table.get(idx, attnames or None)
+
+    @reftag_to_cls
+    def iter_values(
+        self,
+        concrete: type,
+        fields: Sequence[str],
+        filters: Mapping[str, object] | None = None,
+        chunk_size: int = 1000,
+    ) -> Iterator[tuple]:
+        table = self.tables[concrete]
+        attnames = [get_field(concrete, name).attname for name in fields]
+        for idx in self._rows(concrete, filters):
+            yield tuple(table.value(idx, attname) for attname in attnames)
+
+    def _exists(self, concrete: type, pk: object) -> bool:
+        return self.tables[concrete].position(pk) is not None
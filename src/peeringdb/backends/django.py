@@ -0,0 +1,156 @@
+"""
+Backend of django_peeringdb, with the queries and bulk writes the generic
+`Interface` defaults can't do
+
+Select it with `orm.backend: django_peeringdb` (PDB_ORM_BACKEND).
+`load_backend` loads `django_peeringdb.client_adaptor` and extends its
+Backend with `DjangoBackend`: lazy queries are filtered, counted and
+narrowed to their fields by the database, ids are checked without loading
+the objects, objects are inserted with the bulk_create of their model and
+upserted with one `INSERT .. ON CONFLICT UPDATE` statement. Resources are
+written from several threads when the database is postgresql or mysql.
+"""
+
+import sys
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from itertools import islice
+from types import ModuleType
+from typing import Any
+
+from peeringdb.backend import Interface, reftag_to_cls
+from peeringdb.util import chunked
+
+# databases that take writes from several connections at once
+CONCURRENT_VENDORS = ("postgresql", "mysql")
+
+# set by `load_backend`
+Backend: type[Interface]
+__version__: str
+
+
+def _connection(concrete: type | None) -> Any:
+    """
+    Database connection of the calling thread that a concrete class is
+    stored with, None if it is not a django model
+    """
+    manager = getattr(concrete, "objects", None)
+    if manager is None or not hasattr(concrete, "_meta"):
+        return None
+    from django.db import connections
+
+    return connections[manager.db]
+
+
+class DjangoBackend(Interface):
+    """
+    Writes of django models, the django_peeringdb Backend comes first in
+    the bases so its own methods are kept
+    """
+
+    @classmethod
+    def supports_concurrent_writes(cls) -> bool:
+        connection = _connection(next(iter(cls.RESOURCE_MAP.values()), None))
+        return getattr(connection, "vendor", None) in CONCURRENT_VENDORS
+
+    def close_connection(self) -> None:
+        connection = _connection(next(iter(self.RESOURCE_MAP.values()), None))
+        if connection is not None:
+            connection.close()
+
+    @reftag_to_cls
+    def existing_ids(
+        self, concrete: type, ids: Iterable[str | int], chunk_size: int = 500
+    ) -> set[str | int]:
+        if _connection(concrete) is None:
+            return super().existing_ids(concrete, ids, chunk_size)
+        found: set[str | int] = set()
+        for chunk in chunked(set(ids), max(chunk_size, 1)):
+            found.update(
+                concrete.objects.filter(pk__in=chunk).values_list("pk", flat=True)
+            )
+        return found
+
+    @reftag_to_cls
+    def count(self, concrete: type, filters: Mapping[str, object] | None = None) -> int:
+        if _connection(concrete) is None:
+            return super().count(concrete, filters)
+        return self.get_objects(concrete).filter(**dict(filters or {})).count()
+
+    @reftag_to_cls
+    def iter_objects(
+        self,
+        concrete: type,
+        filters: Mapping[str, object] | None = None,
+        fields: Sequence[str] | None = None,
+        chunk_size: int = 1000,
+    ) -> Iterator[object]:
+        if _connection(concrete) is None:
+            yield from super().iter_objects(concrete, filters, fields, chunk_size)
+            return
+        objs = self.get_objects(concrete).filter(**dict(filters or {}))
+        if fields:
+            objs = objs.only(*fields)
+        yield from objs.iterator(chunk_size=chunk_size)
+
+    @reftag_to_cls
+    def iter_values(
+        self,
+        concrete: type,
+        fields: Sequence[str],
+        filters: Mapping[str, object] | None = None,
+        chunk_size: int = 1000,
+    ) -> Iterator[tuple]:
+        if _connection(concrete) is None:
+            yield from super().iter_values(concrete, fields, filters, chunk_size)
+            return
+        # relations give the id of the related object
+        attnames = [concrete._meta.get_field(name).attname for name in fields]
+        objs = self.get_objects(concrete).filter(**dict(filters or {}))
+        yield from objs.values_list(*attnames).iterator(chunk_size=chunk_size)
+
+    @reftag_to_cls
+    def bulk_create(
+        self, concrete: type, objs: Iterable[object], batch_size: int = 1000
+    ) -> int:
+        if _connection(concrete) is None:
+            return super().bulk_create(concrete, objs, batch_size)
+        iterator = iter(objs)
+        count = 0
+        while chunk := list(islice(iterator, max(batch_size, 1))):
+            with self.atomic_transaction():
+                concrete.objects.bulk_create(chunk)
+            count += len(chunk)
+        return count
+
+    @reftag_to_cls
+    def bulk_upsert(
+        self, concrete: type, objs: Sequence[object], fields: Sequence[str]
+    ) -> None:
+        connection = _connection(concrete)
+        if connection is None or not objs:
+            return super().bulk_upsert(concrete, objs, fields)
+        # mysql conflicts on any unique key and can't be given a target
+        unique_fields = (
+            ["id"]
+            if connection.features.supports_update_conflicts_with_target
+            else None
+        )
+        concrete.objects.bulk_create(
+            objs,
+            update_conflicts=True,
+            unique_fields=unique_fields,
+            update_fields=list(fields),
+        )
+
+
+def load_backend(**orm_config: object) -> ModuleType:
+    """
+    Load django_peeringdb and extend its Backend with `DjangoBackend`
+    """
+    global Backend, __version__
+    from django_peeringdb.client_adaptor import load_backend as load_adaptor
+
+    adaptor = load_adaptor(**orm_config)
+    Backend = type("Backend", (adaptor.Backend, DjangoBackend), {})
+    __version__ = adaptor.__version__
+    return sys.modules[__name__]
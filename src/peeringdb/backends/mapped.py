@@ -0,0 +1,491 @@
+"""
+Read-only backend serving a memory-mapped snapshot file
+
+Select it with `orm.backend: mmap` (PDB_ORM_BACKEND) and point
+`orm.database.name` at a file written by `peeringdb snapshot build`. The
+file is opened with `mmap`, so processes reading the same file share its
+pages in the page cache and objects are only built when they are read.
+
+Layout of the file, all numbers in the byte order of the machine that
+built it and every block 8-byte aligned:
+
+- `MAGIC`, then the offset and length of the header (two uint64)
+- the string table: uint64 offsets of `count + 1` bounds into a block of
+  utf-8 strings, sorted so strings can be looked up by bisection
+- per resource: the sorted ids (int64), one fixed-width column per field
+  (`memory.KINDS` typecodes, int32 string table positions for strings) and
+  for unique, relation and ASN fields an int32 index of the rows in value
+  order
+- the header, JSON with the version, schema and offsets of the blocks
+"""
+
+import calendar
+import json
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Callable, Iterable, Sequence
+from mmap import ACCESS_READ, mmap
+from operator import attrgetter
+from types import ModuleType
+from typing import TYPE_CHECKING, Any, BinaryIO, Literal, SupportsInt
+
+import peeringdb
+from peeringdb.backend import reftag_to_cls
+from peeringdb.backends import _models
+from peeringdb.backends.memory import _NULL_INT, KINDS, _decode_datetime
+from peeringdb.resource import RESOURCES_BY_TAG
+
+if TYPE_CHECKING:
+    from peeringdb.client import Client
+
+# shipped with the client
+__version__ = peeringdb.__version__
+
+# bump when the layout of the file changes
+SNAPSHOT_VERSION = 1
+
+MAGIC = b"PDBMMAP\x00"
+
+_PREAMBLE = struct.Struct("=QQ")
+
+# string table position of None
+_NULL_STRING = -1
+
+CLASSES = _models.concrete_classes(__name__)
+
+# typecodes of the blocks
+Typecode = Literal["q", "Q", "i", "b", "B", "d"]
+
+
+class ReadOnlyBackend(Exception):  # noqa: N818
+    """
+    Raised by the write methods of the backend
+    """
+
+
+def _typecode(kind: str) -> Typecode:
+    return KINDS[kind].typecode or "i"
+
+
+def _indexed(field: _models.Field) -> bool:
+    return field.unique or field.is_relation or field.name == "asn"
+
+
+class MappedFile:
+    """
+    Memory map of a snapshot file, the views of its blocks are released
+    when it is closed
+    """
+
+    def __init__(self, path: str) -> None:
+        # the map keeps a handle of its own, the file is closed right away
+        with open(path, "rb") as f:
+            self.mmap = mmap(f.fileno(), 0, access=ACCESS_READ)
+        self.view = memoryview(self.mmap)
+        self._blocks: list[memoryview[Any]] = []
+
+    def read(self, offset: int, size: int) -> bytes:
+        return bytes(self.view[offset : offset + size])
+
+    def block(self, offset: int, typecode: Typecode, count: int) -> "memoryview[Any]":
+        """
+        View of `count` values of a typecode at an offset
+        """
+        size = array(typecode).itemsize
+        block: memoryview[Any] = self.view[offset : offset + size * count].cast(
+            typecode
+        )
+        self._blocks.append(block)
+        return block
+
+    def close(self) -> None:
+        """
+        Release the views and unmap the file, its blocks can't be read after
+        """
+        for block in self._blocks:
+            block.release()
+        self._blocks.clear()
+        self.view.release()
+        self.mmap.close()
+
+
+class Strings:
+    """
+    String table of a snapshot file
+    """
+
+    def __init__(self, mapped: "MappedFile", layout: dict) -> None:
+        self.count = layout["count"]
+        self.offsets = mapped.block(layout["offsets"], "Q", self.count + 1)
+        self.data = mapped.block(layout["data"], "B", layout["size"])
+
+    def __getitem__(self, pos: int) -> str:
+        return str(self.data[self.offsets[pos] : self.offsets[pos + 1]], "utf-8")
+
+    def find(self, value: str) -> int | None:
+        """
+        Position of a string, None if the table does not hold it
+        """
+        pos = bisect_left(range(self.count), value, key=self.__getitem__)
+        if pos < self.count and self[pos] == value:
+            return pos
+        return None
+
+
+class Table:
+    """
+    Columns of a concrete class in a snapshot file
+    """
+
+    def __init__(
+        self,
+        concrete: type[_models.Row],
+        mapped: "MappedFile",
+        layout: dict,
+        strings: Strings,
+    ) -> None:
+        self.concrete = concrete
+        self.strings = strings
+        self.rows = layout["rows"]
+        self.last_change = layout["last_change"]
+        self.ids = mapped.block(layout["ids"], "q", self.rows)
+        self.kinds = {
+            field.attname: field.kind
+            for field in concrete._fields
+            if not field.primary_key
+        }
+        self.columns = {
+            attname: mapped.block(
+                layout["columns"][attname], _typecode(kind), self.rows
+            )
+            for attname, kind in self.kinds.items()
+        }
+        self.indexes = {
+            attname: mapped.block(offset, "i", self.rows)
+            for attname, offset in layout["indexes"].items()
+        }
+        # (attname, column, decode) to build objects with
+        self._decoders = [
+            (attname, self.columns[attname], self._decoder(kind))
+            for attname, kind in self.kinds.items()
+        ]
+        self._decoder_map = {decoder[0]: decoder for decoder in self._decoders}
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def _decoder(self, kind: str) -> Callable[[object], object]:
+        decode = KINDS[kind].decode
+        if KINDS[kind].typecode:
+            return decode
+        strings = self.strings
+
+        def decode_string(pos: object) -> object:
+            if not isinstance(pos, int) or pos == _NULL_STRING:
+                return None
+            return decode(strings[pos])
+
+        return decode_string
+
+    def position(self, pk: object) -> int | None:
+        """
+        Row of an id, None if there is none
+        """
+        if not isinstance(pk, (str, SupportsInt)):
+            return None
+        try:
+            pk = int(pk)
+        except ValueError:
+            return None
+        idx = bisect_left(self.ids, pk)
+        if idx < self.rows and self.ids[idx] == pk:
+            return idx
+        return None
+
+    def get(self, idx: int, attnames: Sequence[str] | None = None) -> _models.Row:
+        """
+        Object of a row, with the fields of `attnames` only if passed
+        """
+        obj = self.concrete.__new__(self.concrete)
+        obj.id = self.ids[idx]
+        if attnames is not None:
+            for attname in attnames:
+                setattr(obj, attname, self.value(idx, attname))
+            return obj
+        for attname, column, decode in self._decoders:
+            setattr(obj, attname, decode(column[idx]))
+        return obj
+
+    def value(self, idx: int, attname: str) -> object:
+        """
+        Value of a field in a row
+        """
+        if attname == "id":
+            return self.ids[idx]
+        _, column, decode = self._decoder_map[attname]
+        return decode(column[idx])
+
+    def stored(self, attname: str, value: object) -> int | float | None:
+        """
+        Stored form of a value, None if no row can hold it
+        """
+        kind = KINDS[self.kinds[attname]]
+        value = kind.encode(value)
+        if value is None:
+            return _NULL_STRING
+        if isinstance(value, str):
+            return self.strings.find(value)
+        if isinstance(value, (int, float)):
+            return value
+        raise TypeError(f"Not a stored value: {value!r}")
+
+    def matches(self, attname: str, value: object) -> list[int]:
+        """
+        Rows whose `attname` equals a value
+        """
+        if attname == "id":
+            idx = self.position(value)
+            return [] if idx is None else [idx]
+        stored = self.stored(attname, value)
+        if stored is None:
+            return []
+        column = self.columns[attname]
+        index = self.indexes.get(attname)
+        if index is None:
+            return [idx for idx, v in enumerate(column) if v == stored]
+        lo = bisect_left(index, stored, key=column.__getitem__)
+        hi = bisect_right(index, stored, lo=lo, key=column.__getitem__)
+        return sorted(index[lo:hi])
+
+
+class Backend(_models.TableBackend[Table]):
+    # snapshot file, set from the config by `load_backend`
+    database: str | None = None
+
+    RESOURCE_MAP = _models.resource_map(CLASSES)
+
+    REFTAG_CONCRETE = dict(CLASSES)
+
+    def __init__(self, database: str | None = None) -> None:
+        """
+        :param database: Snapshot file, defaults to `database`
+        """
+        path = database or self.database
+        if not path:
+            raise ValueError("No snapshot file configured")
+        self.path = path
+        self.mapped: MappedFile | None = None
+        for concrete in CLASSES.values():
+            concrete._backend = self
+        self.reopen()
+
+    def reopen(self) -> None:
+        """
+        Map the snapshot file again, to serve a file that was rebuilt since
+
+        The previous map is closed once the new one is read.
+        """
+        mapped = MappedFile(self.path)
+        try:
+            tables = self._read_tables(mapped)
+        except BaseException:
+            mapped.close()
+            raise
+        self.close()
+        self.mapped = mapped
+        self.tables = tables
+
+    def close(self) -> None:
+        """
+        Unmap the snapshot file, objects can't be read until `reopen`
+        """
+        self.tables = {}
+        if self.mapped is not None:
+            self.mapped.close()
+            self.mapped = None
+
+    def _read_tables(self, mapped: MappedFile) -> dict[type, Table]:
+        if mapped.read(0, len(MAGIC)) != MAGIC:
+            raise ValueError(f"Not a snapshot file: {self.path}")
+        offset, size = _PREAMBLE.unpack_from(mapped.view, len(MAGIC))
+        header = json.loads(mapped.read(offset, size))
+        if (
+            header.get("version") != SNAPSHOT_VERSION
+            or header.get("byteorder") != sys.byteorder
+            or header.get("schema") != _models.field_kinds()
+        ):
+            raise ValueError(f"Snapshot file of an incompatible version: {self.path}")
+        strings = Strings(mapped, header["strings"])
+        return {
+            concrete: Table(concrete, mapped, header["tables"][tag], strings)
+            for tag, concrete in CLASSES.items()
+        }
+
+    @reftag_to_cls
+    def last_change(self, concrete: type) -> int:
+        return self.tables[concrete].last_change
+
+    def _taken(
+        self, concrete: type, field: _models.Field, value: object, pk: object
+    ) -> bool:
+        table = self.tables[concrete]
+        return any(table.ids[idx] != pk for idx in table.matches(field.attname, value))
+
+    def _read_only(self) -> ReadOnlyBackend:
+        return ReadOnlyBackend(
+            f"{self.path} is a read-only snapshot, rebuild it with "
+            "`peeringdb snapshot build`"
+        )
+
+    def save(self, obj: object) -> None:
+        raise self._read_only()
+
+    def bulk_create(
+        self, concrete: type, objs: Iterable[object], batch_size: int = 1000
+    ) -> int:
+        raise self._read_only()
+
+    def bulk_upsert(
+        self, concrete: type, objs: Sequence[object], fields: Sequence[str]
+    ) -> None:
+        raise self._read_only()
+
+    def delete_all(self) -> None:
+        raise self._read_only()
+
+
+def build(path: str, client: "Client") -> dict[str, int]:
+    """
+    Write the resources of a client's backend to a snapshot file,
+    atomically replacing it
+
+    :returns: number of objects written per tag
+    """
+    backend = client.backend
+    strings: set[str] = set()
+    tables = {}
+    for tag, res in RESOURCES_BY_TAG.items():
+        objs = backend.get_objects(backend.get_concrete(res))
+        tables[tag] = _encode_table(CLASSES[tag], objs, strings)
+    positions = {value: pos for pos, value in enumerate(sorted(strings))}
+
+    tmp = f"{path}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(MAGIC)
+            f.write(_PREAMBLE.pack(0, 0))
+            header = {
+                "version": SNAPSHOT_VERSION,
+                "byteorder": sys.byteorder,
+                "schema": _models.field_kinds(),
+                "strings": _write_strings(f, positions),
+                "tables": {
+                    tag: _write_table(f, CLASSES[tag], columns, positions)
+                    for tag, columns in tables.items()
+                },
+            }
+            data = json.dumps(header).encode()
+            offset = f.tell()
+            f.write(data)
+            f.seek(len(MAGIC))
+            f.write(_PREAMBLE.pack(offset, len(data)))
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return {tag: len(columns["id"]) for tag, columns in tables.items()}
+
+
+def _encode_table(
+    concrete: type[_models.Row], objs: Iterable[object], strings: set[str]
+) -> dict[str, list]:
+    """
+    Stored values of objects in id order per attname, strings are collected
+    in `strings` and kept as themselves until their positions are known
+    """
+    pk = attrgetter("pk")
+    objs = sorted(objs, key=pk)
+    columns = {"id": [pk(obj) for obj in objs]}
+    for field in concrete._fields:
+        if field.primary_key:
+            continue
+        kind = KINDS[field.kind]
+        values = [kind.encode(getattr(obj, field.attname)) for obj in objs]
+        if not kind.typecode:
+            # address fields of django models hold ipaddress objects
+            texts = [None if value is None else str(value) for value in values]
+            strings.update(text for text in texts if text is not None)
+            columns[field.attname] = texts
+        else:
+            columns[field.attname] = values
+    return columns
+
+
+def _align(f: BinaryIO) -> int:
+    pad = -f.tell() % 8
+    f.write(b"\0" * pad)
+    return f.tell()
+
+
+def _write_block(f: BinaryIO, typecode: Typecode, values: Iterable) -> int:
+    offset = _align(f)
+    f.write(array(typecode, values).tobytes())
+    return offset
+
+
+def _write_strings(f: BinaryIO, positions: dict[str, int]) -> dict:
+    encoded = [value.encode() for value in positions]
+    bounds = [0]
+    for value in encoded:
+        bounds.append(bounds[-1] + len(value))
+    layout = {"count": len(encoded), "offsets": _write_block(f, "Q", bounds)}
+    layout["data"] = _align(f)
+    layout["size"] = bounds[-1]
+    f.write(b"".join(encoded))
+    return layout
+
+
+def _write_table(
+    f: BinaryIO,
+    concrete: type[_models.Row],
+    columns: dict[str, list],
+    positions: dict[str, int],
+) -> dict:
+    layout: dict = {
+        "rows": len(columns["id"]),
+        "ids": _write_block(f, "q", columns["id"]),
+        "columns": {},
+        "indexes": {},
+    }
+    for field in concrete._fields:
+        if field.primary_key:
+            continue
+        values = columns[field.attname]
+        if not KINDS[field.kind].typecode:
+            values = [
+                _NULL_STRING if value is None else positions[value] for value in values
+            ]
+        layout["columns"][field.attname] = _write_block(
+            f, _typecode(field.kind), values
+        )
+        if _indexed(field):
+            order = sorted(range(len(values)), key=values.__getitem__)
+            layout["indexes"][field.attname] = _write_block(f, "i", order)
+    updated = _decode_datetime(max(columns["updated"], default=_NULL_INT))
+    layout["last_change"] = (
+        0 if updated is None else calendar.timegm(updated.timetuple())
+    )
+    return layout
+
+
+def load_backend(**orm_config: object) -> ModuleType:
+    """
+    Configure the snapshot file from the orm config
+    """
+    database = orm_config.get("database")
+    if isinstance(database, dict) and database.get("name"):
+        Backend.database = str(database["name"])
+    return sys.modules[__name__]
@@ -0,0 +1,549 @@
+"""
+Backend keeping the resources in memory in a columnar layout, for
+analytics and tests
+
+Select it with `orm.backend: memory` (PDB_ORM_BACKEND). Every field of a
+resource is a column: integers, relations, booleans, decimals and
+timestamps are typed arrays, strings are lists of interned strings that
+repeated values share. Ids are kept in a sorted array that rows are looked
+up in by bisection, values of unique fields and relations are indexed,
+filtering by other fields scans their column. Objects are only built when
+they are read.
+
+If `orm.snapshot` (PDB_ORM_SNAPSHOT) names a file, the data is loaded from
+that snapshot file when the backend starts and written back to it when the
+process exits, see `load_snapshot` and `save_snapshot`. Nothing is persisted
+by default.
+"""
+
+import atexit
+import calendar
+import json
+import math
+import os
+import pickle
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from collections.abc import Callable, Iterable, Sequence
+from datetime import datetime, timedelta
+from itertools import islice
+from operator import attrgetter
+from types import ModuleType
+from typing import Literal, NamedTuple, SupportsFloat, SupportsInt
+
+import peeringdb
+from peeringdb.backend import reftag_to_cls
+from peeringdb.backends import _models
+
+# shipped with the client
+__version__ = peeringdb.__version__
+
+# bump when the layout of the snapshot changes
+SNAPSHOT_VERSION = 1
+
+MAGIC = b"PDBMEM\x00"
+
+_NULL_INT = -(2**63)
+
+_EPOCH = datetime(1970, 1, 1)
+
+_MICROSECOND = timedelta(microseconds=1)
+
+CLASSES = _models.concrete_classes(__name__)
+
+
+class Kind(NamedTuple):
+    """
+    Storage of a field kind: array typecode (None for a list) and the
+    conversions from and to the stored values
+    """
+
+    typecode: Literal["q", "b", "d"] | None
+    encode: Callable[[object], object]
+    decode: Callable[[object], object]
+
+
+def _encode_int(value: object) -> int:
+    if value is None:
+        return _NULL_INT
+    if not isinstance(value, (str, SupportsInt)):
+        raise TypeError(f"Not an integer: {value!r}")
+    return int(value)
+
+
+def _decode_int(value: object) -> object:
+    return None if value == _NULL_INT else value
+
+
+def _encode_bool(value: object) -> int:
+    return -1 if value is None else int(bool(value))
+
+
+def _decode_bool(value: object) -> object:
+    return None if value == -1 else bool(value)
+
+
+def _encode_float(value: object) -> float:
+    if value is None:
+        return math.nan
+    if not isinstance(value, (str, SupportsFloat)):
+        raise TypeError(f"Not a number: {value!r}")
+    return float(value)
+
+
+def _decode_float(value: object) -> object:
+    return None if isinstance(value, float) and math.isnan(value) else value
+
+
+def _encode_datetime(value: object) -> int:
+    if value is None:
+        return _NULL_INT
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.rstrip("Z"))
+    if not isinstance(value, datetime):
+        raise TypeError(f"Not a datetime: {value!r}")
+    return (value.replace(tzinfo=None) - _EPOCH) // _MICROSECOND
+
+
+def _decode_datetime(value: object) -> datetime | None:
+    if not isinstance(value, int) or value == _NULL_INT:
+        return None
+    return _EPOCH + timedelta(microseconds=value)
+
+
+def _encode_str(value: object) -> object:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _identity(value: object) -> object:
+    return value
+
+
+def _encode_choices(value: object) -> object:
+    if isinstance(value, (list, tuple, set)):
+        value = ",".join(value)
+    return _encode_str(value)
+
+
+def _decode_choices(value: object) -> object:
+    if not isinstance(value, str):
+        return None
+    return value.split(",") if value else []
+
+
+def _encode_json(value: object) -> object:
+    if value is None:
+        return None
+    return sys.intern(json.dumps(value, separators=(",", ":")))
+
+
+def _decode_json(value: object) -> object:
+    return json.loads(value) if isinstance(value, str) else None
+
+
+KINDS = {
+    "int": Kind("q", _encode_int, _decode_int),
+    "fk": Kind("q", _encode_int, _decode_int),
+    "bool": Kind("b", _encode_bool, _decode_bool),
+    "decimal": Kind("d", _encode_float, _decode_float),
+    "datetime": Kind("q", _encode_datetime, _decode_datetime),
+    "char": Kind(None, _encode_str, _identity),
+    "choices": Kind(None, _encode_choices, _decode_choices),
+    "text": Kind(None, _identity, _identity),
+    "json": Kind(None, _encode_json, _decode_json),
+}
+
+
+def _container(kind: Kind) -> array | list:
+    return array(kind.typecode) if kind.typecode else []
+
+
+class Table:
+    """
+    Columns of a concrete class, rows are kept in id order
+    """
+
+    def __init__(self, concrete: type[_models.Row]) -> None:
+        self.concrete = concrete
+        # (attname, kind) of the fields other than the id
+        self.kinds = [
+            (field.attname, KINDS[field.kind])
+            for field in concrete._fields
+            if not field.primary_key
+        ]
+        self._kinds = dict(self.kinds)
+        self._values = attrgetter(*(attname for attname, _ in self.kinds))
+        self._encoders = [kind.encode for _, kind in self.kinds]
+        # value -> id per unique field
+        self.unique: dict[str, dict[object, int]] = {
+            field.attname: {} for field in concrete._fields if field.unique
+        }
+        # (position in a row, index) of the unique fields
+        self._indexes = [
+            (pos, self.unique[attname])
+            for pos, (attname, _) in enumerate(self.kinds)
+            if attname in self.unique
+        ]
+        # value -> ids per relation, objects are mostly filtered by these
+        self.related: dict[str, dict[object, set[int]]] = {
+            field.attname: {} for field in concrete._fields if field.kind == "fk"
+        }
+        self._groups = [
+            (pos, self.related[attname])
+            for pos, (attname, _) in enumerate(self.kinds)
+            if attname in self.related
+        ]
+        self._attach(
+            array("q"), {attname: _container(kind) for attname, kind in self.kinds}
+        )
+
+    def _attach(self, ids: array, columns: dict[str, array | list]) -> None:
+        self.ids = ids
+        self.columns = columns
+        # columns in the order of `kinds`
+        self._columns = [columns[attname] for attname, _ in self.kinds]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def position(self, pk: object) -> int | None:
+        """
+        Row of an id, None if there is none
+        """
+        if not isinstance(pk, (str, SupportsInt)):
+            return None
+        try:
+            pk = int(pk)
+        except ValueError:
+            return None
+        idx = bisect_left(self.ids, pk)
+        if idx < len(self.ids) and self.ids[idx] == pk:
+            return idx
+        return None
+
+    def row(self, idx: int) -> tuple:
+        """
+        Stored values of a row
+        """
+        return tuple(column[idx] for column in self._columns)
+
+    def get(self, idx: int, attnames: Sequence[str] | None = None) -> _models.Row:
+        """
+        Object of a row, with the fields of `attnames` only if passed
+        """
+        obj = self.concrete.__new__(self.concrete)
+        obj.id = self.ids[idx]
+        if attnames is not None:
+            for attname in attnames:
+                setattr(obj, attname, self.value(idx, attname))
+            return obj
+        for (attname, kind), column in zip(self.kinds, self._columns):
+            setattr(obj, attname, kind.decode(column[idx]))
+        return obj
+
+    def value(self, idx: int, attname: str) -> object:
+        """
+        Value of a field in a row
+        """
+        if attname == "id":
+            return self.ids[idx]
+        return self._kinds[attname].decode(self.columns[attname][idx])
+
+    def put(self, pk: int, values: tuple) -> tuple | None:
+        """
+        Write the stored values of a row
+
+        :returns: the values it replaced, None if the row is new
+        """
+        ids = self.ids
+        if not ids or pk > ids[-1]:
+            # rows mostly arrive in id order
+            old = None
+            ids.append(pk)
+            for column, value in zip(self._columns, values):
+                column.append(value)
+        else:
+            idx = bisect_left(ids, pk)
+            if idx < len(ids) and ids[idx] == pk:
+                old = self.row(idx)
+                self._unindex(pk, old)
+                for column, value in zip(self._columns, values):
+                    column[idx] = value
+            else:
+                old = None
+                ids.insert(idx, pk)
+                for column, value in zip(self._columns, values):
+                    column.insert(idx, value)
+        for pos, index in self._indexes:
+            if values[pos] is not None:
+                index[values[pos]] = pk
+        for pos, group in self._groups:
+            group.setdefault(values[pos], set()).add(pk)
+        return old
+
+    def remove(self, pk: int) -> None:
+        idx = self.position(pk)
+        if idx is None:
+            return
+        self._unindex(pk, self.row(idx))
+        del self.ids[idx]
+        for column in self._columns:
+            del column[idx]
+
+    def encode(self, obj: _models.Row) -> tuple:
+        """
+        Stored values of an object
+        """
+        return tuple(
+            encode(value) for encode, value in zip(self._encoders, self._values(obj))
+        )
+
+    def _unindex(self, pk: int, values: tuple) -> None:
+        for pos, index in self._indexes:
+            if index.get(values[pos]) == pk:
+                del index[values[pos]]
+        for pos, group in self._groups:
+            pks = group.get(values[pos])
+            if pks is not None:
+                pks.discard(pk)
+                if not pks:
+                    del group[values[pos]]
+
+    def matches(self, attname: str, value: object) -> list[int]:
+        """
+        Rows whose `attname` equals a value
+        """
+        if attname == "id":
+            idx = self.position(value)
+            return [] if idx is None else [idx]
+        stored = self._kinds[attname].encode(value)
+        if attname in self.unique:
+            pk = self.unique[attname].get(stored)
+            idx = None if pk is None else self.position(pk)
+            return [] if idx is None else [idx]
+        if attname in self.related:
+            pks = self.related[attname].get(stored, ())
+            return sorted(bisect_left(self.ids, pk) for pk in pks)
+        # other fields are not indexed, filtering by them scans the column
+        return [idx for idx, v in enumerate(self.columns[attname]) if v == stored]
+
+    def dump(self) -> dict:
+        return {"ids": self.ids, "columns": self.columns}
+
+    def load(self, data: dict) -> None:
+        self._attach(data["ids"], data["columns"])
+        for pos, index in self._indexes:
+            index.clear()
+            index.update(
+                (value, pk)
+                for pk, value in zip(self.ids, self._columns[pos])
+                if value is not None
+            )
+        for pos, group in self._groups:
+            group.clear()
+            for pk, value in zip(self.ids, self._columns[pos]):
+                group.setdefault(value, set()).add(pk)
+
+
+class Atomic:
+    """
+    Transaction whose writes are undone if it fails, nested ones roll back
+    their own writes only
+    """
+
+    def __init__(self, backend: "Backend") -> None:
+        self.backend = backend
+
+    def __enter__(self) -> None:
+        self.backend._lock.acquire()
+        self.mark = len(self.backend._undo)
+        self.backend._depth += 1
+
+    def __exit__(self, exc_type: type | None, *args: object) -> None:
+        backend = self.backend
+        try:
+            backend._depth -= 1
+            if exc_type is not None:
+                backend._rollback(self.mark)
+            elif not backend._depth:
+                backend._undo.clear()
+        finally:
+            backend._lock.release()
+
+
+class Backend(_models.TableBackend[Table]):
+    # snapshot file, set from the config by `load_backend`
+    snapshot: str | None = None
+
+    RESOURCE_MAP = _models.resource_map(CLASSES)
+
+    REFTAG_CONCRETE = dict(CLASSES)
+
+    def __init__(self, snapshot: str | None = None) -> None:
+        """
+        :param snapshot: File the data is loaded from and saved to at exit,
+            defaults to `snapshot`
+        """
+        if snapshot is None:
+            snapshot = self.snapshot
+        self.tables = {concrete: Table(concrete) for concrete in CLASSES.values()}
+        self._lock = threading.RLock()
+        # (table, id, replaced values) of the writes of the open transactions
+        self._undo: list[tuple[Table, int, tuple | None]] = []
+        self._depth = 0
+        self._changed = False
+        for concrete in CLASSES.values():
+            concrete._backend = self
+        self.path = snapshot
+        if snapshot:
+            if os.path.exists(snapshot):
+                self.load_snapshot(snapshot)
+            atexit.register(self._save_changes)
+
+    def atomic_transaction(self) -> Atomic:
+        return Atomic(self)
+
+    def _rollback(self, mark: int) -> None:
+        while len(self._undo) > mark:
+            table, pk, old = self._undo.pop()
+            if old is None:
+                table.remove(pk)
+            else:
+                table.put(pk, old)
+
+    def _write(self, table: Table, obj: _models.Row) -> None:
+        if obj.id is None:
+            obj.id = (table.ids[-1] if len(table) else 0) + 1
+        pk = obj.id
+        old = table.put(pk, table.encode(obj))
+        if self._depth:
+            self._undo.append((table, pk, old))
+        self._changed = True
+
+    @reftag_to_cls
+    def last_change(self, concrete: type) -> int:
+        updated = self.tables[concrete].columns["updated"]
+        latest = _decode_datetime(max(updated, default=_NULL_INT))
+        if latest is None:
+            return 0
+        return int(calendar.timegm(latest.timetuple()))
+
+    def _taken(
+        self, concrete: type, field: _models.Field, value: object, pk: object
+    ) -> bool:
+        table = self.tables[concrete]
+        holder = table.unique[field.attname].get(KINDS[field.kind].encode(value))
+        return holder is not None and holder != pk
+
+    def save(self, obj: object) -> None:
+        with self._lock:
+            row = _models.as_row(obj)
+            self._write(self.tables[type(row)], row)
+
+    @reftag_to_cls
+    def bulk_create(
+        self, concrete: type, objs: Iterable[object], batch_size: int = 1000
+    ) -> int:
+        table = self.tables[concrete]
+        iterator = iter(objs)
+        count = 0
+        while chunk := list(islice(iterator, max(batch_size, 1))):
+            with self.atomic_transaction():
+                for obj in chunk:
+                    row = _models.as_row(obj)
+                    if table.position(row.id) is not None:
+                        raise _models.IntegrityError(
+                            f"{concrete.__name__} {row.id} already exists"
+                        )
+                    self._write(table, row)
+            count += len(chunk)
+        return count
+
+    @reftag_to_cls
+    def bulk_upsert(
+        self, concrete: type, objs: Sequence[object], fields: Sequence[str]
+    ) -> None:
+        table = self.tables[concrete]
+        attnames = {_models.get_field(concrete, name).attname for name in fields}
+        with self.atomic_transaction():
+            for obj in objs:
+                row = _models.as_row(obj)
+                idx = table.position(row.id)
+                if idx is not None and len(attnames) < len(table.kinds):
+                    # only `fields` are updated on existing objects
+                    stored = table.get(idx)
+                    for attname in attnames:
+                        setattr(stored, attname, getattr(row, attname))
+                    row = stored
+                self._write(table, row)
+
+    def delete_all(self) -> None:
+        with self._lock:
+            for concrete in CLASSES.values():
+                self.tables[concrete] = Table(concrete)
+            self._undo.clear()
+            self._changed = True
+
+    # Snapshot
+    def save_snapshot(self, path: str | None = None) -> None:
+        """
+        Write all resources to a snapshot file, atomically replacing it
+
+        :param path: Snapshot file, defaults to the configured one
+        """
+        path = path or self.path
+        if not path:
+            raise ValueError("No snapshot file configured")
+        data = {
+            "version": SNAPSHOT_VERSION,
+            "schema": _models.field_kinds(),
+            "tables": {
+                table.concrete.tag: table.dump() for table in self.tables.values()
+            },
+        }
+        tmp = f"{path}.tmp"
+        try:
+            with self._lock, open(tmp, "wb") as f:
+                f.write(MAGIC)
+                pickle.dump(data, f, protocol=5)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        self._changed = False
+
+    def load_snapshot(self, path: str) -> None:
+        """
+        Replace all resources with the ones of a snapshot file
+
+        Raises ValueError if the file is not a snapshot of this version
+        """
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Not a memory backend snapshot: {path}")
+            data = pickle.load(f)
+        if (
+            data.get("version") != SNAPSHOT_VERSION
+            or data.get("schema") != _models.field_kinds()
+        ):
+            raise ValueError(f"Snapshot of an incompatible version: {path}")
+        with self._lock:
+            for table in self.tables.values():
+                table.load(data["tables"][table.concrete.tag])
+            self._undo.clear()
+            self._changed = False
+
+    def _save_changes(self) -> None:
+        if self._changed and self.path:
+            self.save_snapshot()
+
+
+def load_backend(**orm_config: object) -> ModuleType:
+    """
+    Configure the snapshot file from the orm config
+    """
+    snapshot = orm_config.get("snapshot")
+    Backend.snapshot = str(snapshot) if snapshot else None
+    return sys.modules[__name__]
@@ -0,0 +1,598 @@
+"""
+Backend storing the resources in a SQLite database through the standard
+library's `sqlite3` module, for replicas that don't need django
+
+Select it with `orm.backend: sqlite` (PDB_ORM_BACKEND), the database file is
+`orm.database.name`. Tables, columns and constraints are the ones of
+django_peeringdb and are created from the field metadata in `_models`,
+foreign keys are enforced. The database runs in WAL mode, so readers are not
+blocked by a sync.
+
+Every statement of a table is built once and sqlite3 keeps it prepared per
+connection; objects are written with `executemany`, updated with
+`INSERT .. ON CONFLICT (id) DO UPDATE` and looked up by a list of ids with a
+single statement that takes the ids as one JSON array.
+"""
+
+import calendar
+import json
+import re
+import sqlite3
+import sys
+import threading
+from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
+from datetime import datetime
+from itertools import islice
+from operator import attrgetter
+from types import ModuleType
+from typing import Any
+
+import peeringdb
+from peeringdb.backend import reftag_to_cls
+from peeringdb.backends import _models
+
+# shipped with the client
+__version__ = peeringdb.__version__
+
+# stored in `PRAGMA user_version`, bump when the generated schema changes
+SCHEMA_VERSION = 1
+
+# sqlite column type of the field kinds
+_COLUMN_TYPES = {
+    "auto": "INTEGER",
+    "char": "TEXT",
+    "choices": "TEXT",
+    "text": "TEXT",
+    "int": "INTEGER",
+    "bool": "INTEGER",
+    "decimal": "REAL",
+    "datetime": "TEXT",
+    "json": "TEXT",
+    "fk": "INTEGER",
+}
+
+_UNIQUE_PATTERN = re.compile(r"UNIQUE constraint failed: (\w+)\.(\w+)")
+
+CLASSES = _models.concrete_classes(__name__)
+
+
+def _quote(name: str) -> str:
+    return f'"{name}"'
+
+
+def _encode_datetime(value: object) -> object:
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None).isoformat()
+    return value
+
+
+def _encode_json(value: object) -> object:
+    return json.dumps(value)
+
+
+def _encode_choices(value: object) -> object:
+    if isinstance(value, (list, tuple, set)):
+        return ",".join(value)
+    return value
+
+
+def _decode_choices(value: str) -> list[str]:
+    return value.split(",") if value else []
+
+
+def _decode_datetime(value: object) -> object:
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return value
+
+
+_ENCODERS: dict[str, Callable[[Any], object]] = {
+    "bool": int,
+    "choices": _encode_choices,
+    "decimal": float,
+    "datetime": _encode_datetime,
+    "json": _encode_json,
+}
+
+_DECODERS: dict[str, Callable[[Any], object]] = {
+    "bool": bool,
+    "choices": _decode_choices,
+    "datetime": _decode_datetime,
+    "json": json.loads,
+}
+
+
+def _timestamp(updated: object) -> int:
+    """
+    Unix timestamp of a stored `updated` value, 0 for none
+    """
+    updated = _decode_datetime(updated)
+    if isinstance(updated, datetime):
+        return calendar.timegm(updated.timetuple())
+    return 0
+
+
+def _decode_values(
+    decoders: Sequence[tuple[str, Callable[[Any], object] | None]], values: Sequence
+) -> list:
+    return [
+        value if decode is None or value is None else decode(value)
+        for (_, decode), value in zip(decoders, values)
+    ]
+
+
+class Table:
+    """
+    Statements and value conversions of a concrete class
+    """
+
+    def __init__(self, concrete: type[_models.Row]) -> None:
+        self.concrete = concrete
+        self.name = _quote(concrete._table)
+        self.fields = concrete._fields
+        self.columns = tuple(field.column for field in self.fields)
+        self._values = attrgetter(*(field.attname for field in self.fields))
+        self._encoders = [
+            (idx, _ENCODERS[field.kind])
+            for idx, field in enumerate(self.fields)
+            if field.kind in _ENCODERS
+        ]
+        self._decoders: list[tuple[str, Callable[[Any], object] | None]] = [
+            (field.attname, _DECODERS.get(field.kind)) for field in self.fields
+        ]
+        columns = ", ".join(_quote(column) for column in self.columns)
+        self.select = f"SELECT {columns} FROM {self.name}"
+        self.select_id = f"{self.select} WHERE id = ?"
+        self.select_ids = (
+            f"{self.select} WHERE id IN (SELECT value FROM json_each(?)) ORDER BY id"
+        )
+        self.existing_ids = (
+            f"SELECT id FROM {self.name} WHERE id IN (SELECT value FROM json_each(?))"
+        )
+        marks = ", ".join("?" for _ in self.columns)
+        self.insert = f"INSERT INTO {self.name} ({columns}) VALUES ({marks})"
+        self._upserts: dict[tuple[str, ...], str] = {}
+
+    def ddl(self) -> list[str]:
+        """
+        Statements creating the table and its indexes
+        """
+        table = self.concrete._table
+        columns = []
+        statements = []
+        for field in self.fields:
+            column = f"{_quote(field.column)} {_COLUMN_TYPES[field.kind]}"
+            if field.primary_key:
+                column += " PRIMARY KEY"
+            elif not field.null:
+                column += " NOT NULL"
+            if field.is_relation:
+                # checked on commit like django's, rows of a transaction may
+                # be written before the ones they refer to
+                related = _models.row_class(field.related_concrete())
+                column += (
+                    f" REFERENCES {_quote(related._table)} (id)"
+                    " DEFERRABLE INITIALLY DEFERRED"
+                )
+            columns.append(column)
+            if field.unique:
+                statements.append(
+                    f"CREATE UNIQUE INDEX IF NOT EXISTS "
+                    f"{_quote(f'{table}_{field.column}_uniq')} "
+                    f"ON {self.name} ({_quote(field.column)})"
+                )
+            elif field.is_relation or field.name == "updated":
+                statements.append(
+                    f"CREATE INDEX IF NOT EXISTS "
+                    f"{_quote(f'{table}_{field.column}_idx')} "
+                    f"ON {self.name} ({_quote(field.column)})"
+                )
+        if self.concrete._unique_together:
+            together = ", ".join(
+                _quote(field.column) for field in self.concrete._unique_together
+            )
+            columns.append(f"UNIQUE ({together})")
+        statements.insert(
+            0, f"CREATE TABLE IF NOT EXISTS {self.name} ({', '.join(columns)})"
+        )
+        return statements
+
+    def column(self, field_name: str) -> str:
+        """
+        Quoted column of a field, by field name or column
+        """
+        return _quote(_models.get_field(self.concrete, field_name).column)
+
+    def upsert(self, field_names: Sequence[str]) -> str:
+        """
+        Insert statement updating `field_names` of the rows that exist
+        """
+        key = tuple(field_names)
+        statement = self._upserts.get(key)
+        if statement is None:
+            columns = [self.column(name) for name in key if name != "id"]
+            if columns:
+                updates = ", ".join(
+                    f"{column} = excluded.{column}" for column in columns
+                )
+                statement = f"{self.insert} ON CONFLICT (id) DO UPDATE SET {updates}"
+            else:
+                statement = f"{self.insert} ON CONFLICT (id) DO NOTHING"
+            self._upserts[key] = statement
+        return statement
+
+    def encode(self, obj: object) -> list:
+        """
+        Column values of an object
+        """
+        values = list(self._values(obj))
+        for idx, encode in self._encoders:
+            if values[idx] is not None:
+                values[idx] = encode(values[idx])
+        return values
+
+    def decode(
+        self,
+        values: Sequence,
+        decoders: Sequence[tuple[str, Callable[[Any], object] | None]] | None = None,
+    ) -> _models.Row:
+        """
+        Object of a selected row
+
+        :param decoders: (attname, decode) of the selected columns, all
+            columns if not passed, see `projection`
+        """
+        obj = self.concrete.__new__(self.concrete)
+        for (attname, decode), value in zip(decoders or self._decoders, values):
+            if decode is not None and value is not None:
+                value = decode(value)
+            setattr(obj, attname, value)
+        return obj
+
+    def projection(
+        self, field_names: Sequence[str]
+    ) -> tuple[str, list[tuple[str, Callable[[Any], object] | None]]]:
+        """
+        Statement selecting the columns of `field_names` and their
+        (attname, decode) for `decode`
+        """
+        fields = [_models.get_field(self.concrete, name) for name in field_names]
+        columns = ", ".join(_quote(field.column) for field in fields)
+        return (
+            f"SELECT {columns} FROM {self.name}",
+            [(field.attname, _DECODERS.get(field.kind)) for field in fields],
+        )
+
+    def where(self, filters: Mapping[str, object] | None) -> tuple[str, list]:
+        """
+        Clause matching rows whose fields equal `filters` and its parameters
+        """
+        clauses = []
+        params = []
+        for field_name, value in (filters or {}).items():
+            field = _models.get_field(self.concrete, field_name)
+            if isinstance(value, _models.Row):
+                value = value.pk
+            elif value is not None and field.kind in _ENCODERS:
+                value = _ENCODERS[field.kind](value)
+            clauses.append(f"{_quote(field.column)} IS ?")
+            params.append(value)
+        if not clauses:
+            return "", params
+        return f" WHERE {' AND '.join(clauses)}", params
+
+
+TABLES: dict[type, Table] = {concrete: Table(concrete) for concrete in CLASSES.values()}
+
+
+class Atomic:
+    """
+    Transaction of the calling thread's connection, nested ones are
+    savepoints
+    """
+
+    def __init__(self, backend: "Backend") -> None:
+        self.backend = backend
+
+    def __enter__(self) -> None:
+        local = self.backend._local
+        connection = self.backend.connection()
+        depth = getattr(local, "depth", 0)
+        if depth:
+            connection.execute(f"SAVEPOINT sp{depth}")
+        else:
+            connection.execute("BEGIN")
+        local.depth = depth + 1
+
+    def __exit__(self, exc_type: type | None, *args: object) -> None:
+        local = self.backend._local
+        connection = self.backend.connection()
+        local.depth = depth = local.depth - 1
+        if depth:
+            if exc_type is not None:
+                connection.execute(f"ROLLBACK TO sp{depth}")
+            connection.execute(f"RELEASE sp{depth}")
+        else:
+            connection.execute("COMMIT" if exc_type is None else "ROLLBACK")
+
+
+class Backend(_models.ModelBackend):
+    # database file and whether to create the schema, set from the config
+    # by `load_backend`
+    database = "peeringdb.sqlite3"
+    migrate = True
+
+    RESOURCE_MAP = _models.resource_map(CLASSES)
+
+    REFTAG_CONCRETE = dict(CLASSES)
+
+    def __init__(self, database: str | None = None) -> None:
+        """
+        :param database: Database file, ":memory:" for a database shared
+            by the connections of this instance; defaults to `database`
+        """
+        if database is None:
+            database = self.database
+        if database == ":memory:":
+            self._uri = f"file:peeringdb-{id(self)}?mode=memory&cache=shared"
+        else:
+            self._uri = f"file:{database}"
+        self._local = threading.local()
+        # an in memory database lives as long as a connection to it is open
+        self._keep = self.connection() if database == ":memory:" else None
+        for concrete in CLASSES.values():
+            concrete._backend = self
+        if self.migrate and not self.is_database_migrated():
+            self.migrate_database()
+
+    def connection(self) -> sqlite3.Connection:
+        """
+        Connection of the calling thread
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self._uri,
+                uri=True,
+                timeout=30,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+            connection.execute("PRAGMA foreign_keys = ON")
+            self._local.connection = connection
+            self._local.depth = 0
+        return connection
+
+    def atomic_transaction(self) -> Atomic:
+        return Atomic(self)
+
+    def close_connection(self) -> None:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None and connection is not self._keep:
+            connection.close()
+            self._local.connection = None
+
+    def _select(self, concrete: type, sql: str, params: Sequence = ()) -> list:
+        table = TABLES[concrete]
+        return [
+            table.decode(values) for values in self.connection().execute(sql, params)
+        ]
+
+    @reftag_to_cls
+    def last_change(self, concrete: type) -> int:
+        table = TABLES[concrete]
+        (updated,) = (
+            self.connection()
+            .execute(f"SELECT max(updated) FROM {table.name}")
+            .fetchone()
+        )
+        return _timestamp(updated)
+
+    def last_change_all(self) -> dict[str, int | None]:
+        sql = " UNION ALL ".join(
+            f"SELECT ?, max(updated) FROM {table.name}" for table in TABLES.values()
+        )
+        tags = [table.concrete.tag for table in TABLES.values()]
+        return {
+            tag: _timestamp(updated)
+            for tag, updated in self.connection().execute(sql, tags)
+        }
+
+    @reftag_to_cls
+    def count(self, concrete: type, filters: Mapping[str, object] | None = None) -> int:
+        table = TABLES[concrete]
+        where, params = table.where(filters)
+        (count,) = (
+            self.connection()
+            .execute(f"SELECT count(*) FROM {table.name}{where}", params)
+            .fetchone()
+        )
+        return count
+
+    @reftag_to_cls
+    def get_object(self, concrete: type, id: str | int) -> object:
+        found = self._select(concrete, TABLES[concrete].select_id, (id,))
+        if not found:
+            raise self.object_missing_error(concrete)(
+                f"{concrete.__name__} {id} does not exist"
+            )
+        return found[0]
+
+    @reftag_to_cls
+    def get_objects(
+        self, concrete: type, ids: Sequence[str | int] | None = None
+    ) -> list:
+        table = TABLES[concrete]
+        if ids:
+            return self._select(
+                concrete, table.select_ids, (json.dumps([int(pk) for pk in ids]),)
+            )
+        return self._select(concrete, f"{table.select} ORDER BY id")
+
+    @reftag_to_cls
+    def iter_objects(
+        self,
+        concrete: type,
+        filters: Mapping[str, object] | None = None,
+        fields: Sequence[str] | None = None,
+        chunk_size: int = 1000,
+    ) -> Iterator[object]:
+        table = TABLES[concrete]
+        decoders = None
+        select = table.select
+        if fields:
+            select, decoders = table.projection(
+                ["id", *(name for name in fields if name != "id")]
+            )
+        where, params = table.where(filters)
+        cursor = self.connection().execute(f"{select}{where} ORDER BY id", params)
+        while rows := cursor.fetchmany(max(chunk_size, 1)):
+            for values in rows:
+                yield table.decode(values, decoders)
+
+    @reftag_to_cls
+    def iter_values(
+        self,
+        concrete: type,
+        fields: Sequence[str],
+        filters: Mapping[str, object] | None = None,
+        chunk_size: int = 1000,
+    ) -> Iterator[tuple]:
+        table = TABLES[concrete]
+        select, decoders = table.projection(fields)
+        where, params = table.where(filters)
+        cursor = self.connection().execute(f"{select}{where} ORDER BY id", params)
+        while rows := cursor.fetchmany(max(chunk_size, 1)):
+            for values in rows:
+                yield tuple(_decode_values(decoders, values))
+
+    @reftag_to_cls
+    def get_objects_map(
+        self, concrete: type, ids: Iterable[str | int], chunk_size: int = 500
+    ) -> dict[str | int, object]:
+        # ids are passed as one json parameter, there is no limit to chunk for
+        ids = list(ids)
+        if not ids:
+            return {}
+        return {obj.pk: obj for obj in self.get_objects(concrete, ids)}
+
+    @reftag_to_cls
+    def existing_ids(
+        self, concrete: type, ids: Iterable[str | int], chunk_size: int = 500
+    ) -> set[str | int]:
+        ids = json.dumps([int(pk) for pk in ids])
+        return {
+            pk
+            for (pk,) in self.connection().execute(
+                TABLES[concrete].existing_ids, (ids,)
+            )
+        }
+
+    @reftag_to_cls
+    def get_objects_by(self, concrete: type, field_name: str, value: object) -> list:
+        table = TABLES[concrete]
+        if isinstance(value, _models.Row):
+            value = value.pk
+        return self._select(
+            concrete,
+            f"{table.select} WHERE {table.column(field_name)} = ? ORDER BY id",
+            (value,),
+        )
+
+    def _taken(
+        self, concrete: type, field: _models.Field, value: object, pk: object
+    ) -> bool:
+        table = TABLES[concrete]
+        return (
+            self.connection()
+            .execute(
+                f"SELECT 1 FROM {table.name} "
+                f"WHERE {_quote(field.column)} = ? AND id IS NOT ?",
+                (value, pk),
+            )
+            .fetchone()
+            is not None
+        )
+
+    def _exists(self, concrete: type, pk: object) -> bool:
+        table = TABLES[concrete]
+        return (
+            self.connection()
+            .execute(f"SELECT 1 FROM {table.name} WHERE id = ?", (pk,))
+            .fetchone()
+            is not None
+        )
+
+    def save(self, obj: object) -> None:
+        obj = _models.as_row(obj)
+        table = TABLES[type(obj)]
+        cursor = self.connection().execute(
+            table.upsert(table.columns), table.encode(obj)
+        )
+        if obj.id is None:
+            obj.id = cursor.lastrowid
+
+    @reftag_to_cls
+    def bulk_create(
+        self, concrete: type, objs: Iterable[object], batch_size: int = 1000
+    ) -> int:
+        table = TABLES[concrete]
+        iterator = iter(objs)
+        count = 0
+        while chunk := list(islice(iterator, max(batch_size, 1))):
+            with self.atomic_transaction():
+                self.connection().executemany(
+                    table.insert, [table.encode(obj) for obj in chunk]
+                )
+            count += len(chunk)
+        return count
+
+    @reftag_to_cls
+    def bulk_upsert(
+        self, concrete: type, objs: Sequence[object], fields: Sequence[str]
+    ) -> None:
+        if not objs:
+            return
+        table = TABLES[concrete]
+        self.connection().executemany(
+            table.upsert(fields), [table.encode(obj) for obj in objs]
+        )
+
+    def detect_uniqueness_error(self, exc: Exception) -> list[str] | None:
+        if isinstance(exc, sqlite3.IntegrityError):
+            m = _UNIQUE_PATTERN.search(str(exc))
+            return [m.group(2)] if m else None
+        return super().detect_uniqueness_error(exc)
+
+    # Database
+    def migrate_database(self, verbosity: int = 0) -> None:
+        with self.atomic_transaction():
+            connection = self.connection()
+            for table in TABLES.values():
+                for statement in table.ddl():
+                    connection.execute(statement)
+            connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def is_database_migrated(self, **kwargs: str | int | bool) -> bool:
+        (version,) = self.connection().execute("PRAGMA user_version").fetchone()
+        return version == SCHEMA_VERSION
+
+    def delete_all(self) -> None:
+        with self.atomic_transaction():
+            connection = self.connection()
+            for table in reversed(list(TABLES.values())):
+                connection.execute(f"DELETE FROM {table.name}")
+
+
+def load_backend(**orm_config: object) -> ModuleType:
+    """
+    Configure the backend from the orm config, the schema is created when
+    the backend is instantiated unless `migrate` is off
+    """
+    database = orm_config.get("database")
+    if isinstance(database, dict) and database.get("name"):
+        Backend.database = str(database["name"])
+    Backend.migrate = bool(orm_config.get("migrate", True))
+    return sys.modules[__name__]
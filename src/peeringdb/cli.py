@@ -17,6 +17,10 @@ COMMANDS = {
         },
         help="Configuration management",
     ),
+    "snapshot": commands.CommandGroup(
+        {"build": commands.BuildSnapshot},
+        help="Read-only snapshot files for the mmap backend",
+    ),
     "drop-tables": commands.DropTables,
     "server": commands.Server,
 }
@@ -1,5 +1,5 @@
 from collections import OrderedDict
-from collections.abc import Mapping
+from collections.abc import Iterator, Mapping
 from typing import TYPE_CHECKING
 
 import munge.util
@@ -20,11 +20,28 @@ if TYPE_CHECKING:
 
 
 class _Query:
-    """Wrapper to access a specific resource"""
+    """Wrapper to access a specific resource
 
-    def __init__(self, client: "Client", res: type) -> None:
+    `filter` and `only` return narrowed copies, objects are read lazily by
+    `iter` and `values`:
+
+        for asn, ipaddr4, ipaddr6 in client.tags.netixlan.filter(
+            status="ok"
+        ).values("asn", "ipaddr4", "ipaddr6"):
+            ...
+    """
+
+    def __init__(
+        self,
+        client: "Client",
+        res: type,
+        filters: Mapping[str, object] | None = None,
+        fields: tuple[str, ...] = (),
+    ) -> None:
         self.client = client
         self.res = res
+        self.filters: dict[str, object] = dict(filters or {})
+        self.fields = fields
 
     def get(self, pk: int | str) -> object:
         return self.client.get(self.res, pk)
@@ -32,6 +49,43 @@ class _Query:
     def all(self, **kwargs: object) -> object:
         return self.client.all(self.res, **kwargs)
 
+    def filter(self, **eq: object) -> "_Query":
+        """Narrow to the objects whose fields equal the keyword arguments"""
+        return _Query(self.client, self.res, {**self.filters, **eq}, self.fields)
+
+    def only(self, *fields: str) -> "_Query":
+        """Load only `fields` of the objects, backends may skip the others"""
+        return _Query(self.client, self.res, self.filters, fields)
+
+    def iter(self, chunk_size: int = 1000) -> Iterator[object]:
+        """Iterate over the objects, read `chunk_size` at a time"""
+        backend = get_backend()
+        return backend.iter_objects(
+            backend.get_concrete(self.res),
+            self.filters,
+            self.fields or None,
+            chunk_size,
+        )
+
+    def values(self, *fields: str, chunk_size: int = 1000) -> Iterator[tuple]:
+        """Iterate over tuples of field values, `only` fields by default,
+        relations give the id of the related object"""
+        fields = fields or self.fields
+        if not fields:
+            raise ValueError("values() needs field names")
+        backend = get_backend()
+        return backend.iter_values(
+            backend.get_concrete(self.res), fields, self.filters, chunk_size
+        )
+
+    def count(self) -> int:
+        """Number of objects"""
+        backend = get_backend()
+        return backend.count(backend.get_concrete(self.res), self.filters)
+
+    def __iter__(self) -> Iterator[object]:
+        return self.iter()
+
 
 class Client:
     """Main PeeringDB client."""
@@ -2,12 +2,14 @@ import logging
 import os
 import subprocess
 import sys
+from collections import defaultdict
 
 import munge
 
 import peeringdb
 from peeringdb import config as cfg
 from peeringdb import resource, util
+from peeringdb.backends import mapped
 from peeringdb.client import Client
 from peeringdb.output._dict import dump_python_dict
 from peeringdb.util import load_failed_entries, save_failed_entries
@@ -284,28 +286,72 @@ class Sync:
     def retry_failed_entries(client, failed_entries):  # noqa: N805
         """Retries entries that failed in previous sync runs.
 
+        Failed objects are refetched per resource with `id__in` queries,
+        resources are retried in sync order. Entries without an integer
+        primary key are retried one by one.
+
         Args:
             client (peeringdb.Client): The PeeringDB client instance.
             failed_entries (list): A list of dictionaries, where each dictionary
                                   represents a failed entry and contains
                                   "resource_tag" and "pk".
         """
-        retried_entries = []
+        pks_by_tag: defaultdict[str, set[int]] = defaultdict(set)
+        single = []
         for entry in failed_entries:
-            resource_tag = entry["resource_tag"]
-            pk = entry["pk"]
+            if isinstance(entry["pk"], int):
+                pks_by_tag[entry["resource_tag"]].add(entry["pk"])
+            else:
+                single.append(entry)
+
+        order = list(resource.RESOURCES_BY_TAG)
+        retried: set[tuple[str, int | str]] = set()
+        for resource_tag in sorted(
+            pks_by_tag, key=lambda tag: order.index(tag) if tag in order else len(order)
+        ):
+            pks = pks_by_tag[resource_tag]
+            try:
+                _log.info(f"Retrying {len(pks)} {resource_tag} entries...")
+                updated = client.updater.update_many(
+                    resource.get_resource(resource_tag), pks
+                )
+            except Exception as e:
+                _log.info(f"Error retrying {resource_tag} entries: {e}")
+                continue
+            retried.update((resource_tag, pk) for pk in updated)
+            _log.info(f"Successfully retried {len(updated)} {resource_tag} entries")
+
+        for entry in single:
+            resource_tag, pk = entry["resource_tag"], entry["pk"]
             try:
                 _log.info(f"Retrying {resource_tag}-{pk}...")
                 client.updater.update_one(resource.get_resource(resource_tag), pk)
-                retried_entries.append(entry)
-                _log.info(f"Successfully retried {resource_tag}-{pk}")
             except Exception as e:
                 _log.info(f"Error retrying {resource_tag}-{pk}: {e}")
+                continue
+            retried.add((resource_tag, pk))
+            _log.info(f"Successfully retried {resource_tag}-{pk}")
+
+        failed_entries[:] = [
+            entry
+            for entry in failed_entries
+            if (entry["resource_tag"], entry["pk"]) not in retried
+        ]
+        save_failed_entries(client.config, failed_entries)
 
-        for entry in retried_entries:
-            failed_entries.remove(entry)
 
-        save_failed_entries(client.config, failed_entries)
+class BuildSnapshot:
+    """Write the local database to a read-only snapshot file"""
+
+    @staticmethod
+    def add_arguments(parser):
+        parser.add_argument("path", help="Snapshot file to write")
+
+    @_handler
+    def handle(config, path, **_):  # noqa: N805
+        client = Client(config)
+        counts = mapped.build(path, client)
+        print(f"Wrote {sum(counts.values())} objects to {path}")
 
 
 class DropTables:
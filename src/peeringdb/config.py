@@ -11,6 +11,7 @@ from confu import generator
 from confu import schema as _schema
 from munge.util import recursive_update
 
+from peeringdb._ratelimit import DEFAULT_RATE_BURST, DEFAULT_RATE_LIMIT
 from peeringdb.util import prompt
 
 DEFAULT_CONFIG_DIR = "~/.peeringdb"
@@ -71,6 +72,50 @@ class ClientSchema(_schema.Schema):
             "lookback",
             default=int(os.environ.get("PDB_SYNC_LOOKBACK", "1")),
         )
+        pool_size = _schema.Int(
+            "pool_size", default=int(os.environ.get("PDB_SYNC_POOL_SIZE", "10"))
+        )
+        keep_alive = _schema.Int(
+            "keep_alive", default=int(os.environ.get("PDB_SYNC_KEEP_ALIVE", "1"))
+        )
+        connect_retries = _schema.Int(
+            "connect_retries",
+            default=int(os.environ.get("PDB_SYNC_CONNECT_RETRIES", "3")),
+        )
+        prefetch = _schema.Int(
+            "prefetch", default=int(os.environ.get("PDB_SYNC_PREFETCH", "4"))
+        )
+        stream = _schema.Int(
+            "stream", default=int(os.environ.get("PDB_SYNC_STREAM", "0"))
+        )
+        batch_size = _schema.Int(
+            "batch_size", default=int(os.environ.get("PDB_SYNC_BATCH_SIZE", "1000"))
+        )
+        cache_codec = _schema.Str(
+            "cache_codec", default=os.environ.get("PDB_SYNC_CACHE_CODEC", "none")
+        )
+        snapshot = _schema.Int(
+            "snapshot", default=int(os.environ.get("PDB_SYNC_SNAPSHOT", "0"))
+        )
+        rate_limit = _schema.Float(
+            "rate_limit",
+            default=float(os.environ.get("PDB_SYNC_RATE_LIMIT", DEFAULT_RATE_LIMIT)),
+        )
+        rate_burst = _schema.Int(
+            "rate_burst",
+            default=int(os.environ.get("PDB_SYNC_RATE_BURST", DEFAULT_RATE_BURST)),
+        )
+        write_workers = _schema.Int(
+            "write_workers",
+            default=int(os.environ.get("PDB_SYNC_WRITE_WORKERS", "1")),
+        )
+        commit_every = _schema.Int(
+            "commit_every",
+            default=int(os.environ.get("PDB_SYNC_COMMIT_EVERY", "1000")),
+        )
+        digests = _schema.Int(
+            "digests", default=int(os.environ.get("PDB_SYNC_DIGESTS", "1"))
+        )
 
     class OrmSchema(_schema.Schema):
         class OrmDbSchema(_schema.Schema):
@@ -102,6 +147,9 @@ class ClientSchema(_schema.Schema):
             "backend", default=os.environ.get("PDB_ORM_BACKEND", "django_peeringdb")
         )
         migrate = _schema.Bool("migrate", default=True)
+        snapshot = _schema.Str(
+            "snapshot", blank=True, default=os.environ.get("PDB_ORM_SNAPSHOT", "")
+        )
         database = OrmDbSchema()
 
     class LogSchema(_schema.Schema):
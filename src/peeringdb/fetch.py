@@ -1,20 +1,158 @@
 import base64
+import codecs
 import json
 import logging
 import os
+import pickle
 import re
 import time
 import urllib
+from collections.abc import Iterable, Iterator, Mapping
+from typing import IO, cast
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+from peeringdb import _codec, _snapshot
+from peeringdb._ratelimit import (
+    DEFAULT_RATE_BURST,
+    DEFAULT_RATE_LIMIT,
+    RateLimiter,
+    parse_retry_after,
+)
 from peeringdb.private import PRIVATE_OBJECTS
+from peeringdb.util import chunked
 
 
 class CompatibilityError(Exception):
     pass
 
 
+# read size used when streaming payloads from the network or the cache files
+CHUNK_SIZE = 64 * 1024
+
+# ids per `id__in` request, keeps the query string well within URL limits
+ID_IN_CHUNK_SIZE = 100
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+class RowStream:
+    """
+    Incremental parser for `{"data": [...], ...}` payloads.
+
+    Iterating yields the rows of the `data` list one at a time while reading
+    the document from an iterable of byte chunks, so only the row being
+    parsed and the current chunk are held in memory.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._chunks = iter(chunks)
+        self._decode = codecs.getincrementaldecoder("utf-8")().decode
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        """
+        Append the next chunk to the buffer, returns False at end of input
+        """
+        if self._eof:
+            return False
+        chunk = next(self._chunks, None)
+        # drop everything that was parsed already
+        self._buf = self._buf[self._pos :]
+        self._pos = 0
+        if chunk is None:
+            self._eof = True
+            self._buf += self._decode(b"", final=True)
+            return False
+        self._buf += self._decode(chunk)
+        return True
+
+    def _peek(self) -> str:
+        """
+        Skip whitespace and return the next character
+        """
+        while True:
+            match = _WHITESPACE.match(self._buf, self._pos)
+            if match is not None:
+                self._pos = match.end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON payload")
+
+    def _expect(self, char: str) -> None:
+        found = self._peek()
+        if found != char:
+            raise ValueError(f"Expected '{char}' in JSON payload, found '{found}'")
+        self._pos += 1
+
+    def _value(self) -> object:
+        """
+        Decode the next complete JSON value, reading more input as needed
+        """
+        self._peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # a value that ends exactly at the end of the buffer may be a
+            # truncated number, so make sure it's complete
+            if end == len(self._buf) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def _rows(self) -> Iterator[dict[str, str | int | bool | list | dict]]:
+        self._expect("[")
+        if self._peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            row = self._value()
+            if not isinstance(row, dict):
+                raise ValueError(f"Expected object in data list, got {type(row)}")
+            yield row
+            sep = self._peek()
+            self._pos += 1
+            if sep == "]":
+                return
+            if sep != ",":
+                raise ValueError(f"Expected ',' or ']' in data list, found '{sep}'")
+
+    def __iter__(self) -> Iterator[dict[str, str | int | bool | list | dict]]:
+        self._expect("{")
+        if self._peek() == "}":
+            raise ValueError("JSON payload has no data list")
+        while True:
+            key = self._value()
+            self._expect(":")
+            if key == "data":
+                yield from self._rows()
+                # anything after the data list (meta) is not needed
+                return
+            self._value()
+            if self._peek() != ",":
+                raise ValueError("JSON payload has no data list")
+            self._pos += 1
+
+
+def _tee(chunks: Iterable[bytes], fobj: IO[bytes]) -> Iterator[bytes]:
+    """
+    Pass chunks through while writing them to `fobj`
+    """
+    for chunk in chunks:
+        fobj.write(chunk)
+        yield chunk
+
+
 class Fetcher:
     def __init__(
         self,
@@ -22,6 +160,10 @@ class Fetcher:
         timeout: int,
         api_key: str = "",
         cache_url: str = "",
+        pool_size: int = 10,
+        connect_retries: int = 3,
+        rate_limit: float = DEFAULT_RATE_LIMIT,
+        rate_burst: int = DEFAULT_RATE_BURST,
         **kwargs: str | int | bool | dict,
     ) -> None:
         """
@@ -33,11 +175,39 @@ class Fetcher:
         :param cache_dir: Local cache directory
         :param retry: The maximum number of retry attempts when rate limited
                       (default is 5)
+        :param pool_size: Number of keep-alive connections kept per host
+        :param keep_alive: Reuse connections between requests (default True)
+        :param connect_retries: Retry attempts on connection errors
+        :param stream: Stream resource payloads, `entries` then returns an
+            iterator that parses rows as they are read
+        :param cache_codec: Compression for the local cache files (none, gzip,
+            zstd), existing files are decoded whatever codec they were written
+            with
+        :param snapshot: Keep a pre-parsed binary snapshot next to each local
+            cache file and load it instead of the JSON while it is current,
+            off by default
+        :param rate_limit: API requests per minute, 0 for no client side limit
+        :param rate_burst: API requests allowed back to back
         :param kwargs:
         """
         self._log: logging.Logger = logging.getLogger(__name__)
 
         self.resources: dict[str, list[dict[str, str | int | bool | list | dict]]] = {}
+        # loaded resources waiting to be consumed in streaming mode
+        self._streams: dict[
+            str, Iterator[dict[str, str | int | bool | list | dict]]
+        ] = {}
+        # id -> row lookup per loaded resource, built on first `get`
+        self._indexes: dict[
+            str,
+            tuple[
+                list[dict[str, str | int | bool | list | dict]],
+                dict[int, dict[str, str | int | bool | list | dict]],
+            ],
+        ] = {}
+        self.stream: bool = bool(kwargs.get("stream", False))
+        self.cache_codec: str = _codec.resolve(str(kwargs.get("cache_codec", "none")))
+        self.snapshot: bool = bool(kwargs.get("snapshot", False))
         # normalize to avoid `//` in URL concatenations like f"{self.url}/{endpoint}"
         self.url: str = url.rstrip("/")
         self.timeout: int = timeout or 60
@@ -51,18 +221,77 @@ class Fetcher:
         proxy: str = str(kwargs.get("proxy", ""))
         self.proxies: dict[str, str] = {"http": proxy, "https": proxy} if proxy else {}
 
+        # connection pool settings for the shared session
+        self.pool_size: int = pool_size or 10
+        self.keep_alive: bool = bool(kwargs.get("keep_alive", True))
+        self.connect_retries: int = connect_retries
+        self.session: requests.Session = self._session()
+
         # Used for testing
         self.remote_cache_used: bool = False
+        self.remote_cache_revalidated: bool = False
         self.local_cache_used: bool = False
+        self.snapshot_used: bool = False
 
-        # used for sync 429 status code (pause and resume)
-        self.attempt: int = 0
+        # paces API requests and backs off from 429 responses, shared by
+        # all threads using this fetcher
+        self.ratelimit: RateLimiter = RateLimiter(rate=rate_limit, burst=rate_burst)
 
-    def _get(
-        self, endpoint: str, **params: str | int
-    ) -> list[dict[str, str | int | bool | list | dict]]:
+    @property
+    def attempt(self) -> int:
+        """
+        Consecutive rate limited requests, reset by a successful one
+        """
+        return self.ratelimit.attempt
+
+    def _session(self) -> requests.Session:
+        """
+        Build the pooled HTTP session shared by API, remote cache and whois
+        requests, so that TLS connections are reused instead of re-established
+        for every request.
+        """
+        session = requests.Session()
+        # only retry failed connects, a request that reached the server is
+        # handled (or not) by the caller
+        retry = Retry(
+            total=self.connect_retries,
+            connect=self.connect_retries,
+            read=0,
+            status=0,
+            other=0,
+            backoff_factor=0.5,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_size,
+            pool_maxsize=self.pool_size,
+            max_retries=retry,
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        if not self.keep_alive:
+            session.headers["Connection"] = "close"
+        return session
+
+    def close(self) -> None:
+        """
+        Close all pooled connections
+        """
+        self.session.close()
+
+    def _request(
+        self,
+        endpoint: str,
+        params: Mapping[str, str | int] | None = None,
+        stream: bool = False,
+    ) -> requests.Response:
+        """
+        Send an API request, waiting out rate limits, and return the response
+        :param endpoint: API endpoint (i.e. "net")
+        :param params: Query parameters
+        :param stream: Defer reading the response body
+        """
         url = f"{self.url}/{endpoint}"
-        url_params = urllib.parse.urlencode(params)
+        url_params = urllib.parse.urlencode(params or {})
         if url_params:
             url = f"{url}?{url_params}"
         headers = {}
@@ -76,20 +305,27 @@ class Fetcher:
             }
 
         while True:
+            self.ratelimit.acquire()
             try:
-                resp = requests.get(
-                    url, timeout=self.timeout, headers=headers, proxies=self.proxies
+                resp = self.session.get(
+                    url,
+                    timeout=self.timeout,
+                    headers=headers,
+                    proxies=self.proxies,
+                    stream=stream,
                 )
                 resp.raise_for_status()
-                return resp.json()["data"]
+                self.ratelimit.success()
+                return resp
             except requests.exceptions.HTTPError:
                 if resp.status_code == 429:
-                    retry_after = min(2**self.attempt, 60)
+                    resp.close()
+                    retry_after = self.ratelimit.backoff(
+                        parse_retry_after(resp.headers.get("Retry-After"))
+                    )
                     self._log.info(
-                        f"Rate limited. Retrying in {retry_after} seconds..."
+                        f"Rate limited. Retrying in {retry_after:.1f} seconds..."
                     )
-                    time.sleep(retry_after)
-                    self.attempt += 1
                 elif resp.status_code == 400:
                     error = resp.json().get("meta", {}).get("error", "")
                     if re.search("client version is incompatible", error):
@@ -100,12 +336,215 @@ class Fetcher:
             except requests.exceptions.RequestException as err:
                 raise ValueError(f"Request error: {err}")
 
+    def _get(
+        self, endpoint: str, **params: str | int
+    ) -> list[dict[str, str | int | bool | list | dict]]:
+        resp = self._request(endpoint, params=params)
+        try:
+            return resp.json()["data"]
+        except requests.exceptions.RequestException as err:
+            raise ValueError(f"Request error: {err}")
+
+    def _stream_response(
+        self, resp: requests.Response
+    ) -> Iterator[dict[str, str | int | bool | list | dict]]:
+        """
+        Yield rows from a streamed response as they are received
+        """
+        try:
+            yield from RowStream(resp.iter_content(CHUNK_SIZE))
+        finally:
+            resp.close()
+
+    def _stream_cache_file(
+        self, cache_file: str
+    ) -> Iterator[dict[str, str | int | bool | list | dict]]:
+        """
+        Yield rows from a local cache file
+        """
+        with _codec.open_reader(cache_file) as f:
+            yield from RowStream(iter(lambda: f.read(CHUNK_SIZE), b""))
+
+    def _stream_remote_cache(
+        self, resp: requests.Response, cache_file: str
+    ) -> Iterator[dict[str, str | int | bool | list | dict]]:
+        """
+        Yield rows from a streamed remote cache response while teeing the
+        payload to `cache_file`. The file is only moved into place once the
+        complete payload was read, so an aborted sync never leaves a
+        truncated cache behind.
+
+        If the server compressed the response with the configured cache codec
+        the bytes are stored as received and only decompressed for parsing,
+        otherwise they are (re)compressed with the codec on the way to disk.
+        """
+        tmp = f"{cache_file}.tmp"
+        encoding = resp.headers.get("Content-Encoding", "").strip().lower()
+        passthrough = (
+            self.cache_codec != "none"
+            and encoding == self.cache_codec
+            and hasattr(resp.raw, "stream")
+        )
+        fobj: IO[bytes]
+        try:
+            if passthrough:
+                raw = resp.raw.stream(CHUNK_SIZE, decode_content=False)
+                fobj = open(tmp, "wb")
+            else:
+                raw = resp.iter_content(CHUNK_SIZE)
+                fobj = _codec.open_writer(tmp, self.cache_codec)
+            with fobj as f:
+                chunks = _tee(raw, f)
+                if passthrough:
+                    yield from RowStream(_codec.decompress(chunks, encoding))
+                else:
+                    yield from RowStream(chunks)
+                # read the remainder of the document (meta) into the file
+                for _ in chunks:
+                    pass
+            os.replace(tmp, cache_file)
+            self._write_validators(cache_file, resp)
+        finally:
+            resp.close()
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def _load_cache_file(self, resource: str, cache_file: str) -> None:
+        """
+        Load a resource from its local cache file
+        """
+        if self.stream:
+            self._streams[resource] = self._stream_cache_file(cache_file)
+            return
+
+        rows = _snapshot.load(cache_file) if self.snapshot else None
+        if rows is not None:
+            self._log.debug(f"[{resource}] Using snapshot of {cache_file}")
+            self.snapshot_used = True
+        else:
+            with _codec.open_reader(cache_file) as f:
+                rows = json.load(f)["data"]
+            self._write_snapshot(cache_file, rows)
+        self.resources[resource] = rows
+
+    def _write_snapshot(self, cache_file: str, rows: list) -> None:
+        """
+        Snapshot the parsed rows of a cache file, failing to do so only costs
+        the next warm start a JSON parse
+        """
+        if not self.snapshot:
+            return
+        try:
+            _snapshot.dump(cache_file, rows)
+        except (OSError, pickle.PicklingError) as exc:
+            self._log.warning(f"Could not write snapshot of {cache_file}: {exc}")
+
+    def _validators_path(self, cache_file: str) -> str:
+        return f"{cache_file}.headers"
+
+    def _read_validators(self, cache_file: str) -> dict[str, str]:
+        """
+        Conditional request headers for revalidating `cache_file`, empty if
+        there is no cached copy or nothing to revalidate it with
+        """
+        if not os.path.exists(cache_file):
+            return {}
+        try:
+            with open(self._validators_path(cache_file)) as f:
+                validators = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(validators, dict):
+            return {}
+        headers = {}
+        if validators.get("etag"):
+            headers["If-None-Match"] = str(validators["etag"])
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = str(validators["last_modified"])
+        return headers
+
+    def _write_validators(self, cache_file: str, resp: requests.Response) -> None:
+        """
+        Store the ETag / Last-Modified of a remote cache response next to the
+        cache file it was written to, or drop stale ones if there are none
+        """
+        path = self._validators_path(cache_file)
+        validators = {
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+        }
+        if not any(validators.values()):
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        # write-then-rename, same as the cache file itself
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(validators, f)
+        os.replace(tmp, path)
+
+    def _load_remote_cache(self, resource: str, cache_file: str) -> None:
+        """
+        Load a resource from the remote cache, revalidating the local copy
+        with a conditional request if we have one
+        """
+        cache_url = f"{self.cache_url}/{resource}-0.json"
+        self._log.info(f"[{resource}] Fetching from remote cache")
+        self._log.info(f"[{resource}] {cache_url}")
+
+        headers = self._read_validators(cache_file)
+        if self.cache_codec != "none":
+            # ask for the payload in the codec we store it in, so it can be
+            # written to disk as received
+            headers["Accept-Encoding"] = self.cache_codec
+
+        resp = self.session.get(
+            cache_url,
+            timeout=self.timeout,
+            proxies=self.proxies,
+            stream=self.stream or self.cache_codec != "none",
+            headers=headers,
+        )
+
+        if resp.status_code == 304:
+            # unchanged upstream, the local copy is fresh for another while
+            resp.close()
+            self._log.info(f"[{resource}] Remote cache not modified")
+            os.utime(cache_file)
+            self._load_cache_file(resource, cache_file)
+            self.remote_cache_used = True
+            self.remote_cache_revalidated = True
+
+        elif resp.status_code == 200:
+            # make sure dir exists
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+            if self.stream:
+                self._streams[resource] = self._stream_remote_cache(resp, cache_file)
+            elif self.cache_codec != "none":
+                self.resources[resource] = list(
+                    self._stream_remote_cache(resp, cache_file)
+                )
+                self._write_snapshot(cache_file, self.resources[resource])
+            else:
+                with open(cache_file, "w") as f:
+                    f.write(resp.text)
+                self._write_validators(cache_file, resp)
+                self.resources[resource] = resp.json()["data"]
+                self._write_snapshot(cache_file, self.resources[resource])
+            self.remote_cache_used = True
+        else:
+            raise ValueError(
+                f"Error fetching {resource} @ {cache_url} from remote cache: "
+                f"{resp.status_code}"
+            )
+
     def load(
         self,
         resource: str,
         since: int | None = 0,
         fetch_private: bool = False,
-        delay: float = 0.5,
+        delay: float = 0,
     ) -> None:
         """
         Load a resource from mock data.
@@ -114,8 +553,13 @@ class Fetcher:
             objects the caller passes the since_private watermark (None on the
             first private fetch, which grabs everything).
         :param fetch_private: Fetch private data (poc, ixlan)
+        :param delay: Extra pause after an API request, requests are already
+            paced by `ratelimit`
+
+        In streaming mode only the request is made here, rows are parsed when
+        the iterator returned by `entries` is consumed.
         """
-        if resource in self.resources:
+        if resource in self.resources or resource in self._streams:
             return
 
         cache_file = os.path.join(self.cache_dir, f"{resource}-0.json")
@@ -136,55 +580,61 @@ class Fetcher:
         ):
             self._log.info(f"[{resource}] Fetching from local cache")
             self._log.info(f"[{resource}] {cache_file}")
-            with open(cache_file) as f:
-                self.resources[resource] = json.load(f)["data"]
+            self._load_cache_file(resource, cache_file)
             self.local_cache_used = True
 
         # Fetch from remote cache if available
         elif not since and self.cache_url and not fetch_private:
-            cache_url = f"{self.cache_url}/{resource}-0.json"
-            self._log.info(f"[{resource}] Fetching from remote cache")
-            self._log.info(f"[{resource}] {cache_url}")
-
-            resp = requests.get(cache_url, timeout=self.timeout, proxies=self.proxies)
-
-            if resp.status_code == 200:
-                # make sure dir exists
-                os.makedirs(self.cache_dir, exist_ok=True)
-
-                with open(cache_file, "w") as f:
-                    f.write(resp.text)
-                self.resources[resource] = resp.json()["data"]
-                self.remote_cache_used = True
-            else:
-                url = f"{self.cache_url}/{resource}-0.json"
-                raise ValueError(
-                    f"Error fetching {resource} @ {url} from remote cache: "
-                    f"{resp.status_code}"
-                )
+            self._load_remote_cache(resource, cache_file)
 
         # Fall back to fetching from API
         else:
             self._log.info(
                 f"[{resource}] Fetching from API {'(private)' if fetch_private else ''}"
             )
-            if not since or since == 0:
-                self.resources[resource] = self._get(resource)
+            params = {"since": since} if since else {}
+            if self.stream:
+                self._streams[resource] = self._stream_response(
+                    self._request(resource, params=params, stream=True)
+                )
             else:
-                self.resources[resource] = self._get(resource, since=since)
+                self.resources[resource] = self._get(resource, **params)
 
-            time.sleep(delay)
+            if delay:
+                time.sleep(delay)
 
-    def entries(self, tag: str) -> list[dict[str, str | int | bool | list | dict]]:
+    def entries(
+        self, tag: str
+    ) -> (
+        list[dict[str, str | int | bool | list | dict]]
+        | Iterator[dict[str, str | int | bool | list | dict]]
+    ):
         """
         Get all entries by tag ro load it if we don't already have the resource
+
+        In streaming mode this returns an iterator that yields the rows as
+        they are parsed, it can only be consumed once.
         :param tag: Resource tag (i.e. "net")
         :return:
         """
-        if tag not in self.resources:
+        if tag not in self.resources and tag not in self._streams:
             self.load(tag)
+        if tag in self._streams:
+            return self._streams.pop(tag)
         return self.resources[tag]
 
+    def _index(self, tag: str) -> dict[int, dict[str, str | int | bool | list | dict]]:
+        """
+        id -> row index of a loaded resource, rebuilt if the resource was
+        replaced since it was created
+        """
+        rows = self.resources[tag]
+        cached = self._indexes.get(tag)
+        if cached is None or cached[0] is not rows:
+            cached = (rows, {cast(int, row["id"]): row for row in rows})
+            self._indexes[tag] = cached
+        return cached[1]
+
     def get(
         self, tag: str, pk: int, depth: int = 0, force_fetch: bool = False
     ) -> dict[str, str | int | bool | list | dict]:
@@ -199,10 +649,41 @@ class Fetcher:
             objs = self._get(tag, since=1, id=pk, depth=depth)
             if len(objs) > 0:
                 return objs[0]
-        for row in self.resources[tag]:
-            if row["id"] == pk:
-                return row
+        row = self._index(tag).get(pk)
+        if row is not None:
+            return row
         objs = self._get(tag, since=1, id=pk, depth=depth)
         if len(objs) > 0:
             return objs[0]
         raise ValueError(f"Object {tag} {pk} not found")
+
+    def get_many(
+        self, tag: str, pks: Iterable[int], depth: int = 0
+    ) -> list[dict[str, str | int | bool | list | dict]]:
+        """
+        Get several objects at once, ids not found in the loaded resource
+        are fetched with `id__in` queries of up to `ID_IN_CHUNK_SIZE` ids.
+        Ids that do not exist upstream are left out of the result.
+        :param tag: Resource tag (i.e. "net")
+        :param pks: Primary keys
+        :param depth: Depth of related objects to fetch
+        """
+        index = self._index(tag) if tag in self.resources else {}
+        rows = []
+        missing = []
+        for pk in sorted(set(pks)):
+            row = index.get(pk)
+            if row is not None:
+                rows.append(row)
+            else:
+                missing.append(pk)
+        for chunk in chunked(missing, ID_IN_CHUNK_SIZE):
+            rows.extend(
+                self._get(
+                    tag,
+                    since=1,
+                    id__in=",".join(str(pk) for pk in chunk),
+                    depth=depth,
+                )
+            )
+        return rows
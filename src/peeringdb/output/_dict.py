@@ -9,7 +9,7 @@ if TYPE_CHECKING:
 import django_countries.fields
 
 from peeringdb import get_backend
-from peeringdb.util import group_fields
+from peeringdb._plan import plan
 
 
 class DictWrap:
@@ -24,7 +24,7 @@ class DictWrap:
                 "many_refs": {},
             }
         else:
-            self.fields = group_fields(backend, o.__class__)
+            self.fields = plan(backend, o.__class__).groups
 
     @staticmethod
     def _resolve_one(name: str, value: object | None, depth: int) -> dict | int | None:
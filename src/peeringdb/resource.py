@@ -3,7 +3,11 @@ PeeringDB resource definitions
 """
 
 from collections import OrderedDict
-from collections.abc import Callable
+from collections.abc import Callable, Iterable
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from peeringdb.backend import Interface
 
 # Generate classes
 _NAMES: OrderedDict[str, str] = OrderedDict(
@@ -49,3 +53,32 @@ get: Callable[[str], type] = get_resource
 
 def all_resources() -> list[type]:
     return list(RESOURCES_BY_TAG.values())
+
+
+def dependency_graph(
+    backend: "Interface", resources: Iterable[type] | None = None
+) -> OrderedDict[type, set[type]]:
+    """
+    Map each resource to the resources it references through a foreign key,
+    derived from the field metadata of the backend. Only relations between
+    `resources` (default all) are included, in the order given.
+    """
+    resources = all_resources() if resources is None else list(resources)
+    graph: OrderedDict[type, set[type]] = OrderedDict((res, set()) for res in resources)
+    for res in resources:
+        concrete = backend.get_concrete(res)
+        for field in backend.get_fields(concrete):
+            name = getattr(field, "name", None)
+            # reverse relations are not columns of this resource
+            if name is None or not getattr(field, "concrete", True):
+                continue
+            related, multiple = backend.is_field_related(concrete, name)
+            if not related or multiple:
+                continue
+            target = backend.get_field_concrete(concrete, name)
+            if not backend.is_concrete(target):
+                continue
+            dependency = backend.get_resource(target)
+            if dependency in graph and dependency is not res:
+                graph[res].add(dependency)
+    return graph
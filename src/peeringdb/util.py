@@ -2,16 +2,25 @@ import json
 import logging
 import re
 import resource as sys_resource
+from collections.abc import Iterable, Iterator
+from itertools import islice
 from pathlib import Path
-from typing import TYPE_CHECKING, cast
+from typing import TYPE_CHECKING
 
 from django.core import serializers
 
+from peeringdb import _journal
+
 if TYPE_CHECKING:
     from peeringdb.backend import Field, Interface
     from peeringdb.client import Client
 
 
+def _failed_entries_file(config: dict[str, str | dict]) -> str | None:
+    sync_config = config["sync"]
+    return sync_config.get("failed_entries") if isinstance(sync_config, dict) else None
+
+
 def load_failed_entries(
     config: dict[str, str | dict],
 ) -> list[dict[str, str | int]]:
@@ -21,48 +30,28 @@ def load_failed_entries(
     Returns:
         list: a list of failed entries
     """
-    sync_config = config["sync"]
-    failed_entries_file = (
-        sync_config.get("failed_entries") if isinstance(sync_config, dict) else None
-    )
+    failed_entries_file = _failed_entries_file(config)
 
     if failed_entries_file is None:
         return []
-    try:
-        with open(failed_entries_file) as f:
-            data = f.read()
-            if data:
-                return json.loads(data)
-            else:
-                return []
-    except FileNotFoundError:
-        return []
-    except json.JSONDecodeError as e:
-        logging.warning(
-            f"Failed entries file '{failed_entries_file}' contains invalid JSON "
-            f"and will be ignored: {e}"
-        )
-        return []
+    return _journal.journal(failed_entries_file).entries()
 
 
 def save_failed_entries(
     config: dict[str, str | dict], entries: list[dict[str, str | int]]
 ) -> None:
     """
-    Save a list of failed entries to the failed entries file
+    Save a list of failed entries to the failed entries file, replacing
+    the entries in it
 
     Args:
         entries (list): a list of failed entries
     """
-    sync_config = config["sync"]
-    failed_entries_file = (
-        sync_config.get("failed_entries") if isinstance(sync_config, dict) else None
-    )
+    failed_entries_file = _failed_entries_file(config)
 
     if failed_entries_file is None:
         return
-    with open(failed_entries_file, "w") as f:
-        json.dump(entries, f, indent=4)
+    _journal.journal(failed_entries_file).replace(entries)
 
 
 def log_error(
@@ -72,7 +61,7 @@ def log_error(
     error_message: str,
 ) -> None:
     """
-    Log an error and save the failed entry to the failed entries file
+    Log an error and append the failed entry to the failed entries file
 
     Args:
         resource_tag (str): the resource tag
@@ -80,12 +69,12 @@ def log_error(
         error_message (str): the error message
     """
     logging.error(f"Error syncing {resource_tag}-{pk}: {error_message}")
-    failed_entries = load_failed_entries(config)
+    failed_entries_file = _failed_entries_file(config)
 
+    if failed_entries_file is None:
+        return
     new_entry = {"resource_tag": resource_tag, "pk": pk, "error": error_message}
-    if new_entry not in failed_entries:
-        failed_entries.append(new_entry)
-        save_failed_entries(config, failed_entries)
+    _journal.journal(failed_entries_file).append(new_entry)
 
 
 def split_ref(string: str) -> tuple[str, int]:
@@ -121,18 +110,11 @@ def group_fields(
     ret: dict[str, dict[str, Field]] = {kind: {} for kind in groups}
     if concrete is None:
         return ret
-    fields = backend.get_fields(concrete)
-    # Cast to the expected type to help mypy understand the iteration
-    field_list = cast("list[Field]", fields)
-    for field in field_list:
+    for field in backend.get_fields(concrete):
         name = getattr(field, "name", None)
         if name is None:
             continue
-        field_info = backend.is_field_related(concrete, name)
-        if isinstance(field_info, tuple) and len(field_info) == 2:
-            related, multiple = field_info
-        else:
-            related, multiple = False, False
+        related, multiple = backend.is_field_related(concrete, name)
 
         if related:
             if multiple:
@@ -146,6 +128,16 @@ def group_fields(
     return ret
 
 
+def chunked(iterable: Iterable, size: int) -> Iterator[list]:
+    """Split an iterable into lists of at most `size` items"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
 def limit_mem(limit: int = (4 * 1024**3)) -> None:
     """Set soft memory limit"""
     rsrc = sys_resource.RLIMIT_DATA
@@ -163,8 +155,7 @@ def client_dump(client: "Client", path: Path) -> None:
     assert path.is_dir(), path
     tags_all: list = getattr(client.tags, "all", lambda: [])()
     for q in tags_all:
-        q_all: list = getattr(q, "all", lambda: [])()
-        ser = serializers.serialize("json", q_all)
+        ser = serializers.serialize("json", q.iter())
         tag = getattr(getattr(q, "res", None), "tag", "unknown")
         outpath = path / f"{tag}.json"
         with open(outpath, "w") as out:
@@ -1,6 +1,9 @@
+import copy
+import json
 from pathlib import Path
 
 import pytest
+import requests
 
 import peeringdb
 from peeringdb.util import client_load
@@ -111,3 +114,47 @@ def client_fixture(filename, scope="function"):
         return peeringdb.client.Client(CONFIG)
 
     return pytest.fixture(scope=scope)(func)
+
+
+def sync_from_cache_files(backend, tmp_path, monkeypatch):
+    """
+    Sync all resources into `backend` twice from the cache files in the
+    data directory, returning the number of objects per tag afterwards
+    """
+    from unittest.mock import patch
+
+    from peeringdb.resource import all_resources
+
+    def side_effect(url, *args, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        if "?since" in url:
+            response._content = json.dumps({"data": []}).encode()
+        else:
+            path = data_path() / "cache" / url.split("/")[-1]
+            response._content = path.read_bytes()
+        return response
+
+    monkeypatch.setattr("peeringdb.__backend", (backend, ("test", "0.1.0")))
+    config = copy.deepcopy(CONFIG_CACHING)
+    config["sync"]["cache_dir"] = str(tmp_path / "cache")
+    config["sync"]["failed_entries"] = str(tmp_path / "failed.json")
+    with patch("requests.Session.get", side_effect=side_effect):
+        for _ in range(2):
+            client = peeringdb.client.Client(config)
+            client.updater.update_all(all_resources())
+    assert not (tmp_path / "failed.json").exists()
+    return {res.tag: len(client.all(res)) for res in all_resources()}
+
+
+def cache_file_counts():
+    """
+    Number of objects per tag in the cache files of the data directory
+    """
+    from peeringdb.resource import all_resources
+
+    counts = {}
+    for res in all_resources():
+        with open(data_path() / "cache" / f"{res.tag}-0.json") as f:
+            counts[res.tag] = len(json.load(f)["data"])
+    return counts
@@ -29,9 +29,116 @@ def test_init():
         peeringdb.initialize_backend("_mock")
 
 
+def test_reftag_to_cls():
+    from peeringdb.backend import class_keyed, reftag_to_cls
+
+    class Backend:
+        REFTAG_CONCRETE = {"org": int}
+        REFTAG_RESOURCE = {"org": str}
+
+        @reftag_to_cls
+        def get(self, concrete, field_name=None):
+            return concrete
+
+        @reftag_to_cls
+        def both(self, resource, concrete):
+            return resource, concrete
+
+        @reftag_to_cls
+        def neither(self, obj):
+            return obj
+
+    backend = Backend()
+    assert backend.get("org") is int
+    assert backend.get(concrete="org") is int
+    assert backend.get(float, "org") is float
+    assert backend.both("org", "org") == (str, int)
+    assert backend.both(bytes, concrete="org") == (bytes, int)
+    assert backend.neither("org") == "org"
+
+    # class-keyed variants skip the reftag lookup
+    assert class_keyed(backend.get)(float) is float
+    assert class_keyed(backend.get)("org") == "org"
+    assert class_keyed(backend.neither) == backend.neither
+
+
 client = helper.client_fixture("full")
 
 
+def test_get_objects_map(client):
+    backend = peeringdb.get_backend()
+    concrete = backend.get_concrete(peeringdb.resource.Organization)
+
+    found = backend.get_objects_map(concrete, [1, 2, 1, 999999], chunk_size=1)
+
+    assert sorted(found) == [1, 2]
+    assert all(found[pk].id == pk for pk in found)
+
+
+def test_batch_reads(client):
+    backend = peeringdb.get_backend()
+    concrete = backend.get_concrete(peeringdb.resource.Organization)
+
+    assert backend.existing_ids(concrete, [1, 2, 999999], chunk_size=1) == {1, 2}
+    assert backend.count(concrete) == len(backend.get_objects(concrete))
+    last_changes = backend.last_change_all()
+    assert list(last_changes) == list(peeringdb.resource.RESOURCES_BY_TAG)
+    assert last_changes["org"] == backend.last_change(concrete)
+
+
+def test_django_backend(client):
+    from peeringdb.backends.django import DjangoBackend
+
+    backend = peeringdb.get_backend()
+    assert isinstance(backend, DjangoBackend)
+    concrete = backend.get_concrete(peeringdb.resource.Organization)
+    org = backend.get_object(concrete, 1)
+    org.name = "renamed"
+    backend.bulk_upsert(concrete, [org], ["name"])
+    assert backend.get_object(concrete, 1).name == "renamed"
+
+
+def test_django_existing_ids(client):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    backend = peeringdb.get_backend()
+    concrete = backend.get_concrete(peeringdb.resource.Organization)
+    with CaptureQueriesContext(connection) as queries:
+        found = backend.existing_ids(concrete, [1, 2, 999999], chunk_size=2)
+    assert found == {1, 2}
+    # one query per chunk, selecting the ids only
+    assert len(queries) == 2
+    assert all('"name"' not in query["sql"] for query in queries)
+
+
+def test_django_lazy_queries(client):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    backend = peeringdb.get_backend()
+    concrete = backend.get_concrete(peeringdb.resource.Network)
+    net = backend.get_object(concrete, 1)
+    filters = {"org": net.org_id, "status": "ok"}
+    expected = sorted(
+        obj.pk for obj in backend.get_objects_by(concrete, "org", net.org_id)
+    )
+
+    with CaptureQueriesContext(connection) as queries:
+        assert backend.count(concrete, filters) == len(expected)
+        objs = list(backend.iter_objects(concrete, filters, ["name"]))
+        values = list(backend.iter_values(concrete, ["asn", "org"], filters))
+    assert sorted(obj.pk for obj in objs) == expected
+    assert (net.asn, net.org_id) in values
+
+    # one query each, filtered and narrowed by the database
+    count_sql, objects_sql, values_sql = (query["sql"] for query in queries)
+    assert "COUNT(" in count_sql
+    assert all('"org_id" = ' in sql for sql in (count_sql, objects_sql, values_sql))
+    assert '"name"' in objects_sql and '"asn"' not in objects_sql
+    assert '"asn"' in values_sql and '"name"' not in values_sql
+
+
 def test_delete_all(client):
     from django.db import connection
 
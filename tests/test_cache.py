@@ -1,4 +1,6 @@
 import copy
+import gzip
+import io
 import json
 import os
 import tempfile
@@ -6,10 +8,12 @@ from unittest.mock import patch
 
 import pytest
 import requests
+import urllib3
 from helper import CONFIG_CACHING
 
+from peeringdb import _snapshot
 from peeringdb.client import Client
-from peeringdb.fetch import Fetcher
+from peeringdb.fetch import Fetcher, RowStream
 from peeringdb.resource import _NAMES as RESOURCE_NAMES
 from peeringdb.resource import all_resources
 
@@ -58,8 +62,49 @@ def test_fetcher_url_normalization(url, cache_url, expected_url, expected_cache_
     assert fetcher.cache_url == expected_cache_url
 
 
+def test_fetcher_session_pool():
+    """
+    All requests share one pooled session configured from the sync settings.
+    """
+    fetcher = Fetcher(
+        url="https://test.peeringdb.com/api",
+        timeout=0,
+        pool_size=4,
+        connect_retries=2,
+    )
+    adapter = fetcher.session.get_adapter("https://test.peeringdb.com/api")
+    assert adapter._pool_maxsize == 4
+    assert adapter.max_retries.connect == 2
+    # a request that reached the server is never replayed
+    assert adapter.max_retries.read == 0
+    assert fetcher.session.headers["Connection"] == "keep-alive"
+
+    fetcher = Fetcher(url="https://test.peeringdb.com/api", timeout=0, keep_alive=0)
+    assert fetcher.session.headers["Connection"] == "close"
+
+
+@patch("requests.Session.get")
+def test_session_reused_across_requests(mock_get):
+    """API and remote cache requests go through the same session."""
+    mock_get.side_effect = lambda url, *a, **k: _api_response({"data": []})
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        fetcher = Fetcher(
+            url="https://test.peeringdb.com/api",
+            timeout=0,
+            cache_url="cache://localhost",
+            cache_dir=cache_dir,
+        )
+        session = fetcher.session
+        fetcher.load("net", delay=0)
+        fetcher._get("org")
+
+    assert fetcher.session is session
+    assert mock_get.call_count == 2
+
+
 @pytest.mark.parametrize("tag", tags)
-@patch("requests.get")
+@patch("requests.Session.get")
 def test_fetch_cache(mock_get, fetcher, tag):
     """
     Test the _fetch_cache method
@@ -92,7 +137,7 @@ def test_fetch_cache(mock_get, fetcher, tag):
         assert data == test_data
 
 
-@patch("requests.get")
+@patch("requests.Session.get")
 def test_cache_used(mock_get, fetcher):
     """
     Test that cache is downloaded and used. Instead of parametrizing per tag,
@@ -155,9 +200,9 @@ def test_cache_used(mock_get, fetcher):
         client.backend.delete_all()
 
 
-@patch("requests.get")
+@patch("requests.Session.get")
 def test_proxy_passed_to_api_get(mock_get):
-    """Proxy setting is forwarded to requests.get for API calls."""
+    """Proxy setting is forwarded to the session for API calls."""
     proxy_url = "http://proxy.example.com:3128"
     fetcher = Fetcher(
         url="https://test.peeringdb.com/api",
@@ -176,9 +221,9 @@ def test_proxy_passed_to_api_get(mock_get):
     assert kwargs.get("proxies") == {"http": proxy_url, "https": proxy_url}
 
 
-@patch("requests.get")
+@patch("requests.Session.get")
 def test_proxy_passed_to_cache_fetch(mock_get):
-    """Proxy setting is forwarded to requests.get for remote cache fetches."""
+    """Proxy setting is forwarded to the session for remote cache fetches."""
     proxy_url = "http://proxy.example.com:3128"
     fetcher = Fetcher(
         url="https://test.peeringdb.com/api",
@@ -203,7 +248,7 @@ def test_proxy_passed_to_cache_fetch(mock_get):
     assert kwargs.get("proxies") == {"http": proxy_url, "https": proxy_url}
 
 
-@patch("requests.get")
+@patch("requests.Session.get")
 def test_cache_file_used(mock_get, fetcher):
     """
     Test that cache is downloaded and used. Instead of parametrizing per tag,
@@ -273,7 +318,7 @@ def _api_response(payload):
     return resp
 
 
-@patch("requests.get")
+@patch("requests.Session.get")
 def test_private_object_bypasses_remote_cache_and_hits_api(mock_get):
     """A private object with fetch_private=True must skip the remote cache
     (which has no private fields) and fetch from the API instead (#92)."""
@@ -298,7 +343,7 @@ def test_private_object_bypasses_remote_cache_and_hits_api(mock_get):
     assert any("test.peeringdb.com/api/ixlan" in u for u in urls)
 
 
-@patch("requests.get")
+@patch("requests.Session.get")
 def test_private_incremental_passes_since_to_api(mock_get):
     """The since_private watermark the caller passes must reach the API query."""
     mock_get.side_effect = lambda url, *a, **k: _api_response({"data": []})
@@ -317,7 +362,7 @@ def test_private_incremental_passes_since_to_api(mock_get):
     assert any("ixlan?since=201" in u for u in urls)
 
 
-@patch("requests.get")
+@patch("requests.Session.get")
 def test_private_sync_writes_and_reuses_since_private_watermark(mock_get, tmp_path):
     """End-to-end through the real backend: a --fetch-private sync seeds the
     since_private watermark for each private resource, and the next sync fetches
@@ -372,7 +417,7 @@ def test_private_sync_writes_and_reuses_since_private_watermark(mock_get, tmp_pa
     client.backend.delete_all()
 
 
-@patch("requests.get")
+@patch("requests.Session.get")
 def test_private_fetch_ignores_fresh_public_local_cache(mock_get, tmp_path):
     """A --fetch-private run must NOT read a fresh public local cache file.
 
@@ -403,3 +448,305 @@ def test_private_fetch_ignores_fresh_public_local_cache(mock_get, tmp_path):
     urls = [call.args[0] for call in mock_get.call_args_list]
     assert any("test.peeringdb.com/api/ixlan" in u for u in urls)
     assert fetcher.resources["ixlan"] == api["data"]
+
+
+def _streamed_response(body: bytes):
+    resp = requests.Response()
+    resp.status_code = 200
+    resp.raw = io.BytesIO(body)
+    return resp
+
+
+def _chunks(data: bytes, size: int):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("tag", tags)
+@pytest.mark.parametrize("size", [1, 7, 4096])
+def test_row_stream(tag, size):
+    """Rows are parsed incrementally regardless of how the input is chunked."""
+    with open(f"tests/data/cache/{tag}-0.json", "rb") as f:
+        raw = f.read()
+    assert list(RowStream(_chunks(raw, size))) == json.loads(raw)["data"]
+
+
+def test_row_stream_envelope():
+    # data does not need to be the first key, anything after it is ignored
+    payload = b'{"meta": {"n": 12}, "data": [{"id": 1}, {"id": 2}], "x": 1}'
+    assert list(RowStream(_chunks(payload, 3))) == [{"id": 1}, {"id": 2}]
+    assert list(RowStream([b'{"data": []}'])) == []
+
+    with pytest.raises(ValueError):
+        list(RowStream([b'{"meta": {}}']))
+    with pytest.raises(ValueError):
+        list(RowStream([b'{"data": [{"id": 1}, {"id"']))
+
+
+@patch("requests.Session.get")
+def test_stream_remote_cache(mock_get, tmp_path):
+    """Streamed remote cache rows are yielded while the payload is written to
+    the cache dir, the file only appears once the payload was fully read."""
+    with open("tests/data/cache/net-0.json", "rb") as f:
+        raw = f.read()
+    mock_get.side_effect = lambda url, *a, **k: _streamed_response(raw)
+
+    fetcher = Fetcher(
+        url="https://test.peeringdb.com/api",
+        timeout=0,
+        cache_url="cache://localhost",
+        cache_dir=str(tmp_path),
+        stream=True,
+    )
+    entries = fetcher.entries("net")
+    assert not isinstance(entries, list)
+    assert mock_get.call_args.kwargs["stream"] is True
+
+    cache_file = tmp_path / "net-0.json"
+    first = next(entries)
+    assert not cache_file.exists()
+
+    rows = [first] + list(entries)
+    assert rows == json.loads(raw)["data"]
+    assert cache_file.read_bytes() == raw
+    assert fetcher.remote_cache_used
+
+    # an abandoned stream leaves no (partial) cache file behind
+    cache_file.unlink()
+    fetcher = Fetcher(
+        url="https://test.peeringdb.com/api",
+        timeout=0,
+        cache_url="cache://localhost",
+        cache_dir=str(tmp_path),
+        stream=True,
+    )
+    entries = fetcher.entries("net")
+    next(entries)
+    entries.close()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_stream_local_cache(tmp_path):
+    with open("tests/data/cache/org-0.json", "rb") as f:
+        raw = f.read()
+    (tmp_path / "org-0.json").write_bytes(raw)
+
+    fetcher = Fetcher(
+        url="https://test.peeringdb.com/api",
+        timeout=0,
+        cache_dir=str(tmp_path),
+        stream=True,
+    )
+    entries = fetcher.entries("org")
+    assert fetcher.local_cache_used
+    assert list(entries) == json.loads(raw)["data"]
+
+
+@patch("requests.Session.get")
+def test_stream_api(mock_get):
+    payload = {"data": [{"id": 1}, {"id": 2}], "meta": {}}
+    mock_get.side_effect = lambda url, *a, **k: _streamed_response(
+        json.dumps(payload).encode()
+    )
+    fetcher = Fetcher(url="https://test.peeringdb.com/api", timeout=0, stream=True)
+    fetcher.load("net", since=100, delay=0)
+
+    assert "net?since=100" in mock_get.call_args.args[0]
+    assert list(fetcher.entries("net")) == payload["data"]
+
+
+@patch("requests.Session.get")
+def test_remote_cache_conditional_request(mock_get, tmp_path):
+    """Validators of a remote cache download are stored next to the cache file
+    and used to revalidate it once the local copy expired; a 304 reuses the
+    local copy and refreshes its mtime."""
+    with open("tests/data/cache/org-0.json", "rb") as f:
+        raw = f.read()
+
+    def side_effect(url, *args, headers=None, **kwargs):
+        resp = requests.Response()
+        if (headers or {}).get("If-None-Match") == '"v1"':
+            resp.status_code = 304
+            resp.raw = io.BytesIO(b"")
+            return resp
+        resp.status_code = 200
+        resp._content = raw
+        resp.headers["ETag"] = '"v1"'
+        resp.headers["Last-Modified"] = "Wed, 21 Oct 2026 07:28:00 GMT"
+        return resp
+
+    mock_get.side_effect = side_effect
+
+    def fetcher():
+        return Fetcher(
+            url="https://test.peeringdb.com/api",
+            timeout=0,
+            cache_url="cache://localhost",
+            cache_dir=str(tmp_path),
+        )
+
+    cold = fetcher()
+    cold.load("org")
+    assert mock_get.call_args.kwargs["headers"] == {}
+    assert json.loads((tmp_path / "org-0.json.headers").read_text()) == {
+        "etag": '"v1"',
+        "last_modified": "Wed, 21 Oct 2026 07:28:00 GMT",
+    }
+
+    # expire the local copy
+    cache_file = tmp_path / "org-0.json"
+    os.utime(cache_file, (0, 0))
+
+    warm = fetcher()
+    warm.load("org")
+    assert mock_get.call_args.kwargs["headers"] == {
+        "If-None-Match": '"v1"',
+        "If-Modified-Since": "Wed, 21 Oct 2026 07:28:00 GMT",
+    }
+    assert warm.remote_cache_revalidated
+    assert warm.resources["org"] == cold.resources["org"]
+    assert cache_file.stat().st_mtime > 0
+
+
+@pytest.mark.parametrize("stream", [False, True])
+@patch("requests.Session.get")
+def test_remote_cache_codec(mock_get, tmp_path, stream):
+    """Cache files are compressed with the configured codec and decoded
+    transparently when read back."""
+    with open("tests/data/cache/org-0.json", "rb") as f:
+        raw = f.read()
+    mock_get.side_effect = lambda url, *a, **k: _streamed_response(raw)
+
+    fetcher = Fetcher(
+        url="https://test.peeringdb.com/api",
+        timeout=0,
+        cache_url="cache://localhost",
+        cache_dir=str(tmp_path),
+        stream=stream,
+        cache_codec="gzip",
+    )
+    rows = list(fetcher.entries("org"))
+    assert rows == json.loads(raw)["data"]
+    assert mock_get.call_args.kwargs["headers"]["Accept-Encoding"] == "gzip"
+
+    cache_file = tmp_path / "org-0.json"
+    assert gzip.decompress(cache_file.read_bytes()) == raw
+
+    # a fetcher without a codec still reads the compressed file
+    local = Fetcher(
+        url="https://test.peeringdb.com/api",
+        timeout=0,
+        cache_dir=str(tmp_path),
+        stream=stream,
+    )
+    assert list(local.entries("org")) == rows
+    assert local.local_cache_used
+
+
+@patch("requests.Session.get")
+def test_remote_cache_codec_passthrough(mock_get, tmp_path):
+    """A response encoded with the cache codec is stored as received."""
+    with open("tests/data/cache/org-0.json", "rb") as f:
+        raw = f.read()
+    body = gzip.compress(raw)
+
+    def side_effect(url, *args, **kwargs):
+        resp = requests.Response()
+        resp.status_code = 200
+        resp.headers["Content-Encoding"] = "gzip"
+        resp.raw = urllib3.HTTPResponse(
+            body=io.BytesIO(body),
+            headers={"Content-Encoding": "gzip"},
+            preload_content=False,
+        )
+        return resp
+
+    mock_get.side_effect = side_effect
+
+    fetcher = Fetcher(
+        url="https://test.peeringdb.com/api",
+        timeout=0,
+        cache_url="cache://localhost",
+        cache_dir=str(tmp_path),
+        cache_codec="gzip",
+    )
+    fetcher.load("org")
+    assert fetcher.resources["org"] == json.loads(raw)["data"]
+    assert (tmp_path / "org-0.json").read_bytes() == body
+
+
+def test_cache_codec_unknown():
+    with pytest.raises(ValueError):
+        Fetcher(url="https://test.peeringdb.com/api", timeout=0, cache_codec="lz4")
+
+
+def test_cache_snapshot(tmp_path):
+    """Parsed cache files are snapshotted and the snapshot is only used while
+    it matches the cache file."""
+    with open("tests/data/cache/org-0.json", "rb") as f:
+        raw = f.read()
+    cache_file = tmp_path / "org-0.json"
+    cache_file.write_bytes(raw)
+
+    def fetcher(**kwargs):
+        return Fetcher(
+            url="https://test.peeringdb.com/api",
+            timeout=0,
+            cache_dir=str(tmp_path),
+            **kwargs,
+        )
+
+    default = fetcher()
+    default.entries("org")
+    assert not os.path.exists(_snapshot.path(str(cache_file)))
+
+    cold = fetcher(snapshot=True)
+    rows = cold.entries("org")
+    assert not cold.snapshot_used
+    assert os.path.exists(_snapshot.path(str(cache_file)))
+
+    warm = fetcher(snapshot=True)
+    assert warm.entries("org") == rows
+    assert warm.snapshot_used
+
+    # a changed cache file invalidates the snapshot
+    data = json.loads(raw)
+    data["data"] = data["data"][:1]
+    cache_file.write_text(json.dumps(data))
+    changed = fetcher(snapshot=True)
+    assert changed.entries("org") == data["data"]
+    assert not changed.snapshot_used
+    assert _snapshot.load(str(cache_file)) == data["data"]
+
+    disabled = fetcher(snapshot=False)
+    assert disabled.entries("org") == data["data"]
+    assert not disabled.snapshot_used
+
+
+def test_cache_snapshot_invalid(tmp_path):
+    cache_file = tmp_path / "org-0.json"
+    cache_file.write_text(json.dumps({"data": [{"id": 1}]}))
+    snapshot = tmp_path / "org-0.json.pickle"
+
+    assert _snapshot.load(str(cache_file)) is None
+    snapshot.write_bytes(b"garbage")
+    assert _snapshot.load(str(cache_file)) is None
+
+    _snapshot.dump(str(cache_file), [{"id": 1}])
+    data = snapshot.read_bytes()
+    snapshot.write_bytes(data[: len(data) // 2])
+    assert _snapshot.load(str(cache_file)) is None
+
+
+@patch("requests.Session.get")
+def test_get_uses_id_index(mock_get):
+    """Loaded resources are looked up through an id index that follows
+    reloads."""
+    fetcher = Fetcher(url="https://test.peeringdb.com/api", timeout=0)
+    fetcher.resources["net"] = [{"id": i, "name": f"net{i}"} for i in range(100)]
+
+    assert fetcher.get("net", 42) == {"id": 42, "name": "net42"}
+    assert fetcher.get("net", 7)["name"] == "net7"
+    mock_get.assert_not_called()
+
+    fetcher.resources["net"] = [{"id": 42, "name": "renamed"}]
+    assert fetcher.get("net", 42)["name"] == "renamed"
@@ -10,6 +10,7 @@ import toml
 import yaml
 
 from peeringdb import cli as _cli
+from peeringdb.backends import mapped
 
 CMD = "peeringdb_test"
 
@@ -142,6 +143,13 @@ def test_droptables(runcli, client, monkeypatch):
     assert not client.tags.net.all()
 
 
+def test_snapshot_build(runcli, client, tmp_path):
+    path = str(tmp_path / "peeringdb.mmap")
+    assert runcli("snapshot", "build", path) == 0
+    backend = mapped.Backend(path)
+    assert len(backend.get_objects("net")) == len(client.tags.net.all())
+
+
 # Make sure CLI output is piped to stdout
 @pytest.mark.output
 def test_output_piping(runcli, client, capsys):
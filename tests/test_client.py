@@ -27,3 +27,19 @@ def test_update_all(client):
 def test_type_wrap(client):
     assert client.tags.net.get(NET0)
     assert client.tags.net.all()
+
+
+def test_query(client):
+    net = client.tags.net
+    objs = list(net.iter(chunk_size=1))
+    assert [obj.id for obj in objs] == [obj.id for obj in net.all()]
+    assert net.count() == len(objs)
+
+    ok = net.filter(status="ok")
+    assert ok.count() == len([obj for obj in objs if obj.status == "ok"])
+    assert [obj.id for obj in ok.filter(id=NET0)] == [NET0]
+
+    rows = list(net.only("asn", "org").values())
+    assert rows == [(obj.asn, obj.org_id) for obj in objs]
+    with pytest.raises(ValueError):
+        net.values()
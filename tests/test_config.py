@@ -79,11 +79,25 @@ def test_schema_migration():
             "failed_entries": "failed_entries.json",
             "proxy": "",
             "lookback": 1,
+            "pool_size": 10,
+            "keep_alive": 1,
+            "connect_retries": 3,
+            "prefetch": 4,
+            "stream": 0,
+            "batch_size": 1000,
+            "cache_codec": "none",
+            "snapshot": 0,
+            "rate_limit": 120.0,
+            "rate_burst": 10,
+            "write_workers": 1,
+            "commit_every": 1000,
+            "digests": 1,
         },
         "orm": {
             "backend": "django_peeringdb",
             "secret_key": "",
             "migrate": True,
+            "snapshot": "",
             "database": {
                 "engine": "sqlite3",
                 "name": "peeringdb.sqlite3",
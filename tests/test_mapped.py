@@ -0,0 +1,77 @@
+import helper
+import pytest
+
+import peeringdb
+from peeringdb.backends import mapped, memory
+from peeringdb.resource import all_resources
+
+
+@pytest.fixture
+def source(tmp_path, monkeypatch):
+    source = memory.Backend()
+    helper.sync_from_cache_files(source, tmp_path, monkeypatch)
+    return source
+
+
+@pytest.fixture
+def backend(source, tmp_path):
+    path = str(tmp_path / "peeringdb.mmap")
+    counts = mapped.build(path, peeringdb.client.Client(helper.CONFIG))
+    assert counts == helper.cache_file_counts()
+    return mapped.Backend(path)
+
+
+def test_build(source, backend):
+    for res in all_resources():
+        fields = [field.attname for field in backend.get_fields(res.tag)]
+        for obj, stored in zip(
+            source.get_objects(res.tag), backend.get_objects(res.tag), strict=True
+        ):
+            for attname in fields:
+                assert getattr(stored, attname) == getattr(obj, attname), attname
+        assert backend.last_change(res.tag) == source.last_change(res.tag)
+
+
+def test_lookups(backend):
+    net = backend.get_object("net", 1)
+    assert net.org == backend.get_object("org", net.org_id)
+    assert backend.get_object_by("net", "asn", net.asn) == net
+    assert backend.get_object_by("org", "name", net.org.name) == net.org
+    assert net in backend.get_objects_by("net", "org", net.org)
+    assert net in backend.get_objects_by("net", "status", "ok")
+    assert backend.get_objects_by("org", "name", "not in the snapshot") == []
+    assert [o.id for o in backend.get_objects("net", [3, 1, 99])] == [1, 3]
+    assert list(backend.iter_values("net", ["asn", "org"], {"id": 1})) == [
+        (net.asn, net.org_id)
+    ]
+    assert backend.count("net", {"org": net.org}) == len(
+        backend.get_objects_by("net", "org", net.org)
+    )
+    with pytest.raises(backend.object_missing_error("net")):
+        backend.get_object("net", 99)
+
+
+def test_read_only(backend, tmp_path):
+    with pytest.raises(mapped.ReadOnlyBackend):
+        backend.save(backend.get_object("org", 1))
+    with pytest.raises(mapped.ReadOnlyBackend):
+        backend.delete_all()
+
+    (tmp_path / "other").write_bytes(b"SQLite format 3\x00")
+    with pytest.raises(ValueError):
+        mapped.Backend(str(tmp_path / "other"))
+
+
+def test_reopen(backend):
+    previous = backend.mapped
+    net = backend.get_object("net", 1)
+    backend.reopen()
+    assert previous.mmap.closed
+    assert backend.get_object("net", 1) == net
+
+    backend.close()
+    assert backend.mapped is None
+    with pytest.raises(KeyError):
+        backend.get_object("net", 1)
+    backend.reopen()
+    assert backend.get_object("net", 1) == net
@@ -0,0 +1,139 @@
+from array import array
+from datetime import datetime
+
+import helper
+import pytest
+
+import peeringdb
+from peeringdb.backends import memory
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    backend = memory.Backend()
+    monkeypatch.setattr("peeringdb.__backend", (backend, ("memory", "0.1.0")))
+    return backend
+
+
+def _org(backend, pk, name, **data):
+    return backend.create_object(
+        "org",
+        id=pk,
+        name=name,
+        status="ok",
+        created=datetime(2023, 1, 1),
+        updated=datetime(2023, 1, pk),
+        **data,
+    )
+
+
+def test_columns(backend):
+    for pk in (3, 1, 2):
+        _org(backend, pk, f"org {pk}", country="US")
+    table = backend.tables[backend.get_concrete(peeringdb.resource.Organization)]
+    assert table.ids == array("q", [1, 2, 3])
+    assert isinstance(table.columns["updated"], array)
+    assert isinstance(table.columns["latitude"], array)
+    # repeated strings are shared
+    countries = table.columns["country"]
+    assert countries[0] is countries[2]
+
+    org = backend.get_object("org", 2)
+    assert org.name == "org 2"
+    assert org.latitude is None
+    assert org.updated == datetime(2023, 1, 2)
+    assert backend.get_object_by("org", "name", "org 3").id == 3
+    assert [o.id for o in backend.get_objects_by("org", "country", "US")] == [1, 2, 3]
+    assert [o.id for o in backend.get_objects("org", [3, 4, 1])] == [1, 3]
+    assert backend.last_change("org") == 1672704000
+
+
+def test_iter(backend):
+    for pk in (1, 2, 3):
+        _org(backend, pk, f"org {pk}", country="US" if pk > 1 else "DE")
+    objs = list(backend.iter_objects("org", {"country": "US"}, ["name"]))
+    assert [(o.id, o.name) for o in objs] == [(2, "org 2"), (3, "org 3")]
+    with pytest.raises(AttributeError):
+        objs[0].country
+    assert list(backend.iter_values("org", ["name"], {"country": "US", "id": 3})) == [
+        ("org 3",)
+    ]
+    assert backend.count("org", {"country": "DE"}) == 1
+
+
+def test_relation_index(backend):
+    for pk in (1, 2):
+        _org(backend, pk, f"org {pk}")
+    for pk, org_id in ((3, 1), (1, 2), (2, 1)):
+        backend.create_object(
+            "net", id=pk, org_id=org_id, name=f"net {pk}", asn=pk, status="ok"
+        )
+    table = backend.tables[backend.get_concrete(peeringdb.resource.Network)]
+    assert table.related["org_id"] == {1: {2, 3}, 2: {1}}
+    assert [o.id for o in backend.get_objects_by("net", "org", 1)] == [2, 3]
+
+    net = backend.get_object("net", 2)
+    with pytest.raises(ValueError):
+        with backend.atomic_transaction():
+            net.org_id = 2
+            backend.save(net)
+            assert [o.id for o in backend.get_objects_by("net", "org", 2)] == [1, 2]
+            raise ValueError()
+    assert table.related["org_id"] == {1: {2, 3}, 2: {1}}
+
+    backend.delete_all()
+    table = backend.tables[backend.get_concrete(peeringdb.resource.Network)]
+    assert table.related["org_id"] == {}
+
+
+def test_atomic_transaction(backend):
+    _org(backend, 1, "org 1")
+    with backend.atomic_transaction():
+        _org(backend, 2, "org 2")
+        with pytest.raises(ValueError):
+            with backend.atomic_transaction():
+                _org(backend, 1, "renamed")
+                _org(backend, 3, "org 3")
+                raise ValueError()
+    assert [o.name for o in backend.get_objects("org")] == ["org 1", "org 2"]
+
+    # the unique index is rolled back as well
+    taken = backend.get_concrete(peeringdb.resource.Organization)(
+        id=4, name="renamed", status="ok", created=datetime(2023, 1, 1)
+    )
+    taken.updated = taken.created
+    backend.clean(taken)
+    taken.name = "org 1"
+    with pytest.raises(backend.validation_error()):
+        backend.clean(taken)
+
+
+def test_snapshot(backend, tmp_path):
+    _org(backend, 1, "org 1", social_media=[{"service": "website"}])
+    path = str(tmp_path / "peeringdb.snapshot")
+    backend.save_snapshot(path)
+
+    loaded = memory.Backend(path)
+    org = loaded.get_object("org", 1)
+    assert org.social_media == [{"service": "website"}]
+    assert loaded.get_object_by("org", "name", "org 1") == org
+
+    (tmp_path / "other").write_bytes(b"SQLite format 3\x00")
+    with pytest.raises(ValueError):
+        memory.Backend(str(tmp_path / "other"))
+
+
+def test_load_backend(tmp_path, monkeypatch):
+    monkeypatch.setattr(memory.Backend, "snapshot", None)
+    database = {"name": str(tmp_path / "peeringdb.sqlite3")}
+    memory.load_backend(database=database, snapshot="")
+    assert memory.Backend.snapshot is None
+
+    path = str(tmp_path / "peeringdb.snapshot")
+    memory.load_backend(database=database, snapshot=path)
+    assert memory.Backend.snapshot == path
+
+
+def test_sync(backend, tmp_path, monkeypatch):
+    counts = helper.sync_from_cache_files(backend, tmp_path, monkeypatch)
+    assert counts == helper.cache_file_counts()
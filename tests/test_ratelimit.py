@@ -0,0 +1,90 @@
+import email.utils
+import io
+import time
+from unittest.mock import patch
+
+import pytest
+import requests
+
+from peeringdb._ratelimit import RateLimiter, parse_retry_after
+from peeringdb.fetch import Fetcher
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        (None, None),
+        ("", None),
+        ("7", 7.0),
+        ("1.5", 1.5),
+        ("-3", 0.0),
+        ("soon", None),
+    ],
+)
+def test_parse_retry_after(value, expected):
+    assert parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_date():
+    value = email.utils.formatdate(time.time() + 30, usegmt=True)
+    assert 25 < parse_retry_after(value) <= 30
+
+
+def test_token_bucket_paces_after_burst():
+    limiter = RateLimiter(rate=60, burst=2)
+    assert limiter._reserve() == 0
+    assert limiter._reserve() == 0
+    # one request per second once the burst is used up
+    assert limiter._reserve() == pytest.approx(1, abs=0.05)
+    assert limiter._reserve() == pytest.approx(2, abs=0.05)
+
+
+def test_unlimited_only_waits_for_backoff():
+    limiter = RateLimiter()
+    for _ in range(100):
+        assert limiter._reserve() == 0
+    assert limiter.backoff(5) == 5
+    assert limiter._reserve() == pytest.approx(5, abs=0.05)
+
+
+def test_backoff_jitter_and_reset():
+    limiter = RateLimiter(max_backoff=8)
+    delays = [limiter.backoff() for _ in range(6)]
+    for attempt, delay in enumerate(delays):
+        cap = min(2**attempt, 8)
+        assert cap / 2 <= delay <= cap
+    assert limiter.attempt == 6
+
+    limiter.success()
+    assert limiter.attempt == 0
+    assert limiter.backoff() <= 1
+
+
+def _response(status, headers=None):
+    resp = requests.Response()
+    resp.status_code = status
+    resp._content = b'{"data": [], "meta": {}}'
+    resp.raw = io.BytesIO(b"")
+    resp.headers.update(headers or {})
+    return resp
+
+
+@patch("time.sleep")
+@patch("requests.Session.get")
+def test_fetcher_honors_retry_after(mock_get, mock_sleep):
+    mock_get.side_effect = [
+        _response(429, {"Retry-After": "3"}),
+        _response(429),
+        _response(200),
+    ]
+    fetcher = Fetcher(url="https://test.peeringdb.com/api", timeout=0)
+    fetcher.load("net", since=100)
+
+    assert mock_get.call_count == 3
+    waits = [call.args[0] for call in mock_sleep.call_args_list]
+    assert waits[0] == pytest.approx(3, abs=0.1)
+    # sleep is mocked, so the first backoff still covers the second one
+    assert 1 <= waits[1] <= 3
+    # reset by the successful request, no fixed pause after it
+    assert fetcher.attempt == 0
+    assert len(waits) == 2
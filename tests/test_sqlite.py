@@ -0,0 +1,194 @@
+import sqlite3
+from datetime import datetime
+
+import helper
+import pytest
+
+import peeringdb
+from peeringdb.backends import sqlite
+
+
+@pytest.fixture
+def backend(tmp_path, monkeypatch):
+    backend = sqlite.Backend(str(tmp_path / "peeringdb.sqlite3"))
+    monkeypatch.setattr("peeringdb.__backend", (backend, ("sqlite", "0.1.0")))
+    yield backend
+    backend.close_connection()
+
+
+def _org(backend, pk, name):
+    return backend.create_object(
+        "org",
+        id=pk,
+        name=name,
+        status="ok",
+        created=datetime(2023, 1, 1),
+        updated=datetime(2023, 1, pk),
+    )
+
+
+def _new(backend, res, pk, **data):
+    return backend.get_concrete(res)(
+        id=pk,
+        status="ok",
+        created=datetime(2023, 1, 1),
+        updated=datetime(2023, 1, 1),
+        **data,
+    )
+
+
+def test_schema(backend):
+    assert backend.is_database_migrated()
+    connection = backend.connection()
+    assert connection.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+    columns = [
+        row[1] for row in connection.execute("PRAGMA table_info(peeringdb_network)")
+    ]
+    assert columns[:5] == ["id", "status", "created", "updated", "version"]
+    assert "org_id" in columns
+
+
+def test_objects(backend):
+    org = _org(backend, 1, "org 1")
+    _org(backend, 2, "org 2")
+    net = backend.create_object(
+        "net",
+        id=10,
+        name="net 10",
+        asn=63311,
+        org=org,
+        info_types=["NSP", "Content"],
+        social_media=[{"service": "website", "identifier": "example.com"}],
+        status="ok",
+        created=datetime(2023, 1, 1),
+        updated=datetime(2023, 1, 3),
+    )
+    assert net.org_id == 1
+
+    net = backend.get_object("net", 10)
+    assert net.org == org
+    assert net.info_types == ["NSP", "Content"]
+    assert net.social_media[0]["service"] == "website"
+    assert net.info_unicast is False
+    assert net.updated == datetime(2023, 1, 3)
+    assert backend.get_object_by("net", "asn", 63311) == net
+    assert backend.get_objects_by("net", "org", 1) == [net]
+    assert [o.id for o in backend.get_objects("org", [2, 1, 3])] == [1, 2]
+    assert len(backend.get_objects("org")) == 2
+    assert backend.last_change("org") == 1672617600
+    assert backend.last_change("fac") == 0
+
+    with pytest.raises(backend.object_missing_error("net")):
+        backend.get_object("net", 11)
+
+
+def test_bulk_write(backend):
+    org = backend.get_concrete(peeringdb.resource.Organization)
+    objs = [
+        org(id=pk, name=f"org {pk}", status="ok", created=datetime(2023, 1, 1))
+        for pk in range(1, 6)
+    ]
+    for obj in objs:
+        obj.updated = obj.created
+    assert backend.bulk_create(org, iter(objs), batch_size=2) == 5
+
+    objs[0].name = "renamed"
+    objs[0].notes = "not written"
+    backend.bulk_upsert(org, objs[:1], ["name"])
+    stored = backend.get_object(org, 1)
+    assert stored.name == "renamed"
+    assert stored.notes == ""
+
+
+def test_batch_reads(backend):
+    _org(backend, 1, "org 1")
+    _org(backend, 2, "org 2")
+    assert backend.existing_ids("org", [2, 3, 1]) == {1, 2}
+    assert sorted(backend.get_objects_map("org", iter([2, 3]))) == [2]
+    assert backend.get_objects_map("org", []) == {}
+    assert backend.count("org") == 2
+    last_changes = backend.last_change_all()
+    assert last_changes["org"] == backend.last_change("org")
+    assert last_changes["net"] == 0
+
+
+def test_iter(backend):
+    for pk in range(1, 6):
+        _org(backend, pk, f"org {pk}")
+    objs = list(backend.iter_objects("org", {"status": "ok"}, ["name"], chunk_size=2))
+    assert [(o.id, o.name) for o in objs] == [(pk, f"org {pk}") for pk in range(1, 6)]
+    with pytest.raises(AttributeError):
+        objs[0].notes
+
+    updated = datetime(2023, 1, 2)
+    assert list(
+        backend.iter_values("org", ["id", "updated"], {"updated": updated})
+    ) == [(2, updated)]
+    assert backend.count("org", {"name": "org 3"}) == 1
+    assert backend.count("org", {"latitude": None}) == 5
+
+
+def test_atomic_transaction(backend):
+    with backend.atomic_transaction():
+        _org(backend, 1, "org 1")
+        with pytest.raises(ValueError):
+            with backend.atomic_transaction():
+                _org(backend, 2, "org 2")
+                raise ValueError()
+    assert [o.id for o in backend.get_objects("org")] == [1]
+
+
+def test_clean(backend):
+    _org(backend, 1, "org 1")
+    net = backend.get_concrete(peeringdb.resource.Network)(
+        id=1, name="net 1", asn=1, org_id=2, status="ok"
+    )
+    with pytest.raises(backend.validation_error()) as exc:
+        backend.clean(net)
+    assert "created" in exc.value.error_dict
+    missing = backend.detect_missing_relations(net, exc.value)
+    assert missing == {peeringdb.resource.Organization: [2]}
+
+    org = backend.get_concrete(peeringdb.resource.Organization)(
+        id=2, name="org 1", status="ok"
+    )
+    with pytest.raises(backend.validation_error()) as exc:
+        backend.clean(org)
+    assert backend.detect_uniqueness_error(exc.value) == ["name"]
+
+
+def test_sync(backend, tmp_path, monkeypatch):
+    counts = helper.sync_from_cache_files(backend, tmp_path, monkeypatch)
+    assert counts == helper.cache_file_counts()
+
+
+def test_unique_together(backend):
+    org = _org(backend, 1, "org 1")
+    net = _new(backend, peeringdb.resource.Network, 1, name="net 1", asn=1, org=org)
+    fac = _new(backend, peeringdb.resource.Facility, 1, name="fac 1", org=org)
+    backend.save(net)
+    backend.save(fac)
+    netfac = _new(backend, peeringdb.resource.NetworkFacility, 1, net=net, fac=fac)
+    backend.save(netfac)
+    backend.clean(netfac)
+
+    duplicate = _new(backend, peeringdb.resource.NetworkFacility, 2, net=net, fac=fac)
+    with pytest.raises(backend.validation_error()) as exc:
+        backend.clean(duplicate)
+    assert list(exc.value.error_dict) == ["__all__"]
+    with pytest.raises(sqlite3.IntegrityError):
+        backend.save(duplicate)
+
+
+def test_foreign_keys(backend):
+    connection = backend.connection()
+    assert connection.execute("PRAGMA foreign_keys").fetchone() == (1,)
+    net = _new(backend, peeringdb.resource.Network, 1, name="net 1", asn=1, org_id=2)
+    with pytest.raises(sqlite3.IntegrityError):
+        backend.save(net)
+
+    # checked on commit, so rows may come before the ones they refer to
+    with backend.atomic_transaction():
+        backend.save(net)
+        _org(backend, 2, "org 2")
+    assert backend.get_object("net", 1).org.name == "org 2"
@@ -1,5 +1,6 @@
 import json
 import os
+import threading
 from datetime import datetime
 from types import SimpleNamespace
 
@@ -7,8 +8,19 @@ import helper
 import pytest
 
 import peeringdb
+from peeringdb._plan import ConvertedRow, plan
+from peeringdb._update import _CommitBatch
 from peeringdb.client import Client
-from peeringdb.resource import Network, Organization, all_resources
+from peeringdb.commands import Sync
+from peeringdb.resource import (
+    InternetExchangeLan,
+    Network,
+    NetworkIXLan,
+    Organization,
+    all_resources,
+    dependency_graph,
+)
+from peeringdb.util import load_failed_entries, save_failed_entries
 
 # first net id
 FIRST_NET = 1
@@ -18,6 +30,10 @@ def get_client():
     return Client(helper.CONFIG)
 
 
+def read_failed_entries():
+    return load_failed_entries({"sync": {"failed_entries": "failed_entries.json"}})
+
+
 # test single-object, aka. partial sync (disabled in release)
 def get_pclient():
     c = Client(helper.CONFIG)
@@ -167,16 +183,50 @@ def test_handle_initial_sync_error(client_empty, monkeypatch):
 
     with pytest.raises(client.backend.object_missing_error()):
         client.get(Organization, 2)  # Object with ID 2 should be missing
-    with open("failed_entries.json") as f:
-        failed_objects = json.load(f)
-        assert len(failed_objects) == 1
-        assert failed_objects[0]["pk"] == 2
+    failed_objects = read_failed_entries()
+    assert len(failed_objects) == 1
+    assert failed_objects[0]["pk"] == 2
 
     # Delete the file after the test
     if os.path.exists("failed_entries.json"):
         os.remove("failed_entries.json")
 
 
+def test_handle_initial_sync_in_chunks(client_empty, monkeypatch):
+    """Objects are built and inserted one chunk at a time, each chunk in its
+    own transaction."""
+    client = get_client()
+    upd = client.updater
+    upd.config["sync"]["batch_size"] = 2
+    backend = upd.backend
+    with open(helper.data_path() / "cache" / "org-0.json") as f:
+        entries = json.load(f)["data"]
+
+    events = []
+    create_obj = upd.create_obj
+    atomic_transaction = backend.atomic_transaction
+
+    def tracking_create_obj(row, res):
+        events.append("build")
+        return create_obj(row, res)
+
+    def tracking_atomic_transaction():
+        events.append("insert")
+        return atomic_transaction()
+
+    monkeypatch.setattr(upd, "create_obj", tracking_create_obj)
+    monkeypatch.setattr(backend, "atomic_transaction", tracking_atomic_transaction)
+
+    upd._write_batches(Organization, entries, None)
+
+    expected = []
+    for start in range(0, len(entries), 2):
+        expected += ["build"] * len(entries[start : start + 2]) + ["insert"]
+    assert events == expected
+    for row in entries:
+        assert client.get(Organization, row["id"])
+
+
 def test_handle_incremental_sync_success(client_empty):
     """
     Test successful incremental sync using _handle_incremental_sync.
@@ -215,6 +265,13 @@ def test_handle_incremental_sync_error(client_empty, monkeypatch):
 
     monkeypatch.setattr(client.updater, "copy_object", mock_copy_object)
 
+    # Changed objects are written in bulk and only go through copy_object
+    # one by one when that fails, so make the bulk write fail as well.
+    def failing_bulk_upsert(concrete, objs, fields):
+        raise ValueError("Simulating an error during bulk update")
+
+    monkeypatch.setattr(client.updater.backend, "bulk_upsert", failing_bulk_upsert)
+
     # Change detection (#135) skips rows whose `updated` matches the local
     # copy, so bump id 1's timestamp to force a genuine update through
     # copy_object (where the simulated error is raised).
@@ -229,12 +286,11 @@ def test_handle_incremental_sync_error(client_empty, monkeypatch):
 
     # Assertions
     assert client.get(Organization, 1)  # Object with ID 1 should still exist
-    with open("failed_entries.json") as f:
-        failed_objects = json.load(f)
-        assert len(failed_objects) >= 1
-        assert any(
-            entry["pk"] == 1 for entry in failed_objects
-        )  # Check if object ID 1 is present
+    failed_objects = read_failed_entries()
+    assert len(failed_objects) >= 1
+    assert any(
+        entry["pk"] == 1 for entry in failed_objects
+    )  # Check if object ID 1 is present
 
     # Delete the file if exists
     if os.path.exists("failed_entries.json"):
@@ -328,6 +384,299 @@ def test_incremental_sync_same_second_content_change(client_empty):
     assert counts["updated"] == 1  # caught via content despite identical `updated`
 
 
+def test_incremental_sync_updates_in_bulk(client_empty, monkeypatch):
+    """Changed objects of a batch are written with a single bulk upsert that
+    keeps the upstream timestamps."""
+    client = get_client()
+    rs = all_resources()
+    client.updater.update_all(rs)
+
+    entries = [dict(row) for row in client.fetcher.entries(Organization.tag)]
+    for row in entries:
+        row["name"] = f"{row['name']} (bulk)"
+        row["updated"] = "2099-01-01T00:00:00Z"
+
+    upd = client.updater
+    calls = []
+    bulk_upsert = upd.backend.bulk_upsert
+
+    def counting_bulk_upsert(concrete, objs, fields):
+        calls.append(len(objs))
+        return bulk_upsert(concrete, objs, fields)
+
+    monkeypatch.setattr(upd.backend, "bulk_upsert", counting_bulk_upsert)
+    # no per object lookups or saves on the update path
+    monkeypatch.setattr(upd, "copy_object", None)
+
+    counts = upd._handle_incremental_sync(entries, Organization)
+
+    assert counts["updated"] == len(entries)
+    assert calls == [len(entries)]
+    for row in entries:
+        org = client.get(Organization, row["id"])
+        assert org.name == row["name"]
+        assert org.updated == datetime(2099, 1, 1)
+
+
+def test_incremental_sync_commit_batches(client_empty, monkeypatch):
+    """Incremental writes are committed every `commit_every` rows, a failing
+    row is rolled back on its own and logged."""
+    if os.path.exists("failed_entries.json"):
+        os.remove("failed_entries.json")
+
+    client = get_client()
+    upd = client.updater
+    upd.config["sync"]["commit_every"] = 2
+    backend = upd.backend
+    with open(helper.data_path() / "cache" / "org-0.json") as f:
+        entries = json.load(f)["data"]
+    bad_id = entries[0]["id"]
+
+    events = []
+    depth = [0]
+    atomic_transaction = backend.atomic_transaction
+
+    class TrackingTransaction:
+        def __enter__(self):
+            self.transaction = atomic_transaction()
+            self.transaction.__enter__()
+            depth[0] += 1
+
+        def __exit__(self, *exc):
+            depth[0] -= 1
+            events.append((depth[0], "rollback" if exc[0] else "commit"))
+            return self.transaction.__exit__(*exc)
+
+    create_obj = upd.create_obj
+
+    def failing_create_obj(row, res, instance=None):
+        if row["id"] == bad_id:
+            raise ValueError("Simulating an error during object creation")
+        return create_obj(row, res, instance=instance)
+
+    monkeypatch.setattr(backend, "atomic_transaction", TrackingTransaction)
+    monkeypatch.setattr(upd, "create_obj", failing_create_obj)
+
+    counts = upd._handle_incremental_sync(entries, Organization)
+
+    assert counts["created"] == len(entries) - 1
+    # one commit per two rows, the bad row rolled back within the first
+    assert events.count((0, "commit")) == -(-len(entries) // 2)
+    assert events.count((1, "rollback")) == 1
+    for row in entries[1:]:
+        assert client.get(Organization, row["id"])
+    assert any(entry["pk"] == bad_id for entry in read_failed_entries())
+    os.remove("failed_entries.json")
+
+
+def test_commit_batch_commit_error():
+    """A failing commit surfaces its own error, not one from closing the
+    batch afterwards."""
+
+    class FailingCommit:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            if exc[0] is None:
+                raise RuntimeError("commit failed")
+
+    backend = SimpleNamespace(atomic_transaction=FailingCommit)
+    with pytest.raises(RuntimeError, match="commit failed"):
+        with _CommitBatch(backend, 1) as batch:
+            batch.written()
+
+
+def test_retry_failed_entries_in_bulk(client_empty, monkeypatch, tmp_path):
+    """Failed entries are refetched per resource, retried entries are removed
+    from the failed entries file."""
+    client = get_client()
+    monkeypatch.setitem(
+        client.config["sync"], "failed_entries", str(tmp_path / "failed.json")
+    )
+    upd = client.updater
+    entries = [
+        {"resource_tag": "net", "pk": FIRST_NET, "error": "error"},
+        {"resource_tag": "org", "pk": 1, "error": "error"},
+        {"resource_tag": "org", "pk": 2, "error": "error"},
+        {"resource_tag": "org", "pk": "Unknown", "error": "error"},
+    ]
+    save_failed_entries(client.config, entries)
+
+    calls = []
+    get_many = upd.fetcher.get_many
+
+    def tracking_get_many(tag, pks, depth=0):
+        calls.append((tag, sorted(pks)))
+        return get_many(tag, pks, depth)
+
+    monkeypatch.setattr(upd.fetcher, "get_many", tracking_get_many)
+    monkeypatch.setattr(upd.fetcher, "get", None)
+
+    Sync.retry_failed_entries(client, entries)
+
+    # orgs first, as networks reference them
+    assert calls == [("org", [1, 2]), ("net", [FIRST_NET])]
+    assert client.get(Organization, 1)
+    assert client.get(Network, FIRST_NET)
+    assert load_failed_entries(client.config) == [
+        {"resource_tag": "org", "pk": "Unknown", "error": "error"}
+    ]
+
+
+def test_digests_skip_unchanged_rows(client_empty, monkeypatch, tmp_path):
+    """Rows identical to the ones a sync wrote before are dropped before they
+    are converted or looked up, until the database changes under them."""
+    client = get_client()
+    upd = client.updater
+    upd.fetcher.cache_dir = str(tmp_path)
+    with open(helper.data_path() / "cache" / "org-0.json") as f:
+        entries = json.load(f)["data"]
+
+    upd._write_batches(Organization, entries, None)
+
+    changed = dict(entries[0], name="Changed Name", updated="2099-01-01T00:00:00Z")
+    seen = []
+    handle_incremental_sync = upd._handle_incremental_sync
+
+    def tracking_handle_incremental_sync(batch, res):
+        seen.extend(row["id"] for row in batch)
+        return handle_incremental_sync(batch, res)
+
+    monkeypatch.setattr(
+        upd, "_handle_incremental_sync", tracking_handle_incremental_sync
+    )
+
+    _, counts = upd._write_batches(Organization, [changed] + entries[1:], 1)
+    assert seen == [changed["id"]]
+    assert counts == {"created": 0, "updated": 1, "unchanged": len(entries) - 1}
+    assert client.get(Organization, changed["id"]).name == "Changed Name"
+
+    # a database changed by anything else doesn't trust the digests
+    seen.clear()
+    client.backend.delete_all()
+    _, counts = upd._write_batches(Organization, entries, 1)
+    assert seen == [row["id"] for row in entries]
+    assert counts["created"] == len(entries)
+
+
+def test_initial_sync_repeated_ids(client_empty, monkeypatch):
+    """A row repeated in a batch is inserted once, the last one wins."""
+    client = get_client()
+    upd = client.updater
+    with open(helper.data_path() / "cache" / "org-0.json") as f:
+        entries = json.load(f)["data"]
+    repeated = dict(entries[0], name="Repeated Name")
+
+    inserted = []
+    bulk_create = upd.backend.bulk_create
+
+    def counting_bulk_create(concrete, objs, batch_size=1000):
+        objs = list(objs)
+        inserted.extend(obj.id for obj in objs)
+        return bulk_create(concrete, objs, batch_size)
+
+    monkeypatch.setattr(upd.backend, "bulk_create", counting_bulk_create)
+    upd._handle_initial_sync(entries + [repeated], Organization)
+
+    assert sorted(inserted) == sorted(row["id"] for row in entries)
+    assert client.get(Organization, repeated["id"]).name == "Repeated Name"
+    assert load_failed_entries(client.config) == []
+
+
+def test_update_all_resumes_from_checkpoint(client_empty, monkeypatch, tmp_path):
+    """An interrupted initial sync continues after the last committed chunk."""
+    client = get_client()
+    upd = client.updater
+    upd.fetcher.cache_dir = str(tmp_path)
+    upd.config["sync"]["batch_size"] = 2
+    backend = upd.backend
+    with open(helper.data_path() / "cache" / "org-0.json") as f:
+        entries = json.load(f)["data"]
+
+    monkeypatch.setattr(upd.fetcher, "load", lambda tag, since, fetch_private=False: 0)
+    monkeypatch.setattr(upd.fetcher, "entries", lambda tag: entries)
+
+    inserted = []
+    bulk_create = backend.bulk_create
+
+    def interrupted_bulk_create(concrete, objs, batch_size=1000):
+        objs = list(objs)
+        if inserted:
+            raise KeyboardInterrupt()
+        inserted.extend(obj.id for obj in objs)
+        return bulk_create(concrete, objs, batch_size)
+
+    monkeypatch.setattr(backend, "bulk_create", interrupted_bulk_create)
+    with pytest.raises(KeyboardInterrupt):
+        upd.update_all([Organization])
+
+    checkpoint = upd._get_checkpoint(Organization.tag)
+    assert checkpoint["id"] == entries[1]["id"]
+    assert not checkpoint["since"]
+    assert checkpoint["initial"]
+
+    def counting_bulk_create(concrete, objs, batch_size=1000):
+        objs = list(objs)
+        inserted.extend(obj.id for obj in objs)
+        return bulk_create(concrete, objs, batch_size)
+
+    monkeypatch.setattr(backend, "bulk_create", counting_bulk_create)
+    upd.update_all([Organization])
+
+    assert inserted == [row["id"] for row in entries]
+    assert upd._get_checkpoint(Organization.tag) is None
+
+
+def test_many_relations_loaded_per_chunk(monkeypatch):
+    """The objects many relations refer to are looked up with one query per
+    related class for a whole chunk of rows."""
+    from peeringdb import _sync
+    from peeringdb._plan import Ref
+
+    class Related:
+        def __init__(self, pk):
+            self.pk = pk
+
+    ref = Ref("tags", None, None, None, Related)
+    monkeypatch.setattr(
+        _sync, "plan", lambda backend, concrete: SimpleNamespace(many_refs=[ref])
+    )
+    queries = []
+    relations = {}
+
+    class Backend:
+        def get_concrete(self, res):
+            return res
+
+        def get_objects_map(self, concrete, ids):
+            queries.append(sorted(ids))
+            return {pk: Related(pk) for pk in ids if pk != 99}
+
+        def object_missing_error(self, concrete=None):
+            return LookupError
+
+        def set_relation_many_to_many(self, obj, field_name, objs):
+            relations[obj] = [rel.pk for rel in objs]
+
+    backend = Backend()
+    rows = [{"id": 1, "tags": [1, 2]}, {"id": 2, "tags": [2, {"id": 3}]}]
+
+    related = _sync.load_many_relations(backend, Organization, rows)
+    assert queries == [[1, 2, 3]]
+
+    for row in rows:
+        _sync.set_many_relations(backend, Organization, row["id"], row, related)
+    assert queries == [[1, 2, 3]]
+    assert relations == {1: [1, 2], 2: [2, 3]}
+
+    # ids missing from the chunk's lookup are queried, unknown ones raise
+    _sync.set_many_relations(backend, Organization, 3, {"tags": [4]}, related)
+    assert relations[3] == [4]
+    with pytest.raises(LookupError):
+        _sync.set_many_relations(backend, Organization, 4, {"tags": [99]}, related)
+
+
 def test_compare_updated(client_empty):
     """Timestamp comparison: 1 newer / -1 older / 0 equal / None unknown."""
     upd = get_client().updater
@@ -461,14 +810,213 @@ def test_incremental_sync_create_error(client_empty, monkeypatch):
 
     counts = client.updater._handle_incremental_sync([base], Organization)
     assert counts["created"] == 0
-    with open("failed_entries.json") as f:
-        failed = json.load(f)
-        assert any(entry["pk"] == 888888 for entry in failed)
+    failed = read_failed_entries()
+    assert any(entry["pk"] == 888888 for entry in failed)
 
     if os.path.exists("failed_entries.json"):
         os.remove("failed_entries.json")
 
 
+def test_resolve_dangling_in_bulk(client_empty, monkeypatch):
+    """Missing relations of a batch are fetched with one `id__in` request per
+    resource and created before the batch itself."""
+    client = get_client()
+    upd = client.updater
+    with open(helper.data_path() / "cache" / "net-0.json") as f:
+        nets = json.load(f)["data"]
+    with open(helper.data_path() / "cache" / "org-0.json") as f:
+        orgs = {row["id"]: row for row in json.load(f)["data"]}
+    calls = []
+
+    def fake_get(endpoint, **params):
+        calls.append(endpoint)
+        ids = [int(pk) for pk in params["id__in"].split(",")]
+        return [orgs[pk] for pk in ids if pk in orgs]
+
+    monkeypatch.setattr(upd.fetcher, "_get", fake_get)
+
+    upd._resolve_dangling(nets, Network)
+    assert calls == ["org"]
+    for net in nets:
+        assert client.get(Organization, net["org_id"])
+
+    # already resolved, neither the backend nor the api are asked again
+    monkeypatch.setattr(upd.backend, "get_object", None)
+    upd._resolve_dangling(nets, Network)
+    assert calls == ["org"]
+
+
+def test_update_all_prefetches_ahead_of_writes(client_empty, monkeypatch):
+    """
+    Downloads for upcoming resources overlap the write of the current one,
+    while writes stay serial and in the requested order.
+    """
+    client = get_client()
+    upd = client.updater
+    upd.config["sync"]["prefetch"] = 2
+    rs = all_resources()[:3]
+    second_loaded = threading.Event()
+    writes = []
+
+    def fake_load(tag, since, fetch_private=False):
+        if tag == rs[1].tag:
+            second_loaded.set()
+
+    def fake_initial(entries, res):
+        if res is rs[0]:
+            # only returns once the next resource was downloaded in the background
+            assert second_loaded.wait(5)
+        writes.append(res)
+
+    monkeypatch.setattr(upd.fetcher, "load", fake_load)
+    monkeypatch.setattr(upd.fetcher, "entries", lambda tag: [])
+    monkeypatch.setattr(upd.backend, "last_change", lambda c: None)
+    monkeypatch.setattr(upd, "_handle_initial_sync", fake_initial)
+
+    upd.update_all(rs)
+
+    assert writes == rs
+
+
+def test_update_all_looks_up_cursors_at_once(client_empty, monkeypatch):
+    """The cursors of all resources come from one `last_change_all` call,
+    including the ones computed ahead for prefetching."""
+    client = get_client()
+    upd = client.updater
+    rs = all_resources()
+
+    def last_change(concrete):
+        raise AssertionError("looked up per resource")
+
+    monkeypatch.setattr(upd.fetcher, "load", lambda tag, since, fetch_private=False: 0)
+    monkeypatch.setattr(upd.fetcher, "entries", lambda tag: [])
+    monkeypatch.setattr(
+        upd.backend, "last_change_all", lambda: {res.tag: None for res in rs}
+    )
+    monkeypatch.setattr(upd.backend, "last_change", last_change)
+
+    upd.update_all(rs)
+
+    assert upd._last_changes == {}
+
+
+def test_update_all_consumes_stream_in_batches(client_empty, monkeypatch):
+    """A streamed resource is written in batches of `batch_size` rows."""
+    client = get_client()
+    upd = client.updater
+    upd.config["sync"]["batch_size"] = 2
+    batches = []
+
+    monkeypatch.setattr(upd.fetcher, "stream", True)
+    monkeypatch.setattr(upd.fetcher, "load", lambda tag, since, fetch_private=False: 0)
+    monkeypatch.setattr(
+        upd.fetcher, "entries", lambda tag: iter([{"id": i} for i in range(5)])
+    )
+    monkeypatch.setattr(upd.backend, "last_change", lambda c: None)
+    monkeypatch.setattr(upd, "_handle_initial_sync", lambda e, r: batches.append(e))
+
+    upd.update_all([Organization])
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+
+
+def test_dependency_graph(client_empty):
+    backend = peeringdb.get_backend()
+    graph = dependency_graph(backend)
+
+    assert graph[Organization] == set()
+    assert graph[Network] == {Organization}
+    assert {Network, InternetExchangeLan} <= graph[NetworkIXLan]
+
+    assert list(graph) == all_resources()
+
+    # only relations between the given resources, in the order given
+    subset = dependency_graph(backend, [NetworkIXLan, Network])
+    assert list(subset) == [NetworkIXLan, Network]
+    assert subset[NetworkIXLan] == {Network}
+    assert subset[Network] == set()
+
+
+def test_resource_plan(client_empty):
+    """Field metadata is compiled once per concrete class."""
+    backend = peeringdb.get_backend()
+    concrete = backend.get_concrete(Network)
+    net_plan = plan(backend, concrete)
+
+    assert plan(backend, concrete) is net_plan
+    assert "asn" in net_plan.scalars
+    assert [(ref.name, ref.column, ref.resource) for ref in net_plan.single_refs] == [
+        ("org", "org_id", Organization)
+    ]
+    assert net_plan.groups["single_refs"].keys() == {"org"}
+    assert {field.name for field in net_plan.columns} >= {"id", "asn", "org"}
+    # the django backend converts values, integers are kept as they are
+    assert net_plan.converters["asn"](63311) == 63311
+
+
+def test_resource_plan_converts_rows(client_empty):
+    """Scalars of a batch are converted per field; a row that can't be
+    converted is passed on untouched so it fails on its own."""
+    backend = peeringdb.get_backend()
+    org_plan = plan(backend, backend.get_concrete(Organization))
+    rows = [
+        {"id": 1, "name": "a", "updated": "2023-04-21T13:46:32.027157Z"},
+        {"id": 2, "name": "b", "updated": "not a timestamp"},
+        {"id": 3, "name": "c"},
+    ]
+
+    converted = org_plan.convert(rows)
+
+    assert isinstance(converted[0], ConvertedRow)
+    assert converted[0]["updated"] == datetime(2023, 4, 21, 13, 46, 32, 27157)
+    assert converted[1] is rows[1]
+    assert converted[2] == rows[2]
+    # the input rows are left as they are
+    assert rows[0]["updated"] == "2023-04-21T13:46:32.027157Z"
+
+    upd = get_client().updater
+    with pytest.raises(ValueError):
+        upd.create_obj(converted[1], Organization)
+    obj, _ = upd.create_obj(converted[0], Organization)
+    assert obj.updated == converted[0]["updated"]
+
+
+def test_update_all_concurrent_writes(client_empty, monkeypatch):
+    """
+    Resources are written concurrently once the resources they depend on
+    are done.
+    """
+    client = get_client()
+    upd = client.updater
+    upd.config["sync"]["write_workers"] = 4
+    lock = threading.Lock()
+    started, finished = {}, {}
+    active = []
+    peak = [0]
+
+    def fake_update(res, since, skip, fetch_private, pending):
+        with lock:
+            started[res] = set(finished)
+            active.append(res)
+            peak[0] = max(peak[0], len(active))
+        threading.Event().wait(0.05)
+        with lock:
+            active.remove(res)
+            finished[res] = True
+
+    monkeypatch.setattr(upd.backend, "supports_concurrent_writes", lambda: True)
+    monkeypatch.setattr(upd, "_update_resource", fake_update)
+
+    rs = all_resources()
+    upd.update_all(rs)
+
+    graph = dependency_graph(upd.backend, rs)
+    assert set(started) == set(rs)
+    for res, deps in graph.items():
+        assert deps <= started[res]
+    assert peak[0] > 1
+
+
 @pytest.mark.sync
 def test_auth(client_empty):
     with pytest.raises(ValueError):
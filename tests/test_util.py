@@ -75,3 +75,46 @@ def test_load_failed_entries_file_not_found():
 
     result = util.load_failed_entries(config)
     assert result == []
+
+
+def test_failed_entries_journal(tmp_path):
+    """Failed entries are appended as JSON lines, duplicates are skipped."""
+    path = tmp_path / "failed_entries.json"
+    config = {"sync": {"failed_entries": str(path)}}
+
+    util.log_error(config, "net", 1, "error")
+    util.log_error(config, "net", 2, "error")
+    util.log_error(config, "net", 1, "error")
+
+    lines = path.read_text().splitlines()
+    assert [json.loads(line)["pk"] for line in lines] == [1, 2]
+    assert util.load_failed_entries(config) == [
+        {"resource_tag": "net", "pk": 1, "error": "error"},
+        {"resource_tag": "net", "pk": 2, "error": "error"},
+    ]
+
+    util.save_failed_entries(config, [])
+    assert util.load_failed_entries(config) == []
+    util.log_error(config, "net", 1, "error")
+    assert len(util.load_failed_entries(config)) == 1
+
+
+def test_failed_entries_journal_legacy(tmp_path):
+    """A file in the legacy JSON array format is read and compacted into JSON
+    lines on the next write."""
+    path = tmp_path / "failed_entries.json"
+    config = {"sync": {"failed_entries": str(path)}}
+    legacy = [
+        {"resource_tag": "net", "pk": 1, "error": "error"},
+        {"resource_tag": "net", "pk": 1, "error": "error"},
+        {"resource_tag": "org", "pk": 2, "error": "error"},
+    ]
+    path.write_text(json.dumps(legacy, indent=4))
+
+    assert util.load_failed_entries(config) == legacy[1:]
+
+    util.log_error(config, "org", 2, "error")
+    util.log_error(config, "fac", 3, "error")
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert lines == legacy[1:] + [{"resource_tag": "fac", "pk": 3, "error": "error"}]